@@ -0,0 +1,24 @@
+-- ============================================
+-- Alignment Cache Table
+-- Word timings of a song's audio + lyrics, reused across renders
+-- ============================================
+
+-- cache_key is a sha256 of the audio bytes, the cleaned lyrics text and the
+-- alignment mode (see app/services/alignment_cache.py). words holds compact
+-- timings: [[start_ms, end_ms, "word"], ...]
+CREATE TABLE IF NOT EXISTS alignment_cache (
+    cache_key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    words JSONB NOT NULL DEFAULT '[]'::jsonb,
+    word_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- For cleaning out entries nobody has used in a while
+CREATE INDEX IF NOT EXISTS idx_alignment_cache_last_used_at ON alignment_cache(last_used_at DESC);
+
+-- Backend-only table (service role key bypasses RLS)
+ALTER TABLE alignment_cache ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE alignment_cache IS 'Word-level lyric timings by audio/lyrics hash, so repeat renders skip transcription';
@@ -3,15 +3,26 @@ Supabase-Enabled API Endpoints
 All endpoints now require authentication and use Supabase storage
 """
 from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form, Depends
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from app.models import GenerateRequest, GenerateResponse, RemixRequest
 from app.services import lyrics_service, song_service
-from app.services.video_service import generate_lyric_video_from_files
+from app.services.video_service import video_filename_for
+from app.services import render_jobs
+from app.utils.thumbnails import METADATA_KEYS as PREVIEW_METADATA_KEYS
+from app.utils.hls import playlist_segments, rewrite_playlist
+from app.utils.video_generator import QUALITY_PRESETS, ASPECT_RATIOS, DEFAULT_ASPECT
+from app.utils.encoding_profiles import resolve_profile
+from app.utils.media_probe import probe_media
+from app.utils import assemblyai_client
 from app.services.supabase_service import get_supabase_service
 from app.middleware.auth import get_current_user, AuthUser
 from app.utils import supabase_storage
+from app import config
 import os
+import hmac
 import json
+import posixpath
 import tempfile
 import shutil
 from typing import Optional
@@ -109,6 +120,8 @@ async def musicgpt_webhook(request: Request):
     """
     MusicGPT webhook endpoint
     Receives generated songs and saves to Supabase storage
+    With PREALIGN_ON_INGEST, the lyrics are aligned in the pre-alignment
+    worker (see render_jobs.submit_prealignment)
     """
     payload = await request.json()
     print("=== MusicGPT Webhook Received ===")
@@ -245,9 +258,13 @@ async def musicgpt_webhook(request: Request):
         except Exception as e:
             print(f"⚠️ Could not handle album art: {e}")
         
+        # Read the duration from the file headers (no decode)
+        audio_info = probe_media(audio_bytes)
+        duration = round(audio_info["duration"]) if audio_info else None
+        
         # Create database record
         try:
-            supabase.create_song_record(
+            song_record = supabase.create_song_record(
                 user_id=user_id,
                 title=title,
                 filename=filename,
@@ -255,9 +272,15 @@ async def musicgpt_webhook(request: Request):
                 genre=genre,
                 voice_type=voice_type,
                 lyrics_path=lyrics_path,
-                album_art_path=album_art_path
+                album_art_path=album_art_path,
+                duration=duration
             )
             print(f"✅ Created database record for {title}")
+            
+            # Word timings ready before anyone asks for a lyric video
+            if (config.PREALIGN_ON_INGEST and config.ALIGNMENT_CACHE_ENABLED
+                    and song_record and metadata.get('complete_lyrics')):
+                render_jobs.submit_prealignment(song_record, audio_bytes, metadata['complete_lyrics'])
         except Exception as e:
             print(f"⚠️ Could not create database record: {e}")
         
@@ -292,6 +315,27 @@ async def musicgpt_webhook(request: Request):
         return {"success": False, "error": str(e)}
 
 
+@router.post('/webhook/assemblyai')
+async def assemblyai_webhook(request: Request):
+    """
+    AssemblyAI webhook endpoint
+    Called when a transcript finishes; wakes the render waiting on it
+    (see app/utils/assemblyai_client.py)
+    """
+    secret = config.ASSEMBLYAI_WEBHOOK_SECRET
+    if secret and not hmac.compare_digest(request.headers.get("X-Webhook-Secret", ""), secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    
+    payload = await request.json()
+    transcript_id = payload.get("transcript_id")
+    if not transcript_id:
+        return {"success": False, "error": "No transcript_id"}
+    
+    print(f"[AssemblyAI] Webhook: transcript {transcript_id} {payload.get('status')}")
+    assemblyai_client.notify_completed(transcript_id)
+    return {"success": True}
+
+
 # ============================================
 # SONG LISTING AND DOWNLOAD ENDPOINTS
 # ============================================
@@ -332,7 +376,8 @@ async def list_songs(user: AuthUser = Depends(get_current_user)):
                 "download_url": f"/api/download/song/{song['id']}",
                 "stream_url": song_url,
                 "album_art_url": album_art_url,
-                "lyrics_url": lyrics_url
+                "lyrics_url": lyrics_url,
+                "aligned": bool((song.get('metadata') or {}).get('alignment_key'))
             })
         
         return {"songs": formatted_songs}
@@ -561,7 +606,21 @@ async def remix_songs(
 # VIDEO GENERATION ENDPOINTS
 # ============================================
 
-@router.post("/generate-lyric-video")
+def _copy_to_temp(source, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(source, tmp, 1024 * 1024)
+        return tmp.name
+
+
+async def save_upload_to_temp(upload: UploadFile, suffix: str) -> str:
+    """
+    Save an uploaded file to a temp file (handed to the render worker); returns
+    its path. The copy runs in the threadpool so it doesn't block the event loop.
+    """
+    return await run_in_threadpool(_copy_to_temp, upload.file, suffix)
+
+
+@router.post("/generate-lyric-video", status_code=202)
 async def generate_lyric_video(
     title: str = Form(...),
     song_filename: str = Form(None),
@@ -569,15 +628,56 @@ async def generate_lyric_video(
     lyrics: str = Form(None),
     audio_file: UploadFile = File(None),
     background_file: UploadFile = File(None),
+    quality: str = Form("standard"),
+    profile: str = Form(None),
+    aspects: str = Form(DEFAULT_ASPECT),
     user: AuthUser = Depends(get_current_user)
 ):
     """
-    Generate a lyric video
+    Queue a lyric video render
+    
+    quality: 'preview' (fast 480p draft, not saved to the video list),
+    'standard' (1080p) or 'high'
+    profile: encoding profile - 'archive', 'web', 'mobile' or 'preview'
+    (default: the quality's profile, else the deployment's ENCODING_PROFILE)
+    aspects: comma-separated aspect ratios to render in one pass,
+    e.g. '16:9,9:16,1:1' (YouTube, Reels/Shorts, Instagram feed)
+    
+    Returns 202 with a job_id; poll GET /render-jobs/{job_id} for progress.
+    The finished job's result has the video URLs.
     """
     try:
-        # Check if video title already exists
+        if quality not in QUALITY_PRESETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid quality '{quality}'. Choose from: {', '.join(QUALITY_PRESETS)}"
+            )
+        is_preview = quality == "preview"
+        
+        try:
+            profile = resolve_profile(profile, QUALITY_PRESETS[quality]["profile"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        aspect_list = list(dict.fromkeys(a.strip() for a in aspects.split(',') if a.strip()))
+        invalid = [a for a in aspect_list if a not in ASPECT_RATIOS]
+        if not aspect_list or invalid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid aspects '{aspects}'. Choose from: {', '.join(ASPECT_RATIOS)}"
+            )
+        
+        # Check if video title already exists (previews don't claim the title;
+        # titles of jobs still rendering are reserved by render_jobs)
         safe_title = supabase_storage.sanitize_title(title)
-        if supabase_storage.check_title_exists(user.user_id, safe_title, check_types=['videos']):
+        title_taken = not is_preview and (
+            supabase_storage.check_title_exists(user.user_id, safe_title, check_types=['videos'])
+            or any(
+                supabase_storage.check_file_exists(user.user_id, video_filename_for(safe_title, a), 'videos')
+                for a in aspect_list if a != DEFAULT_ASPECT
+            )
+        )
+        if title_taken:
             raise HTTPException(
                 status_code=400,
                 detail=f"Video title '{title}' already exists. Please choose a different title."
@@ -585,10 +685,10 @@ async def generate_lyric_video(
         
         supabase = get_supabase_service()
         
-        # Handle audio source
+        # Handle audio source (downloads happen in the render worker)
+        song = None
         audio_path = None
-        lyrics_path = None
-        song_id = None
+        background_path = None
         
         if song_filename:
             # Use existing song
@@ -597,127 +697,56 @@ async def generate_lyric_video(
             
             if not song:
                 raise HTTPException(status_code=404, detail="Selected song not found")
-            
-            song_id = song['id']
-            
-            # Download song to temp file using signed URL (faster, more reliable)
-            song_url = supabase.get_public_url('user-songs', song['storage_path'])
-            response = requests.get(song_url, timeout=30)
-            response.raise_for_status()
-            audio_bytes = response.content
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp:
-                tmp.write(audio_bytes)
-                audio_path = tmp.name
-            
-            # Download lyrics if available
-            if song.get('lyrics_path'):
-                try:
-                    lyrics_url = supabase.get_public_url('user-lyrics', song['lyrics_path'])
-                    response = requests.get(lyrics_url, timeout=15)
-                    response.raise_for_status()
-                    lyrics_bytes = response.content
-                    
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.txt') as tmp:
-                        tmp.write(lyrics_bytes)
-                        lyrics_path = tmp.name
-                    print(f"✅ Found lyrics for {song_filename}")
-                except Exception as e:
-                    print(f"⚠️ Could not load lyrics: {e}")
-        
-        elif audio_file:
-            # Upload new audio
-            audio_bytes = await audio_file.read()
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp:
-                tmp.write(audio_bytes)
-                audio_path = tmp.name
-        else:
+        elif not audio_file:
             raise HTTPException(status_code=400, detail="Either song_filename or audio_file must be provided")
         
-        # Handle background
-        background_path = None
-        
-        if background_filename:
-            # Use existing background (from public bucket) - download via HTTP
-            background_url = supabase.get_public_url('backgrounds', background_filename)
-            response = requests.get(background_url, timeout=15)
-            response.raise_for_status()
-            background_bytes = response.content
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-                tmp.write(background_bytes)
-                background_path = tmp.name
-        
-        elif background_file:
-            # Upload new background
-            bg_bytes = await background_file.read()
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-                tmp.write(bg_bytes)
-                background_path = tmp.name
-        
-        # Generate video
         try:
-            result_path = generate_lyric_video_from_files(
-                audio_path,
-                lyrics_path,
-                safe_title,
-                background_path
-            )
-        except Exception as video_error:
-            print(f"❌ Video rendering failed: {video_error}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Video generation failed: {str(video_error)}"
-            )
-        
-        # Upload video to Supabase
-        with open(result_path, 'rb') as f:
-            video_bytes = f.read()
-        
-        video_filename = f"{safe_title}.mp4"
-        video_result = supabase_storage.upload_file(
-            user_id=user.user_id,
-            content_bytes=video_bytes,
-            filename=video_filename,
-            folder_type='videos',
-            content_type='video/mp4'
-        )
-        
-        # Create database record
-        supabase.create_video_record(
-            user_id=user.user_id,
-            title=title,
-            filename=video_filename,
-            storage_path=video_result['path'],
-            song_id=song_id,
-            background_path=background_filename
-        )
-        
-        # Cleanup temp files
-        for tmp_file in [audio_path, lyrics_path, background_path]:
-            if tmp_file and os.path.exists(tmp_file):
-                try:
+            if not song:
+                # Upload new audio
+                audio_path = await save_upload_to_temp(audio_file, '.mp3')
+            if background_file and not background_filename:
+                # Upload new background
+                background_path = await save_upload_to_temp(background_file, '.jpg')
+            
+            job = render_jobs.submit_lyric_video_job(user.user_id, title, {
+                "user_id": user.user_id,
+                "title": title,
+                "safe_title": safe_title,
+                "quality": quality,
+                "profile": profile,
+                "aspects": aspect_list,
+                "song": song,
+                "audio_path": audio_path,
+                "background_path": background_path,
+                "background_filename": background_filename,
+            })
+        except Exception:
+            for tmp_file in [audio_path, background_path]:
+                if tmp_file and os.path.exists(tmp_file):
                     os.remove(tmp_file)
-                except:
-                    pass
-        
-        # Cleanup video temp directory (contains result_path)
-        if result_path and os.path.exists(result_path):
-            try:
-                video_tmpdir = os.path.dirname(result_path)
-                shutil.rmtree(video_tmpdir, ignore_errors=True)
-                print(f"✅ Cleaned up temp video directory")
-            except Exception as e:
-                print(f"⚠️ Could not cleanup video temp dir: {e}")
+            raise
         
         return {
-            "status": "success",
-            "video_url": video_result['url'],
-            "title": title
+            "status": job['state'],
+            "job_id": job['job_id'],
+            "status_url": f"/api/render-jobs/{job['job_id']}",
+            "title": title,
+            "quality": quality,
+            "profile": profile
         }
         
     except HTTPException as he:
         raise he
+    except render_jobs.TitleInUseError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Video title '{title}' is already being rendered. Please choose a different title."
+        )
+    except render_jobs.QueueFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many videos are rendering right now. Please try again in a few minutes."
+        )
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -725,6 +754,24 @@ async def generate_lyric_video(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get('/render-jobs/{job_id}')
+async def get_render_job(job_id: str, user: AuthUser = Depends(get_current_user)):
+    """
+    Status of a render job: state ('queued', 'running', 'succeeded', 'failed'),
+    stage, progress (0-100), and result (succeeded) or error (failed)
+    """
+    job = render_jobs.get_job(job_id, user.user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return job
+
+
+@router.get('/render-jobs')
+async def list_render_jobs(user: AuthUser = Depends(get_current_user)):
+    """User's recent render jobs, newest first"""
+    return {"jobs": render_jobs.list_jobs(user.user_id)}
+
+
 @router.get('/videos')
 async def list_videos(user: AuthUser = Depends(get_current_user)):
     """
@@ -734,13 +781,24 @@ async def list_videos(user: AuthUser = Depends(get_current_user)):
         supabase = get_supabase_service()
         videos = supabase.get_user_videos(user.user_id)
         
-        # Add public/signed URLs for each video
+        # Signed URLs for each video and its preview images (one batch request)
+        paths = [video['storage_path'] for video in videos]
+        for video in videos:
+            metadata = video.get('metadata') or {}
+            paths += [metadata[key] for key in PREVIEW_METADATA_KEYS.values() if metadata.get(key)]
+        urls = supabase.get_signed_urls('user-videos', paths)
+        
         video_list = []
         for video in videos:
-            video_url = supabase.get_public_url('user-videos', video['storage_path'])
+            metadata = video.get('metadata') or {}
             video_list.append({
                 **video,
-                'video_url': video_url
+                'video_url': urls.get(video['storage_path']),
+                'poster_url': urls.get(metadata.get('poster_path')),
+                'sprite_url': urls.get(metadata.get('sprite_path')),
+                'animated_preview_url': urls.get(metadata.get('animated_preview_path')),
+                'sprite': metadata.get('sprite'),
+                'hls_url': f"/api/video/{video['id']}/playlist.m3u8" if metadata.get('hls_playlist_path') else None
             })
         
         return {"videos": video_list}
@@ -781,6 +839,49 @@ async def get_video(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _hls_segment_paths(supabase, playlist_path):
+    """(playlist text, storage paths of its segments) for a stored HLS playlist"""
+    playlist = supabase.download_file('user-videos', playlist_path).decode('utf-8')
+    folder = posixpath.dirname(playlist_path)
+    return playlist, [f"{folder}/{segment}" for segment in playlist_segments(playlist)]
+
+
+@router.get('/video/{video_id}/playlist.m3u8')
+async def get_video_playlist(
+    video_id: str,
+    user: AuthUser = Depends(get_current_user)
+):
+    """
+    HLS playlist of a video (when it was packaged, see HLS_PACKAGING) with
+    signed segment URLs, so players start after the first segment and seek
+    without downloading the whole mp4
+    """
+    try:
+        supabase = get_supabase_service()
+        
+        videos = supabase.get_user_videos(user.user_id)
+        video = next((v for v in videos if v['id'] == video_id), None)
+        playlist_path = ((video or {}).get('metadata') or {}).get('hls_playlist_path')
+        
+        if not playlist_path:
+            raise HTTPException(status_code=404, detail="No HLS playlist for this video")
+        
+        playlist, segment_paths = _hls_segment_paths(supabase, playlist_path)
+        urls = supabase.get_signed_urls('user-videos', segment_paths)
+        signed = {posixpath.basename(path): urls[path] for path in segment_paths}
+        
+        return Response(
+            rewrite_playlist(playlist, signed),
+            media_type='application/vnd.apple.mpegurl',
+            headers={'Cache-Control': 'private, max-age=3600'}  # well inside the URLs' 24h expiry
+        )
+        
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete('/videos/{video_id}')
 async def delete_video(
     video_id: str,
@@ -799,12 +900,21 @@ async def delete_video(
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
         
-        # Delete video file from storage
-        if video.get('storage_path'):
+        # Delete video file (and its preview images and HLS files) from storage
+        metadata = video.get('metadata') or {}
+        file_paths = [video.get('storage_path')] + [metadata.get(key) for key in PREVIEW_METADATA_KEYS.values()]
+        if metadata.get('hls_playlist_path'):
             try:
-                supabase.delete_file('user-videos', video['storage_path'])
+                _, segment_paths = _hls_segment_paths(supabase, metadata['hls_playlist_path'])
+                file_paths += segment_paths + [metadata['hls_playlist_path']]
             except Exception as e:
-                print(f"Error deleting video file: {e}")
+                print(f"Error reading HLS playlist: {e}")
+        for file_path in file_paths:
+            if file_path:
+                try:
+                    supabase.delete_file('user-videos', file_path)
+                except Exception as e:
+                    print(f"Error deleting video file: {e}")
         
         # Delete database record
         supabase.delete_video_record(video_id, user.user_id)
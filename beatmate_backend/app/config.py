@@ -9,9 +9,68 @@ GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 MUSICGPT_API_KEY = os.environ.get('MUSICGPT_API_KEY')
 MUSICGPT_WEBHOOK_URL = os.environ.get('MUSICGPT_WEBHOOK_URL')
 ASSEMBLYAI_API_KEY = os.environ.get('ASSEMBLYAI_API_KEY')
+# Optional AssemblyAI completion callback (public URL of /webhook/assemblyai); waiting
+# renders then pick results up at once instead of at their next (backed-off) poll
+ASSEMBLYAI_WEBHOOK_URL = os.environ.get('ASSEMBLYAI_WEBHOOK_URL')
+ASSEMBLYAI_WEBHOOK_SECRET = os.environ.get('ASSEMBLYAI_WEBHOOK_SECRET')
+ASSEMBLYAI_TIMEOUT_SECONDS = int(os.environ.get('ASSEMBLYAI_TIMEOUT_SECONDS', '600'))
+# Lyric alignment: 'auto' (AssemblyAI, then vocal-activity / time-based / WhisperX
+# fallbacks), 'local' (offline vocal-activity alignment whenever lyrics are known) or
+# 'time' (offline, deterministic time-based alignment whenever lyrics are known)
+ALIGNMENT_MODE = os.environ.get('ALIGNMENT_MODE', 'auto').lower()
+# Explicit alignment provider order, e.g. 'stub,time' for offline load tests (default:
+# derived from ALIGNMENT_MODE; see app/utils/alignment_providers.py) and per-provider
+# timeouts in seconds, e.g. 'assemblyai=300,whisperx=600'
+ALIGNMENT_PROVIDERS = os.environ.get('ALIGNMENT_PROVIDERS', '')
+ALIGNMENT_TIMEOUTS = os.environ.get('ALIGNMENT_TIMEOUTS', '')
+# Reuse word timings of the same audio + lyrics (local disk, then the alignment_cache table)
+ALIGNMENT_CACHE_ENABLED = os.environ.get('ALIGNMENT_CACHE_ENABLED', 'true').lower() == 'true'
+ALIGNMENT_CACHE_MAX_MB = int(os.environ.get('ALIGNMENT_CACHE_MAX_MB', '64'))
+# Align generated songs right after the MusicGPT webhook stores them (in the background),
+# so their first lyric video render finds the word timings already cached
+PREALIGN_ON_INGEST = os.environ.get('PREALIGN_ON_INGEST', 'false').lower() == 'true'
+# WhisperX fallback: ASR model size, CPU compute type ('int8' is faster, 'float32'
+# more accurate; GPUs always use float16) and how long unused models stay loaded
+WHISPERX_MODEL = os.environ.get('WHISPERX_MODEL', 'small')
+WHISPERX_COMPUTE_TYPE = os.environ.get('WHISPERX_COMPUTE_TYPE', 'float32').lower()
+WHISPERX_IDLE_SECONDS = int(os.environ.get('WHISPERX_IDLE_SECONDS', '600'))
 BEATMATE_DEMO_FALLBACK = os.environ.get('BEATMATE_DEMO_FALLBACK', 'false').lower() == 'true'
 
+# Local Caches (derived render artifacts; safe to delete)
+CACHE_DIR = os.environ.get(
+    'BEATMATE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'cache')
+)
+AUDIO_CACHE_MAX_MB = int(os.environ.get('AUDIO_CACHE_MAX_MB', '2048'))
+BACKGROUND_CACHE_MAX_MB = int(os.environ.get('BACKGROUND_CACHE_MAX_MB', '1024'))
+
+# Video Rendering
+# Lyric video engine: 'frames' (NumPy compositing) or 'ass' (ffmpeg/libass burn-in)
+LYRIC_VIDEO_ENGINE = os.environ.get('LYRIC_VIDEO_ENGINE', 'frames').lower()
+# Number of chunks a lyric video is split into and rendered in parallel (1 = single process)
+RENDER_CHUNKS = int(os.environ.get('RENDER_CHUNKS', '1'))
+# Stream lyric videos to storage (fragmented MP4, resumable upload) while they encode
+STREAM_VIDEO_UPLOADS = os.environ.get('STREAM_VIDEO_UPLOADS', 'true').lower() == 'true'
+# Default encoding profile: 'archive', 'web', 'mobile' or 'preview' (see app/utils/encoding_profiles.py)
+ENCODING_PROFILE = os.environ.get('ENCODING_PROFILE', 'web').lower()
+# Also package finished lyric videos as HLS (segments + playlist, see app/utils/hls.py)
+HLS_PACKAGING = os.environ.get('HLS_PACKAGING', 'false').lower() == 'true'
+HLS_SEGMENT_SECONDS = int(os.environ.get('HLS_SEGMENT_SECONDS', '4'))
+
+# Render Cache (finished videos reused for identical requests; see render_cache.sql)
+RENDER_CACHE_ENABLED = os.environ.get('RENDER_CACHE_ENABLED', 'true').lower() == 'true'
+# Entries kept (least recently used are evicted) and days an unused entry is kept
+RENDER_CACHE_MAX_ENTRIES = int(os.environ.get('RENDER_CACHE_MAX_ENTRIES', '500'))
+RENDER_CACHE_TTL_DAYS = int(os.environ.get('RENDER_CACHE_TTL_DAYS', '30'))
+
+# Render Jobs (lyric videos render in background worker processes)
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', '1'))
+# Jobs allowed to wait for a worker; further requests are rejected with 429
+RENDER_QUEUE_MAX = int(os.environ.get('RENDER_QUEUE_MAX', '8'))
+# How long finished jobs stay queryable
+RENDER_JOB_TTL_SECONDS = int(os.environ.get('RENDER_JOB_TTL_SECONDS', '3600'))
+
 # Supabase Configuration
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_ANON_KEY = os.environ.get('SUPABASE_ANON_KEY')
-SUPABASE_SERVICE_ROLE_KEY = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
\ No newline at end of file
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
+from app.services import render_jobs
 
 # ============================================
 # IMPORTANT: Choose your API version
@@ -42,6 +43,16 @@ app.add_middleware(
 
 app.include_router(router, prefix="/api")
 
+# Render job state lives in this process: refuse to run as one of several workers
+@app.on_event("startup")
+async def claim_render_jobs():
+    render_jobs.claim_api_process()
+
+# Stop lyric video render workers with the server
+@app.on_event("shutdown")
+async def shutdown_render_workers():
+    render_jobs.shutdown()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,188 @@
+"""
+Alignment Cache
+Word timings by content: sha256 of the audio bytes, sha256 of the cleaned
+lyrics text and the alignment provider order. A local disk layer sits in front of the
+shared alignment_cache table (see alignment_cache.sql), so re-rendering a song
+(another background, aspect or quality) skips transcription entirely.
+Generated songs can be aligned at ingest (prealign_song), keeping the key in
+the song record's metadata so their first render starts right away.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from app import config
+from app.services.supabase_service import get_supabase_service
+from app.utils.aligner import clean_lyrics_for_alignment, read_lyrics_file
+from app.utils.alignment_providers import align_with_providers, providers_for, alignment_method, CACHE_NEVER
+from app.utils.disk_cache import DiskCache, file_sha256
+
+# Bump when alignment output changes for the same inputs
+ALIGNMENT_CACHE_VERSION = 1
+
+_disk_cache = None
+_executor = None
+
+
+def get_disk_cache():
+    """Process-wide LRU cache of word timings on local disk"""
+    global _disk_cache
+    if _disk_cache is None:
+        _disk_cache = DiskCache(
+            os.path.join(config.CACHE_DIR, "alignments"),
+            config.ALIGNMENT_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _disk_cache
+
+
+def alignment_cache_key(audio_path, lyrics_path=None):
+    """sha256 identifying the word timings for this audio, lyrics and provider order"""
+    lyrics_hash = None
+    if lyrics_path and os.path.exists(lyrics_path):
+        with open(lyrics_path, 'r', encoding='utf-8') as f:
+            cleaned = clean_lyrics_for_alignment(f.read().strip())
+        lyrics_hash = hashlib.sha256(cleaned.encode('utf-8')).hexdigest()
+    payload = {
+        "version": ALIGNMENT_CACHE_VERSION,
+        "audio": file_sha256(audio_path),
+        "lyrics": lyrics_hash,
+        "method": alignment_method(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def pack_words(words):
+    """Compact form of word timings: [[start_ms, end_ms, word], ...]"""
+    return [[round(w["start"] * 1000), round(w["end"] * 1000), w["word"]] for w in words]
+
+
+def unpack_words(packed):
+    return [{"start": start / 1000.0, "end": end / 1000.0, "word": word} for start, end, word in packed]
+
+
+def _read_disk(cache_key):
+    path = get_disk_cache().get(cache_key, ".json")
+    if not path:
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk(cache_key, entry):
+    cache = get_disk_cache()
+    temp_path = cache.temp_path(".json")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, separators=(',', ':'))
+    cache.commit(temp_path, cache_key, ".json")
+
+
+def lookup(cache_key):
+    """Cached {"method", "words"} (packed) for a key: disk first, then the shared table"""
+    entry = _read_disk(cache_key)
+    if entry:
+        return entry
+    try:
+        row = get_supabase_service().get_alignment_cache_entry(cache_key)
+    except Exception as e:
+        print(f"[Alignment Cache] ⚠️  Shared cache unavailable: {e}")
+        return None
+    if not row:
+        return None
+    entry = {"method": row["method"], "words": row["words"]}
+    _write_disk(cache_key, entry)
+    return entry
+
+
+def store(cache_key, method, words):
+    """Save word timings to disk and the shared table (failures are logged only)"""
+    entry = {"method": method, "words": pack_words(words)}
+    try:
+        _write_disk(cache_key, entry)
+        get_supabase_service().create_alignment_cache_entry(cache_key, method, entry["words"])
+    except Exception as e:
+        print(f"[Alignment Cache] ⚠️  Could not cache alignment: {e}")
+
+
+def align_cached(audio_path, lyrics_path=None, cache_key=None):
+    """
+    Word timings for audio_path / lyrics_path (see aligner.align_audio),
+    reusing an earlier alignment of the same audio and lyrics when there is one.
+    cache_key: the files' key when already known (e.g. the song record's
+    alignment_key), which skips hashing them.
+    Results are stored per the provider's cache policy (alignment_providers.py):
+    time-based and stub timings are instant to recompute, and vocal-activity
+    timings that stood in for a failed transcription are retried next time.
+    Returns (words, cacheable): cacheable is False for such timings, which
+    must not be kept in other caches either (e.g. the render cache).
+    """
+    lyrics_text = read_lyrics_file(lyrics_path)
+    providers = providers_for(bool(lyrics_text))
+    instant = providers and providers[0].cache_policy == CACHE_NEVER
+    if not config.ALIGNMENT_CACHE_ENABLED or instant:
+        words, _, cacheable = align_with_providers(audio_path, lyrics_text)
+        return words, cacheable
+
+    cache_key = cache_key or alignment_cache_key(audio_path, lyrics_path)
+    entry = lookup(cache_key)
+    if entry:
+        print(f"[Alignment Cache] ♻️  Reusing {entry['method']} alignment {cache_key[:12]} "
+              f"({len(entry['words'])} words)")
+        return unpack_words(entry["words"]), True
+
+    words, method, cacheable = align_with_providers(audio_path, lyrics_text)
+    if words and cacheable:
+        store(cache_key, method, words)
+    return words, cacheable
+
+
+def align_in_background(audio_path, lyrics_path=None, cache_key=None):
+    """
+    Start align_cached on a background thread, so downloads and render prep
+    can run while a transcription is in flight. Returns a Future of
+    align_cached's (words, cacheable); the files must stay in place until it
+    is done.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="align")
+    return _executor.submit(align_cached, audio_path, lyrics_path, cache_key)
+
+
+def prealign_song(song, audio_bytes, lyrics_text):
+    """
+    Align a newly stored song (user_songs record, its audio bytes and lyrics
+    text) into the cache and record the key in the song's metadata as
+    alignment_key. Runs in the pre-alignment worker (see
+    render_jobs.submit_prealignment); failures are logged only (the render
+    aligns as usual).
+    """
+    temp_paths = []
+    try:
+        for content, suffix in ((audio_bytes, ".mp3"), (lyrics_text.encode("utf-8"), ".txt")):
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+                tmp.write(content)
+                temp_paths.append(tmp.name)
+        audio_path, lyrics_path = temp_paths
+
+        cache_key = alignment_cache_key(audio_path, lyrics_path)
+        words, cacheable = align_cached(audio_path, lyrics_path, cache_key)
+        if not (words and cacheable):
+            print(f"[Alignment Cache] ⚠️  Pre-alignment of '{song['title']}' not cached (fallback timings only)")
+            return None
+
+        metadata = {**(song.get("metadata") or {}), "alignment_key": cache_key}
+        if not get_supabase_service().update_song_record(song["id"], song["user_id"], {"metadata": metadata}):
+            print(f"[Alignment Cache] ⚠️  Pre-aligned '{song['title']}' but could not update the song record")
+            return None
+        print(f"[Alignment Cache] ✅ Pre-aligned '{song['title']}' ({cache_key[:12]})")
+        return cache_key
+    except Exception as e:
+        print(f"[Alignment Cache] ⚠️  Pre-alignment failed: {e}")
+        return None
+    finally:
+        for path in temp_paths:
+            os.remove(path)
@@ -0,0 +1,137 @@
+"""
+Render Cache
+Content-addressed cache of finished lyric videos. A render is identified by a
+hash of its inputs (audio bytes, lyrics text, background bytes), settings
+(see video_generator.render_settings) and the alignment method; an identical
+request gets a server-side copy of the stored video instead of a new alignment
+and encode. Only renders with trusted word timings are stored (see
+alignment_cache.align_cached).
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from app import config
+from app.services.supabase_service import get_supabase_service
+from app.utils.alignment_providers import alignment_method
+from app.utils.disk_cache import file_sha256
+from app.utils.supabase_storage import BUCKETS, get_file_path
+from app.utils.video_generator import render_settings
+from app.utils.thumbnails import METADATA_KEYS, preview_paths
+
+# Bump when rendering changes in a way render_settings doesn't capture
+RENDER_CACHE_VERSION = 1
+CACHE_BUCKET = BUCKETS['videos']
+CACHE_FOLDER = "render-cache"
+# Entries evicted per pass (the rest go on the next store)
+EVICTION_BATCH = 100
+
+
+def render_cache_key(audio_path, lyrics_path, background_path, aspect, quality, engine=None, profile=None):
+    """sha256 identifying the video rendered from these inputs and settings"""
+    lyrics_hash = file_sha256(lyrics_path) if lyrics_path else None
+    payload = {
+        "version": RENDER_CACHE_VERSION,
+        "audio": file_sha256(audio_path),
+        "lyrics": lyrics_hash,
+        "background": file_sha256(background_path),
+        "settings": render_settings(aspect, quality, engine, profile),
+        "alignment": alignment_method(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _copy_previews(supabase, previews, video_path):
+    """
+    Copy preview images (metadata from _upload_previews / a cache entry) next
+    to video_path; returns the metadata for the copies
+    """
+    copied = {"sprite": previews["sprite"]} if previews.get("sprite") else {}
+    for kind, to_path in preview_paths(video_path).items():
+        from_path = previews.get(METADATA_KEYS[kind])
+        if from_path:
+            supabase.copy_file(CACHE_BUCKET, from_path, to_path)
+            copied[METADATA_KEYS[kind]] = to_path
+    return copied
+
+
+def fetch(cache_key, user_id, filename):
+    """
+    Copy a cached render (and its preview images) into the user's videos as
+    `filename`. Returns dict with 'path', 'url', 'bucket' and 'previews'
+    (user_videos.metadata entries), or None on a miss.
+    """
+    supabase = get_supabase_service()
+    entry = supabase.get_render_cache_entry(cache_key)
+    if not entry:
+        return None
+
+    file_path = get_file_path(user_id, filename, 'videos')
+    try:
+        url = supabase.copy_file(CACHE_BUCKET, entry['storage_path'], file_path)
+    except Exception:
+        # Stored video is gone (e.g. evicted meanwhile): drop the entry, render again
+        supabase.delete_render_cache_entry(cache_key)
+        return None
+    try:
+        previews = _copy_previews(supabase, entry.get('previews') or {}, file_path)
+    except Exception as e:
+        print(f"[Render Cache] ⚠️  Could not copy cached previews: {e}")
+        previews = {}
+
+    hit_count = (entry.get('hit_count') or 0) + 1
+    supabase.record_render_cache_hit(cache_key, hit_count)
+    print(f"[Render Cache] ♻️  Reused render {cache_key[:12]} ({hit_count} hits)")
+    return {
+        'path': file_path,
+        'url': url,
+        'bucket': CACHE_BUCKET,
+        'previews': previews
+    }
+
+
+def store(cache_key, video_result, size_bytes, previews=None):
+    """
+    Keep a canonical copy of a freshly uploaded render (video_result from
+    supabase_storage) and its preview images under render-cache/, then evict
+    old entries. Failures are logged only; caching never fails a render.
+    """
+    supabase = get_supabase_service()
+    storage_path = f"{CACHE_FOLDER}/{cache_key}.mp4"
+    try:
+        if supabase.get_render_cache_entry(cache_key):
+            return
+        supabase.copy_file(CACHE_BUCKET, video_result['path'], storage_path)
+        cached_previews = _copy_previews(supabase, previews or {}, storage_path)
+        supabase.create_render_cache_entry(cache_key, storage_path, size_bytes, cached_previews)
+        print(f"[Render Cache] ✅ Cached render {cache_key[:12]} ({size_bytes / 1e6:.1f} MB)")
+    except Exception as e:
+        print(f"[Render Cache] ⚠️  Could not cache render: {e}")
+        return
+    try:
+        evict()
+    except Exception as e:
+        print(f"[Render Cache] ⚠️  Could not evict old renders: {e}")
+
+
+def evict():
+    """
+    Remove entries beyond the RENDER_CACHE_MAX_ENTRIES most recently used,
+    and entries unused for RENDER_CACHE_TTL_DAYS
+    """
+    supabase = get_supabase_service()
+    cutoff = (datetime.utcnow() - timedelta(days=config.RENDER_CACHE_TTL_DAYS)).isoformat()
+    entries = supabase.list_render_cache_entries(offset=config.RENDER_CACHE_MAX_ENTRIES, limit=EVICTION_BATCH)
+    entries += supabase.list_render_cache_entries(limit=EVICTION_BATCH, last_hit_before=cutoff)
+
+    evicted = set()
+    for entry in entries:
+        if entry['cache_key'] in evicted:
+            continue
+        supabase.delete_render_cache_entry(entry['cache_key'])
+        supabase.delete_file(CACHE_BUCKET, entry['storage_path'])
+        for key in METADATA_KEYS.values():
+            if (entry.get('previews') or {}).get(key):
+                supabase.delete_file(CACHE_BUCKET, entry['previews'][key])
+        evicted.add(entry['cache_key'])
+    if evicted:
+        print(f"[Render Cache] Evicted {len(evicted)} cached renders")
@@ -0,0 +1,328 @@
+"""
+Render Jobs
+Runs lyric video renders in a bounded pool of worker processes so API requests
+return immediately. Jobs are tracked in memory (per API process) with their
+stage and progress, which workers report back through a multiprocessing queue.
+If a worker dies (e.g. OOM-killed), the jobs it broke fail and the pool is
+rebuilt for the next submit.
+
+Because job state is in memory, the API must run as a single process (one
+uvicorn worker; scale renders with RENDER_WORKERS instead). claim_api_process
+refuses to start a second one on the same host.
+
+Pre-alignment of newly ingested songs (alignment_cache.prealign_song) runs in
+one more worker process of its own, so its FFTs, model loads and transcription
+waits stay out of both the API process and the render workers.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app import config
+
+JOB_STATES = ("queued", "running", "succeeded", "failed")
+# Pre-alignments allowed to wait; further songs are aligned at their first render
+PREALIGN_QUEUE_MAX = 16
+# Overall progress (0-100) covered by each stage of a lyric video job
+STAGE_PROGRESS = {
+    "downloading": (0, 5),
+    "aligning": (5, 20),
+    "rendering": (20, 90),
+    "uploading": (90, 100),
+}
+
+
+class QueueFullError(Exception):
+    """Raised when RENDER_WORKERS + RENDER_QUEUE_MAX jobs are already active"""
+
+
+class TitleInUseError(Exception):
+    """Raised when one of the user's active jobs is already rendering a video with this title"""
+
+
+_jobs = {}
+_lock = threading.Lock()
+_executor_lock = threading.Lock()
+_executor = None
+_progress_queue = None
+_drain_thread = None
+_api_lock_file = None
+_prealign_executor = None
+_prealign_pending = 0
+
+# Set in worker processes by _init_worker
+_worker_queue = None
+
+
+# ----- worker side -----
+
+def _init_worker(progress_queue):
+    global _worker_queue
+    _worker_queue = progress_queue
+
+
+def _run_lyric_video_job(job_id, request):
+    """Worker entry point: process the request, reporting progress to the API process"""
+    from app.services.video_service import process_lyric_video_request
+
+    def progress(stage, fraction):
+        _worker_queue.put((job_id, stage, fraction))
+
+    return process_lyric_video_request(request, progress=progress)
+
+
+def _run_prealignment(song, audio_bytes, lyrics_text):
+    """Worker entry point for submit_prealignment"""
+    from app.services.alignment_cache import prealign_song
+    return prealign_song(song, audio_bytes, lyrics_text)
+
+
+# ----- API side -----
+
+def claim_api_process():
+    """
+    Make sure this is the only API process serving render jobs (called at
+    startup). Raises RuntimeError when WEB_CONCURRENCY asks for several
+    workers, or another process on this host holds CACHE_DIR/render-jobs.lock.
+    """
+    global _api_lock_file
+    if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        raise RuntimeError("Render jobs are tracked in memory: run a single uvicorn worker "
+                           "(unset WEB_CONCURRENCY) and scale with RENDER_WORKERS")
+    try:
+        import fcntl
+    except ImportError:
+        return  # Windows (local development)
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    lock_file = open(os.path.join(config.CACHE_DIR, "render-jobs.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise RuntimeError("Another API process already serves render jobs on this host: run a single "
+                           "uvicorn worker (no --workers) and scale with RENDER_WORKERS")
+    _api_lock_file = lock_file
+
+
+def _get_executor():
+    global _executor, _progress_queue, _drain_thread
+    with _executor_lock:
+        if _executor is None:
+            # spawn: workers must not inherit the API's event loop and client threads
+            context = multiprocessing.get_context("spawn")
+            _progress_queue = context.Queue()
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, config.RENDER_WORKERS),
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(_progress_queue,)
+            )
+            _drain_thread = threading.Thread(target=_drain_progress, args=(_progress_queue,), daemon=True)
+            _drain_thread.start()
+        return _executor
+
+
+def _discard_executor(executor):
+    """
+    Drop a pool broken by a dead worker (its queued jobs fail with
+    BrokenProcessPool); the next _get_executor builds a fresh one
+    """
+    global _executor, _progress_queue, _drain_thread
+    with _executor_lock:
+        if _executor is not executor:
+            return  # already replaced
+        progress_queue = _progress_queue
+        _executor = _progress_queue = _drain_thread = None
+    print("[Render Jobs] ⚠️  A render worker died; restarting the worker pool")
+    executor.shutdown(wait=False, cancel_futures=True)
+    progress_queue.put(None)  # stops its drain thread
+
+
+def _drain_progress(progress_queue):
+    """Apply progress events from workers to the job registry"""
+    while True:
+        event = progress_queue.get()
+        if event is None:
+            return
+        job_id, stage, fraction = event
+        start, end = STAGE_PROGRESS.get(stage, (0, 100))
+        with _lock:
+            job = _jobs.get(job_id)
+            if job is None or job["state"] in ("succeeded", "failed"):
+                continue
+            if job["state"] == "queued":
+                job["state"] = "running"
+                job["started_at"] = time.time()
+            job["stage"] = stage
+            job["progress"] = max(job["progress"], int(start + (end - start) * min(max(fraction, 0.0), 1.0)))
+
+
+def _on_done(job_id, executor, future):
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _discard_executor(executor)
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job["finished_at"] = time.time()
+        error = RuntimeError("Render queue shut down") if future.cancelled() else future.exception()
+        if error is None:
+            job["state"] = "succeeded"
+            job["progress"] = 100
+            job["result"] = future.result()
+            stats = job["result"].get("render_stats") or {}
+            print(f"[Render Jobs] ✅ Job {job_id} finished in {job['finished_at'] - job['created_at']:.1f}s"
+                  + (f" ({stats['fps']} fps, peak RSS {stats['peak_rss_mb']} MB)" if stats else ""))
+        else:
+            job["state"] = "failed"
+            if isinstance(error, BrokenProcessPool):
+                error = RuntimeError("The render worker stopped unexpectedly (e.g. out of memory)")
+            job["error"] = str(error) or error.__class__.__name__
+            print(f"[Render Jobs] ❌ Job {job_id} failed: {job['error']}")
+
+
+def _prune_finished(now):
+    """Forget finished jobs older than RENDER_JOB_TTL_SECONDS (caller holds _lock)"""
+    for job_id in [
+        job_id for job_id, job in _jobs.items()
+        if job["finished_at"] and now - job["finished_at"] > config.RENDER_JOB_TTL_SECONDS
+    ]:
+        del _jobs[job_id]
+
+
+def _public(job):
+    return {key: value for key, value in job.items() if key not in ("user_id", "title_claim")}
+
+
+def submit_lyric_video_job(user_id, title, request):
+    """
+    Queue a lyric video render (see video_service.process_lyric_video_request).
+    Non-preview jobs reserve the user's (safe) title until they finish.
+    Returns the job dict. Raises QueueFullError if the queue is full, and
+    TitleInUseError if another active job has claimed the title.
+    """
+    now = time.time()
+    title_claim = None if request["quality"] == "preview" else request["safe_title"]
+    with _lock:
+        _prune_finished(now)
+        active_jobs = [job for job in _jobs.values() if job["state"] in ("queued", "running")]
+        if title_claim and any(
+            job["user_id"] == user_id and job["title_claim"] == title_claim for job in active_jobs
+        ):
+            raise TitleInUseError(f"A video titled '{title}' is already rendering")
+        active = len(active_jobs)
+        if active >= max(1, config.RENDER_WORKERS) + config.RENDER_QUEUE_MAX:
+            raise QueueFullError(f"{active} render jobs already queued")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "user_id": user_id,
+            "title": title,
+            "title_claim": title_claim,
+            "state": "queued",
+            "stage": None,
+            "progress": 0,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        _jobs[job_id] = job
+
+    try:
+        executor = _get_executor()
+        try:
+            future = executor.submit(_run_lyric_video_job, job_id, request)
+        except BrokenProcessPool:
+            # A worker died since the last job finished: retry once on a fresh pool
+            _discard_executor(executor)
+            executor = _get_executor()
+            future = executor.submit(_run_lyric_video_job, job_id, request)
+    except Exception:
+        with _lock:
+            del _jobs[job_id]
+        raise
+    future.add_done_callback(lambda f: _on_done(job_id, executor, f))
+    print(f"[Render Jobs] Queued job {job_id} ({title}, {active + 1} active)")
+    return _public(job)
+
+
+def get_job(job_id, user_id):
+    """A copy of the job, or None if it doesn't exist or belongs to another user"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+        return _public(job)
+
+
+def list_jobs(user_id):
+    """The user's jobs, newest first"""
+    with _lock:
+        jobs = [_public(job) for job in _jobs.values() if job["user_id"] == user_id]
+    return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+
+def _on_prealignment_done(future):
+    global _prealign_pending
+    with _lock:
+        _prealign_pending -= 1
+    if not future.cancelled() and future.exception():
+        print(f"[Render Jobs] ⚠️  Pre-alignment failed: {future.exception()}")
+
+
+def submit_prealignment(song, audio_bytes, lyrics_text):
+    """
+    Pre-align a newly stored song (see alignment_cache.prealign_song) in the
+    pre-alignment worker. Returns False if PREALIGN_QUEUE_MAX are already
+    waiting (the song is then aligned at its first render).
+    """
+    global _prealign_executor, _prealign_pending
+    with _lock:
+        if _prealign_pending >= PREALIGN_QUEUE_MAX:
+            print(f"[Render Jobs] ⚠️  {_prealign_pending} pre-alignments pending, skipping '{song['title']}'")
+            return False
+        _prealign_pending += 1
+    try:
+        with _executor_lock:
+            for attempt in range(2):
+                if _prealign_executor is None:
+                    _prealign_executor = ProcessPoolExecutor(
+                        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                    )
+                try:
+                    future = _prealign_executor.submit(_run_prealignment, song, audio_bytes, lyrics_text)
+                    break
+                except BrokenProcessPool:
+                    # Its worker died: start a fresh pool (once)
+                    _prealign_executor.shutdown(wait=False)
+                    _prealign_executor = None
+                    if attempt:
+                        raise
+    except Exception:
+        with _lock:
+            _prealign_pending -= 1
+        raise
+    future.add_done_callback(_on_prealignment_done)
+    return True
+
+
+def shutdown():
+    """Stop the worker pools (waits for running render jobs; pending pre-alignments are dropped)"""
+    global _executor, _progress_queue, _drain_thread, _prealign_executor
+    if _prealign_executor is not None:
+        _prealign_executor.shutdown(wait=False, cancel_futures=True)
+        _prealign_executor = None
+    with _executor_lock:
+        executor, progress_queue, drain_thread = _executor, _progress_queue, _drain_thread
+        _executor = _progress_queue = _drain_thread = None
+    if executor is None:
+        return
+    executor.shutdown(wait=True, cancel_futures=True)
+    progress_queue.put(None)
+    drain_thread.join(timeout=5)
@@ -4,7 +4,7 @@ Handles all Supabase interactions including storage, database, and authenticatio
 """
 from supabase import create_client, Client
 from app.config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, Union
 import os
 from datetime import datetime
 
@@ -26,8 +26,9 @@ class SupabaseService:
         self, 
         bucket: str, 
         file_path: str, 
-        file_content: bytes,
-        content_type: Optional[str] = None
+        file_content: Union[bytes, str],
+        content_type: Optional[str] = None,
+        upsert: bool = False
     ) -> str:
         """
         Upload a file to Supabase storage
@@ -35,8 +36,9 @@ class SupabaseService:
         Args:
             bucket: Storage bucket name (e.g., 'user-songs')
             file_path: Path in bucket (e.g., 'user_id/song.mp3')
-            file_content: File content as bytes
+            file_content: File content as bytes, or a local file path (read from disk)
             content_type: MIME type (e.g., 'audio/mpeg')
+            upsert: Overwrite the file if it already exists
         
         Returns:
             Public URL or storage path
@@ -45,6 +47,8 @@ class SupabaseService:
             options = {}
             if content_type:
                 options['content-type'] = content_type
+            if upsert:
+                options['upsert'] = 'true'
             
             result = self.client.storage.from_(bucket).upload(
                 file_path,
@@ -130,6 +134,50 @@ class SupabaseService:
             # Fallback to public URL
             return self.client.storage.from_(bucket).get_public_url(file_path)
     
+    def copy_file(self, bucket: str, from_path: str, to_path: str) -> str:
+        """
+        Copy a file within a bucket (server-side, no download/upload)
+        
+        Args:
+            bucket: Storage bucket name
+            from_path: Existing path in bucket
+            to_path: New path in bucket (must not exist yet)
+        
+        Returns:
+            Public or signed URL of the copy
+        """
+        try:
+            self.client.storage.from_(bucket).copy(from_path, to_path)
+            return self.get_public_url(bucket, to_path)
+        except Exception as e:
+            print(f"Error copying file {bucket}/{from_path} to {to_path}: {e}")
+            raise
+    
+    def get_signed_urls(self, bucket: str, file_paths: list) -> dict:
+        """
+        Signed URLs (24 hours) for many files of a private bucket in one request
+        
+        Args:
+            bucket: Storage bucket name
+            file_paths: Paths in bucket
+        
+        Returns:
+            dict of path -> URL
+        """
+        if not file_paths:
+            return {}
+        try:
+            result = self.client.storage.from_(bucket).create_signed_urls(file_paths, 86400)  # 24 hours
+            urls = {item['path']: item.get('signedURL') for item in result if not item.get('error')}
+        except Exception as e:
+            print(f"⚠️ Error creating signed URLs in {bucket}: {e}")
+            urls = {}
+        # Anything the batch call missed is signed one by one
+        for file_path in file_paths:
+            if not urls.get(file_path):
+                urls[file_path] = self.get_public_url(bucket, file_path)
+        return urls
+    
     def list_files(self, bucket: str, folder_path: str = "") -> list:
         """
         List files in a bucket folder
@@ -408,6 +456,165 @@ class SupabaseService:
             print(f"Error deleting video record: {e}")
             return False
     
+    # ============================================
+    # DATABASE OPERATIONS - RENDER CACHE
+    # ============================================
+    
+    def get_render_cache_entry(self, cache_key: str) -> Optional[dict]:
+        """
+        Get a render cache entry by its content hash
+        
+        Returns:
+            Cache entry or None
+        """
+        try:
+            result = self.client.table("render_cache")\
+                .select("*")\
+                .eq("cache_key", cache_key)\
+                .execute()
+            
+            return result.data[0] if result.data else None
+        
+        except Exception as e:
+            print(f"Error fetching render cache entry: {e}")
+            return None
+    
+    def create_render_cache_entry(
+        self,
+        cache_key: str,
+        storage_path: str,
+        size_bytes: int,
+        previews: Optional[dict] = None
+    ) -> Optional[dict]:
+        """
+        Create a render cache entry (ignored if the key was cached concurrently)
+        
+        Returns:
+            Created cache entry
+        """
+        try:
+            data = {
+                "cache_key": cache_key,
+                "storage_path": storage_path,
+                "size_bytes": size_bytes,
+                "previews": previews or {}
+            }
+            
+            result = self.client.table("render_cache")\
+                .upsert(data, on_conflict="cache_key", ignore_duplicates=True)\
+                .execute()
+            return result.data[0] if result.data else None
+        
+        except Exception as e:
+            print(f"Error creating render cache entry: {e}")
+            raise
+    
+    def record_render_cache_hit(self, cache_key: str, hit_count: int):
+        """
+        Store a cache entry's new hit count and mark it as recently used
+        """
+        try:
+            self.client.table("render_cache")\
+                .update({"hit_count": hit_count, "last_hit_at": datetime.utcnow().isoformat()})\
+                .eq("cache_key", cache_key)\
+                .execute()
+        except Exception as e:
+            print(f"Error recording render cache hit: {e}")
+    
+    def list_render_cache_entries(self, offset: int = 0, limit: int = 100, last_hit_before: Optional[str] = None) -> list:
+        """
+        List render cache entries, most recently used first
+        
+        Args:
+            offset: Skip this many entries (e.g. the ones to keep)
+            limit: Maximum number of entries
+            last_hit_before: Only entries not used since this ISO timestamp
+        
+        Returns:
+            List of cache entries
+        """
+        try:
+            query = self.client.table("render_cache").select("*")
+            if last_hit_before:
+                query = query.lt("last_hit_at", last_hit_before)
+            result = query\
+                .order("last_hit_at", desc=True)\
+                .range(offset, offset + limit - 1)\
+                .execute()
+            
+            return result.data if result.data else []
+        
+        except Exception as e:
+            print(f"Error listing render cache entries: {e}")
+            return []
+    
+    def delete_render_cache_entry(self, cache_key: str) -> bool:
+        """
+        Delete a render cache entry
+        
+        Returns:
+            True if successful
+        """
+        try:
+            self.client.table("render_cache")\
+                .delete()\
+                .eq("cache_key", cache_key)\
+                .execute()
+            
+            return True
+        
+        except Exception as e:
+            print(f"Error deleting render cache entry: {e}")
+            return False
+    
+    # ============================================
+    # DATABASE OPERATIONS - ALIGNMENT CACHE
+    # ============================================
+    
+    def get_alignment_cache_entry(self, cache_key: str) -> Optional[dict]:
+        """
+        Get cached word timings by their content hash (marks the entry as used)
+        
+        Returns:
+            Cache entry or None
+        """
+        try:
+            result = self.client.table("alignment_cache")\
+                .update({"last_used_at": datetime.utcnow().isoformat()})\
+                .eq("cache_key", cache_key)\
+                .execute()
+            
+            return result.data[0] if result.data else None
+        
+        except Exception as e:
+            print(f"Error fetching alignment cache entry: {e}")
+            return None
+    
+    def create_alignment_cache_entry(self, cache_key: str, method: str, words: list) -> Optional[dict]:
+        """
+        Store word timings ([[start_ms, end_ms, word], ...]) under their content
+        hash (ignored if the key was cached concurrently)
+        
+        Returns:
+            Created cache entry
+        """
+        try:
+            data = {
+                "cache_key": cache_key,
+                "method": method,
+                "words": words,
+                "word_count": len(words)
+            }
+            
+            result = self.client.table("alignment_cache")\
+                .upsert(data, on_conflict="cache_key", ignore_duplicates=True)\
+                .execute()
+            return result.data[0] if result.data else None
+        
+        except Exception as e:
+            print(f"Error creating alignment cache entry: {e}")
+            raise
+    
     # ============================================
     # DATABASE OPERATIONS - USER PROFILES
     # ============================================
@@ -2,42 +2,371 @@ import os
 import uuid
 import tempfile
 import shutil
-from app.utils.aligner import align_audio_with_lyrics
-from app.utils.video_generator import render_lyric_video
+import time
+from concurrent.futures import wait
+from app.utils.video_generator import render_lyric_videos, prepare_render_inputs, DEFAULT_QUALITY, DEFAULT_ASPECT
+from app.utils.thumbnails import preview_paths, METADATA_KEYS as PREVIEW_METADATA_KEYS
+from app.utils.hls import package_hls, hls_folder_for, PLAYLIST_NAME
 from app.utils import storage
+from app.utils import supabase_storage
+from app.services.supabase_service import get_supabase_service
+from app.services import render_cache, alignment_cache
+from app import config
+import requests
 
 FILES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../files"))
 
-def generate_lyric_video_from_files(audio_path, lyrics_path=None, title="song", background_path=None):
+def resolve_background(background_path=None):
+    """Provided background, or the first default background that exists"""
+    if background_path and os.path.exists(background_path):
+        return background_path
+    
+    # Try default backgrounds in order
+    bg_path = os.path.join(storage.get_folder_path('backgrounds'), "bg1.jpg")
+    if not os.path.exists(bg_path):
+        bg_path = os.path.join(FILES_DIR, "default_bg.jpg")
+        if not os.path.exists(bg_path):
+            raise FileNotFoundError("No background image found")
+    return bg_path
+
+
+def generate_lyric_videos_from_files(audio_path, lyrics_path=None, title="song", background_path=None,
+                                     quality=DEFAULT_QUALITY, aspects=(DEFAULT_ASPECT,), sinks=None,
+                                     progress=None, stats=None, previews=False, profile=None, alignment=None):
     """
-    Uses WhisperX alignment + MoviePy rendering to create a lyric video.
-    Returns path to generated .mp4 in temp directory.
+    Aligns lyrics with the audio once and renders a lyric video per aspect ratio
+    ('16:9', '9:16', '1:1') through ffmpeg.
+    sinks: optional {aspect: sink}; those outputs are streamed to sink.write()
+    as fragmented MP4 while encoding (see render_lyric_videos).
+    progress: optional callback(stage, fraction) for 'aligning' / 'rendering'.
+    stats: optional dict, updated with the render stats (fps, peak RSS...).
+    previews: also write poster / sprite / animated images next to each video
+    (their paths are in stats["previews"], see render_lyric_videos).
+    profile: encoding profile (see app/utils/encoding_profiles.py).
+    alignment: optional Future of the (words, cacheable) timings, already in
+    flight (see alignment_cache.align_in_background); waited on instead of
+    aligning here.
+    Returns {aspect: path to generated .mp4} in one temp directory.
     Note: Caller is responsible for cleanup.
     """
     tmpdir = tempfile.mkdtemp()
-    
-    # 1️⃣ Align lyrics with audio
-    print("[Video Service] Aligning lyrics...")
-    fragments = align_audio_with_lyrics(audio_path, lyrics_path)
+    try:
+        # 1️⃣ Align lyrics with audio (or wait for the alignment in flight)
+        if progress:
+            progress("aligning", 0.0)
+        align_start = time.perf_counter()
+        if alignment is not None:
+            print("[Video Service] Waiting for lyric alignment...")
+            fragments, _ = alignment.result()
+        else:
+            print("[Video Service] Aligning lyrics...")
+            fragments, _ = alignment_cache.align_cached(audio_path, lyrics_path)
+        align_seconds = time.perf_counter() - align_start
 
-    # 2️⃣ Generate video
-    output_name = f"{uuid.uuid4().hex}_{title.replace(' ', '_')}.mp4"
-    temp_output = os.path.join(tmpdir, output_name)
-    
-    # Use provided background or default
-    if background_path and os.path.exists(background_path):
-        bg_path = background_path
-    else:
-        # Try default backgrounds in order
-        bg_path = os.path.join(storage.get_folder_path('backgrounds'), "bg1.jpg")
-        if not os.path.exists(bg_path):
-            bg_path = os.path.join(FILES_DIR, "default_bg.jpg")
-            if not os.path.exists(bg_path):
-                raise FileNotFoundError("No background image found")
+        # 2️⃣ Generate videos
+        base_name = f"{uuid.uuid4().hex}_{title.replace(' ', '_')}"
+        outputs = {
+            aspect: os.path.join(tmpdir, f"{base_name}_{aspect.replace(':', 'x')}.mp4")
+            for aspect in aspects
+        }
+        bg_path = resolve_background(background_path)
+
+        print(f"[Video Service] Rendering lyric video ({', '.join(aspects)})...")
+        render_stats = render_lyric_videos(
+            audio_path, fragments, bg_path, outputs, quality=quality, sinks=sinks,
+            progress_callback=(lambda fraction: progress("rendering", fraction)) if progress else None,
+            previews=previews, profile=profile
+        )
+        if stats is not None:
+            stats.update(render_stats)
+            stats["stages"] = {"align": round(align_seconds, 3), **render_stats["stages"]}
+    except Exception:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+    # 3️⃣ Return temp paths (caller will upload to Supabase and then cleanup)
+    print(f"[Video Service] Videos ready in: {tmpdir}")
+    return outputs
+
+
+def generate_lyric_video_from_files(audio_path, lyrics_path=None, title="song", background_path=None,
+                                    quality=DEFAULT_QUALITY, stats=None):
+    """
+    Aligns lyrics with the audio and renders a 16:9 lyric video through ffmpeg.
+    quality: 'preview', 'standard' or 'high' (see video_generator.QUALITY_PRESETS).
+    stats: optional dict, updated with the render stats and stage timings.
+    Returns path to generated .mp4 in temp directory.
+    Note: Caller is responsible for cleanup.
+    """
+    outputs = generate_lyric_videos_from_files(
+        audio_path, lyrics_path, title, background_path, quality, aspects=(DEFAULT_ASPECT,), stats=stats
+    )
+    return outputs[DEFAULT_ASPECT]
 
-    print("[Video Service] Rendering lyric video...")
-    render_lyric_video(audio_path, fragments, bg_path, temp_output)
 
-    # 3️⃣ Return temp path (caller will upload to Supabase and then cleanup)
-    print(f"[Video Service] Video ready at: {temp_output}")
-    return temp_output
+def video_filename_for(safe_title, aspect):
+    """Storage filename of a lyric video; 16:9 keeps the plain title name"""
+    if aspect == DEFAULT_ASPECT:
+        return f"{safe_title}.mp4"
+    return f"{safe_title}_{aspect.replace(':', 'x')}.mp4"
+
+
+def _download_to_temp(url, suffix, timeout):
+    """Download a URL into a temp file (streamed to disk); returns its path"""
+    with requests.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                tmp.write(chunk)
+            return tmp.name
+
+
+def _upload_previews(user_id, video_filename, info):
+    """
+    Upload a video's poster, sprite sheet and animated preview (info from
+    render_lyric_videos) next to it; returns the user_videos.metadata entries
+    """
+    metadata = {"sprite": info["sprite_layout"]} if "sprite_layout" in info else {}
+    for kind, filename in preview_paths(video_filename).items():
+        if kind not in info:
+            continue  # not captured
+        result = supabase_storage.upload_file(
+            user_id=user_id,
+            content_bytes=info[kind],
+            filename=filename,
+            folder_type='videos'
+        )
+        metadata[PREVIEW_METADATA_KEYS[kind]] = result['path']
+    return metadata
+
+
+def _upload_hls(user_id, video_filename, video_path):
+    """
+    Package a finished video as HLS and upload the playlist and segments
+    under the user's hls/ folder; returns the user_videos.metadata entries
+    """
+    folder = hls_folder_for(video_filename)
+    output_dir = tempfile.mkdtemp()
+    try:
+        files = package_hls(video_path, output_dir, segment_seconds=config.HLS_SEGMENT_SECONDS)
+        # Segments first: the playlist only appears once everything it lists exists
+        for name in files[1:] + files[:1]:
+            supabase_storage.upload_file(
+                user_id=user_id,
+                content_bytes=os.path.join(output_dir, name),
+                filename=f"{folder}/{name}",
+                folder_type='videos'
+            )
+        print(f"[Video Service] ✅ HLS: {len(files) - 1} segments in {folder}/")
+        return {"hls_playlist_path": supabase_storage.get_file_path(user_id, f"{folder}/{PLAYLIST_NAME}", 'videos')}
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def process_lyric_video_request(request, progress=None):
+    """
+    Runs a whole /generate-lyric-video request (in a render worker, see
+    services/render_jobs.py): download assets, reuse cached renders (see
+    render_cache.py), align and render the rest, upload, record.
+    When something is left to render, alignment runs in the background while
+    the uploads are opened and the render inputs are prepared.
+    
+    request: dict with user_id, title, safe_title, quality, profile, aspects, song
+    (user_songs record or None), audio_path / background_path (temp files of
+    uploaded assets, or None) and background_filename.
+    progress: optional callback(stage, fraction) - stages are 'downloading',
+    'aligning', 'rendering' and 'uploading'.
+    Returns the API result dict. Temp files are removed when done.
+    """
+    supabase = get_supabase_service()
+    user_id = request["user_id"]
+    song = request.get("song")
+    quality = request["quality"]
+    profile = request.get("profile")
+    is_preview = quality == "preview"
+    audio_path = request.get("audio_path")
+    background_path = request.get("background_path")
+    background_filename = request.get("background_filename")
+    lyrics_path = None
+    alignment = None
+    result_paths = {}
+    render_stats = {}
+    report = progress or (lambda stage, fraction: None)
+    
+    try:
+        # 1️⃣ Download lyrics, song and background
+        report("downloading", 0.0)
+        if song:
+            # Download lyrics if available (small; the alignment needs them)
+            if song.get('lyrics_path'):
+                try:
+                    lyrics_url = supabase.get_public_url('user-lyrics', song['lyrics_path'])
+                    lyrics_path = _download_to_temp(lyrics_url, '.txt', timeout=15)
+                    print(f"✅ Found lyrics for {song['filename']}")
+                except Exception as e:
+                    print(f"⚠️ Could not load lyrics: {e}")
+            
+            # Download song to temp file using signed URL (faster, more reliable)
+            song_url = supabase.get_public_url('user-songs', song['storage_path'])
+            audio_path = _download_to_temp(song_url, '.mp3', timeout=30)
+        
+        if background_filename and not background_path:
+            # Use existing background (from public bucket) - download via HTTP
+            background_url = supabase.get_public_url('backgrounds', background_filename)
+            background_path = _download_to_temp(background_url, '.jpg', timeout=15)
+        
+        # Storage paths (previews overwrite the last preview of this title)
+        video_filenames = {}
+        for aspect in request["aspects"]:
+            video_filename = video_filename_for(request["safe_title"], aspect)
+            video_filenames[aspect] = f"previews/{video_filename}" if is_preview else video_filename
+        
+        # 2️⃣ Reuse identical earlier renders (content-addressed, see render_cache.py)
+        video_results = {}
+        cache_keys = {}
+        if config.RENDER_CACHE_ENABLED and not is_preview:
+            cache_background = resolve_background(background_path)
+            for aspect in request["aspects"]:
+                cache_keys[aspect] = render_cache.render_cache_key(
+                    audio_path, lyrics_path, cache_background, aspect, quality, profile=profile
+                )
+                cached = render_cache.fetch(cache_keys[aspect], user_id, video_filenames[aspect])
+                if cached:
+                    video_results[aspect] = cached
+        aspects_to_render = [aspect for aspect in request["aspects"] if aspect not in video_results]
+        
+        # Something to render: start aligning (cached alignments, e.g. pre-aligned
+        # at ingest, return at once) while the uploads open and inputs are prepared
+        if aspects_to_render:
+            alignment_key = (song.get('metadata') or {}).get('alignment_key') if song else None
+            alignment = alignment_cache.align_in_background(audio_path, lyrics_path, alignment_key)
+        
+        # Stream each video to storage while it encodes (fragmented MP4 + resumable upload)
+        upload_streams = {}
+        if config.STREAM_VIDEO_UPLOADS:
+            upload_streams = {
+                aspect: supabase_storage.open_upload_stream(
+                    user_id=user_id,
+                    filename=video_filenames[aspect],
+                    folder_type='videos',
+                    content_type='video/mp4',
+                    upsert=is_preview
+                )
+                for aspect in aspects_to_render
+            }
+        
+        # 3️⃣ Align and render (one alignment, one audio prep for all aspects)
+        if aspects_to_render:
+            prep_start = time.perf_counter()
+            try:
+                prepare_render_inputs(audio_path, resolve_background(background_path), aspects_to_render, quality)
+            except Exception as e:
+                print(f"⚠️ Could not prepare render inputs: {e}")
+            prep_seconds = time.perf_counter() - prep_start
+            try:
+                result_paths = generate_lyric_videos_from_files(
+                    audio_path,
+                    lyrics_path,
+                    request["safe_title"],
+                    background_path,
+                    quality=quality,
+                    aspects=aspects_to_render,
+                    sinks=upload_streams,
+                    progress=report,
+                    stats=render_stats,
+                    previews=not is_preview,
+                    profile=profile,
+                    alignment=alignment
+                )
+                render_stats["stages"]["prep"] = round(prep_seconds, 3)
+            except Exception:
+                for upload_stream in upload_streams.values():
+                    upload_stream.abort()
+                raise
+        
+        # 4️⃣ Finish uploads (file is read from disk, never held in memory)
+        report("uploading", 0.0)
+        for aspect, result_path in result_paths.items():
+            if aspect in upload_streams:
+                video_result = supabase_storage.finish_upload_stream(upload_streams[aspect], result_path)
+            else:
+                video_result = supabase_storage.upload_file(
+                    user_id=user_id,
+                    content_bytes=result_path,
+                    filename=video_filenames[aspect],
+                    folder_type='videos',
+                    content_type='video/mp4',
+                    upsert=is_preview
+                )
+            
+            # Poster / sprite / animated preview for listing pages (never fails the render)
+            preview_info = render_stats.get("previews", {}).get(result_path)
+            if preview_info:
+                try:
+                    video_result['previews'] = _upload_previews(user_id, video_filenames[aspect], preview_info)
+                except Exception as e:
+                    print(f"⚠️ Could not upload video previews: {e}")
+            
+            # HLS segments + playlist for fast start and seeking (the mp4 stays the fallback)
+            if config.HLS_PACKAGING and not is_preview:
+                try:
+                    video_result['hls'] = _upload_hls(user_id, video_filenames[aspect], result_path)
+                except Exception as e:
+                    print(f"⚠️ Could not package HLS: {e}")
+            
+            # Fallback or stub timings are not worth keeping (the next request realigns)
+            if aspect in cache_keys and alignment.result()[1]:
+                render_cache.store(
+                    cache_keys[aspect], video_result, os.path.getsize(result_path),
+                    previews=video_result.get('previews')
+                )
+            video_results[aspect] = video_result
+        
+        # Create database records
+        videos = []
+        for aspect in request["aspects"]:
+            video_result = video_results[aspect]
+            if not is_preview:
+                supabase.create_video_record(
+                    user_id=user_id,
+                    title=request["title"],
+                    filename=video_filenames[aspect],
+                    storage_path=video_result['path'],
+                    song_id=song['id'] if song else None,
+                    background_path=background_filename,
+                    metadata={
+                        "quality": quality, "profile": profile, "aspect": aspect,
+                        **video_result.get('previews', {}), **video_result.get('hls', {})
+                    }
+                )
+            videos.append({"aspect": aspect, "video_url": video_result['url']})
+        
+        render_stats.pop("previews", None)  # local temp paths
+        return {
+            "status": "success",
+            "video_url": videos[0]['video_url'],
+            "videos": videos,
+            "title": request["title"],
+            "quality": quality,
+            "profile": profile,
+            "render_stats": render_stats or None
+        }
+    
+    finally:
+        # The alignment reads the temp files (and caches its result for next time)
+        if alignment is not None:
+            wait([alignment])
+        
+        # Cleanup temp files
+        for tmp_file in [audio_path, lyrics_path, background_path]:
+            if tmp_file and os.path.exists(tmp_file):
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+        
+        # Cleanup video temp directory (contains every result path)
+        if result_paths:
+            video_tmpdir = os.path.dirname(next(iter(result_paths.values())))
+            shutil.rmtree(video_tmpdir, ignore_errors=True)
+            print("✅ Cleaned up temp video directory")
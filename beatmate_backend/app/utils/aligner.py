@@ -1,8 +1,9 @@
 import os
 import re
-from moviepy.editor import AudioFileClip
+import numpy as np
 from difflib import SequenceMatcher
-from app import config
+from app.utils import assemblyai_client
+from app.utils.vocal_activity import detect_vocal_regions_in_file, vocal_coverage
 
 def clean_word_for_matching(word):
     """
@@ -10,12 +11,137 @@ def clean_word_for_matching(word):
     """
     return re.sub(r'[^\w\s]', '', word.lower()).strip()
 
+# Word sequence alignment (lyrics vs transcript)
+GAP_COST = 1.0  # lyric word not sung / transcript word not in the lyrics
+MISMATCH_COST = 1.0  # different words at the same position (misheard word)
+PARTIAL_MATCH_COST = 0.5  # same first PREFIX_LENGTH letters ("gonna" / "going")
+PREFIX_LENGTH = 3
+# Band half-width around the diagonal, on top of the length difference
+ALIGNMENT_BAND = 64
+
+
+def _token_ids(tokens, vocabulary):
+    return np.array([vocabulary.setdefault(token, len(vocabulary)) for token in tokens], dtype=np.int64)
+
+
+def align_word_sequences(source, target, band=ALIGNMENT_BAND):
+    """
+    Banded Needleman-Wunsch alignment of two lists of normalized words.
+    Rows are filled with NumPy; only cells within `band` (plus the length
+    difference) of the diagonal are computed.
+    
+    Returns list of (source_index, target_index) for aligned pairs (exact,
+    partial or mismatched words), in order. Unpaired words are gaps.
+    """
+    n, m = len(source), len(target)
+    if n == 0 or m == 0:
+        return []
+    
+    words, prefixes = {}, {}
+    source_ids, target_ids = _token_ids(source, words), _token_ids(target, words)
+    source_prefix = _token_ids([w[:PREFIX_LENGTH] for w in source], prefixes)
+    target_prefix = _token_ids([w[:PREFIX_LENGTH] for w in target], prefixes)
+    
+    width = abs(n - m) + band
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0] = np.arange(m + 1) * GAP_COST
+    
+    for i in range(1, n + 1):
+        center = i * m // n
+        lo, hi = max(0, center - width), min(m, center + width)
+        previous, row = cost[i - 1], cost[i]
+        
+        # From above (source word unpaired) or diagonal (pair the two words)
+        best = previous[lo:hi + 1] + GAP_COST
+        first = max(lo, 1)
+        pair_cost = np.where(
+            target_ids[first - 1:hi] == source_ids[i - 1], 0.0,
+            np.where(target_prefix[first - 1:hi] == source_prefix[i - 1], PARTIAL_MATCH_COST, MISMATCH_COST)
+        )
+        diagonal = previous[first - 1:hi] + pair_cost
+        best[first - lo:] = np.minimum(best[first - lo:], diagonal)
+        
+        # From the left (target word unpaired): row[j] = min over k <= j of best[k] + gap * (j - k)
+        steps = np.arange(hi - lo + 1) * GAP_COST
+        row[lo:hi + 1] = np.minimum.accumulate(best - steps) + steps
+    
+    # Trace back from the bottom-right corner
+    pairs = []
+    i, j = n, m
+    while i > 0 and j > 0:
+        if source_ids[i - 1] == target_ids[j - 1]:
+            pair_cost = 0.0
+        elif source_prefix[i - 1] == target_prefix[j - 1]:
+            pair_cost = PARTIAL_MATCH_COST
+        else:
+            pair_cost = MISMATCH_COST
+        
+        # On ties, gaps beat a mismatched pair (a shifted run shouldn't pair up wrong words)
+        paired = cost[i, j] == cost[i - 1, j - 1] + pair_cost
+        if paired and pair_cost < MISMATCH_COST:
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif cost[i, j] == cost[i - 1, j] + GAP_COST:
+            i -= 1
+        elif cost[i, j] == cost[i, j - 1] + GAP_COST:
+            j -= 1
+        else:
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+    
+    pairs.reverse()
+    return pairs
+
+
+def interpolate_missing_timings(timings):
+    """
+    Fill None entries of a list of (start, end) with times spread evenly
+    between the matched neighbours; runs at either end get the median
+    matched word duration. Returns the filled list (all None if none matched).
+    """
+    matched = [timing for timing in timings if timing is not None]
+    if not matched:
+        return timings
+    typical = float(np.median([end - start for start, end in matched]))
+    
+    filled = list(timings)
+    i = 0
+    while i < len(filled):
+        if filled[i] is not None:
+            i += 1
+            continue
+        run_end = i
+        while run_end < len(filled) and filled[run_end] is None:
+            run_end += 1
+        count = run_end - i
+        
+        previous_end = filled[i - 1][1] if i > 0 else None
+        next_start = filled[run_end][0] if run_end < len(filled) else None
+        if previous_end is not None and next_start is not None:
+            step = max(next_start - previous_end, 0.0) / count
+            begin = previous_end
+        elif next_start is not None:
+            begin = max(0.0, next_start - count * typical)
+            step = (next_start - begin) / count
+        else:
+            step = typical
+            begin = previous_end
+        
+        for k in range(count):
+            filled[i + k] = (begin + k * step, begin + (k + 1) * step)
+        i = run_end
+    return filled
+
+
 def map_transcription_to_lyrics(transcribed_words, original_lyrics):
     """
     Map AssemblyAI transcribed words (with timing) to original lyrics (with formatting).
     
-    Simple approach: Use original lyrics in order, with AssemblyAI's timing.
-    Assumes lyrics are mostly correct and in the same order as sung.
+    The two word sequences are aligned (align_word_sequences) on normalized
+    words, so a dropped or extra word in the transcription only affects its
+    own position. Paired lyric words take the timing of their transcribed word;
+    unpaired lyric words get timings interpolated from their neighbours.
+    Transcribed words that aren't in the lyrics are dropped.
     
     Args:
         transcribed_words: List of {"start": float, "end": float, "word": str}
@@ -40,40 +166,34 @@ def map_transcription_to_lyrics(transcribed_words, original_lyrics):
     print(f"[Mapping] Original lyrics: {len(original_words)} words")
     print(f"[Mapping] Transcribed: {len(transcribed_words)} words")
     
-    # Simple approach: Use original words with transcribed timing
-    # Map 1:1 as much as possible
-    mapped_words = []
-    
-    for i, trans_word_obj in enumerate(transcribed_words):
-        if i < len(original_words):
-            # Use original word with transcribed timing
-            mapped_words.append({
-                "start": trans_word_obj["start"],
-                "end": trans_word_obj["end"],
-                "word": original_words[i]  # Use original formatted word!
-            })
-        else:
-            # If we run out of original words, use transcribed
-            mapped_words.append({
-                "start": trans_word_obj["start"],
-                "end": trans_word_obj["end"],
-                "word": trans_word_obj["word"]
-            })
-    
-    # If original has more words than transcribed, add them at the end with estimated timing
-    if len(original_words) > len(transcribed_words):
-        print(f"[Mapping] ⚠️  Original has {len(original_words) - len(transcribed_words)} more words, appending with estimated timing")
-        if mapped_words:
-            last_end = mapped_words[-1]["end"]
-            avg_duration = 0.35
-            
-            for i in range(len(transcribed_words), len(original_words)):
-                mapped_words.append({
-                    "start": last_end,
-                    "end": last_end + avg_duration,
-                    "word": original_words[i]
-                })
-                last_end += avg_duration
+    if not original_words:
+        return transcribed_words
+    
+    pairs = align_word_sequences(
+        [clean_word_for_matching(word) for word in original_words],
+        [clean_word_for_matching(word["word"]) for word in transcribed_words]
+    )
+    
+    timings = [None] * len(original_words)
+    exact = 0
+    for lyric_index, transcript_index in pairs:
+        transcribed = transcribed_words[transcript_index]
+        timings[lyric_index] = (transcribed["start"], transcribed["end"])
+        if clean_word_for_matching(original_words[lyric_index]) == clean_word_for_matching(transcribed["word"]):
+            exact += 1
+    
+    missing = len(original_words) - len(pairs)
+    print(f"[Mapping] Paired {len(pairs)} words ({exact} exact), "
+          f"{missing} interpolated, {len(transcribed_words) - len(pairs)} transcribed words skipped")
+    if not pairs:
+        print("[Mapping] ⚠️  Nothing to pair with, using transcription as-is")
+        return transcribed_words
+    
+    timings = interpolate_missing_timings(timings)
+    mapped_words = [
+        {"start": start, "end": end, "word": word}
+        for word, (start, end) in zip(original_words, timings)
+    ]
     
     print(f"[Mapping] ✅ Mapped {len(mapped_words)} words with original formatting")
     
@@ -143,7 +263,7 @@ def align_lyrics_time_based(lyrics_text, audio_duration):
     
     return word_fragments
 
-def align_with_assemblyai(audio_path, known_lyrics=None, original_lyrics_text=None):
+def align_with_assemblyai(audio_path, known_lyrics=None, original_lyrics_text=None, cancel=None):
     """
     Use AssemblyAI to get word-level timestamps from audio.
     
@@ -151,40 +271,24 @@ def align_with_assemblyai(audio_path, known_lyrics=None, original_lyrics_text=No
     - Get accurate timing from AssemblyAI transcription
     - If original_lyrics_text provided, map timing to original formatted words
     
+    cancel: optional threading.Event; once set, no transcript is submitted and
+    polling stops.
+    
     Returns list of {"start": float, "end": float, "word": "..."}.
     """
     try:
-        import assemblyai as aai
-        
         print("[AssemblyAI] 🎯 Using AssemblyAI for word-level timestamps...")
         
-        # Configure API
-        aai.settings.api_key = config.ASSEMBLYAI_API_KEY
-        
-        # Configure transcription with word-level timestamps
-        transcription_config = aai.TranscriptionConfig(
-            speech_model=aai.SpeechModel.best,  # Use best model for accuracy
-        )
-        
-        # Transcribe
+        # Upload, submit and poll (async client, see assemblyai_client.py)
         print(f"[AssemblyAI] Transcribing: {audio_path}")
-        transcriber = aai.Transcriber(config=transcription_config)
-        transcript = transcriber.transcribe(audio_path)
-        
-        if transcript.status == aai.TranscriptStatus.error:
-            print(f"[AssemblyAI] ❌ Error: {transcript.error}")
+        try:
+            word_fragments = assemblyai_client.transcribe(audio_path, cancel)
+        except assemblyai_client.TranscriptionError as e:
+            print(f"[AssemblyAI] ❌ Error: {e}")
             return None
         
-        # Get word-level timestamps
-        word_fragments = []
-        if transcript.words:
-            for word_obj in transcript.words:
-                word_fragments.append({
-                    "start": word_obj.start / 1000.0,  # Convert ms to seconds
-                    "end": word_obj.end / 1000.0,
-                    "word": word_obj.text
-                })
-            
+        # Word-level timestamps (seconds)
+        if word_fragments:
             print(f"[AssemblyAI] ✅ Got {len(word_fragments)} word timestamps from transcription")
             
             # NEW: If we have original lyrics, map timing to original words
@@ -204,81 +308,56 @@ def align_with_assemblyai(audio_path, known_lyrics=None, original_lyrics_text=No
         print(f"[AssemblyAI] ⚠️  Error: {e}")
         return None
 
-def align_audio_with_lyrics(audio_path, lyrics_txt_path=None):
+def check_against_vocal_activity(audio_path, word_fragments):
     """
-    Align lyrics with audio using the best available method.
-    
-    Priority order:
-    1. AssemblyAI (professional, accurate word-level timestamps)
-    2. Time-based distribution (simple fallback)
-    3. WhisperX (last resort for transcription)
-    
-    Returns list of {"start": float, "end": float, "word": "..."}.
+    Sanity check of a cloud alignment: logs how much of the words' time falls
+    in the locally detected vocal regions (low coverage = suspicious timings).
     """
-    
-    # Read known lyrics if available
-    known_lyrics = None
-    original_lyrics_text = None
-    
-    if lyrics_txt_path and os.path.exists(lyrics_txt_path):
-        print(f"[Alignment] 🎯 Found lyrics file: {lyrics_txt_path}")
-        try:
-            with open(lyrics_txt_path, 'r', encoding='utf-8') as f:
-                original_lyrics_text = f.read().strip()  # Keep original formatting!
-            known_lyrics = clean_lyrics_for_alignment(original_lyrics_text)
-            print(f"[Alignment] Loaded {len(known_lyrics.split())} words from lyrics file")
-        except Exception as e:
-            print(f"[Alignment] ⚠️  Could not read lyrics file: {e}")
-            known_lyrics = None
-            original_lyrics_text = None
-    
-    # METHOD 1: AssemblyAI (BEST - Professional word-level timestamps) ☁️
-    if known_lyrics:
-        print("[Alignment] 🚀 Trying AssemblyAI with original lyrics mapping...")
-        result = align_with_assemblyai(audio_path, known_lyrics, original_lyrics_text)
-        if result:
-            return result
-        print("[Alignment] ⚠️  AssemblyAI failed, trying time-based fallback...")
+    try:
+        regions = detect_vocal_regions_in_file(audio_path)
+    except Exception as e:
+        print(f"[Alignment] ⚠️  Vocal-activity check skipped: {e}")
+        return None
+    if not regions:
+        return None
+    coverage = vocal_coverage(word_fragments, regions)
+    if coverage < 0.5:
+        print(f"[Alignment] ⚠️  Only {coverage:.0%} of the aligned words fall in detected vocal regions")
     else:
-        # For uploaded songs without lyrics, still try AssemblyAI for transcription
-        print("[Alignment] 📝 No lyrics file, using AssemblyAI for transcription...")
-        result = align_with_assemblyai(audio_path, known_lyrics=None, original_lyrics_text=None)
-        if result:
-            return result
-        print("[Alignment] ⚠️  AssemblyAI failed, trying WhisperX fallback...")
-    
-    # METHOD 2: Time-Based Distribution (FALLBACK for known lyrics) 🎵
-    if known_lyrics:
-        print("[Alignment] Using time-based distribution as fallback...")
-        try:
-            audio_clip = AudioFileClip(audio_path)
-            audio_duration = audio_clip.duration
-            audio_clip.close()
-            
-            word_fragments = align_lyrics_time_based(known_lyrics, audio_duration)
-            if word_fragments:
-                return word_fragments
-        except Exception as e:
-            print(f"[Alignment] ⚠️  Time-based failed: {e}")
-    
-    # METHOD 3: WhisperX Transcription (LAST RESORT) 📝
-    print("[WhisperX] 📝 Last resort: WhisperX transcription...")
+        print(f"[Alignment] ✅ {coverage:.0%} of the aligned words fall in detected vocal regions")
+    return coverage
+
+def align_with_whisperx(audio_path, cancel=None):
+    """
+    Transcribe audio_path locally with WhisperX (models stay warm between
+    calls, see whisperx_models.py).
+    cancel: optional threading.Event; once set, the run stops before its next
+    model step (a step in progress can't be interrupted).
+    
+    Returns list of {"start": float, "end": float, "word": "..."}, or None.
+    """
+    print("[WhisperX] 📝 Transcribing with WhisperX...")
     try:
         import whisperx
-        import torch
+        from app.utils.whisperx_models import get_whisperx_pool
         
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"[WhisperX] Using device: {device}")
-
-        model = whisperx.load_model("small", device, compute_type="float32")
         audio = whisperx.load_audio(audio_path)
+        
+        # Models stay loaded between alignments (see whisperx_models.py)
+        with get_whisperx_pool().session() as models:
+            if cancel is not None and cancel.is_set():
+                print("[WhisperX] Cancelled")
+                return None
+            print(f"[WhisperX] Using device: {models.device}")
+            result = models.asr_model().transcribe(audio)
+            detected_language = result.get("language", "en")
+            print(f"[WhisperX] Detected language: {detected_language}")
+            if cancel is not None and cancel.is_set():
+                print("[WhisperX] Cancelled")
+                return None
 
-        result = model.transcribe(audio)
-        detected_language = result.get("language", "en")
-        print(f"[WhisperX] Detected language: {detected_language}")
-
-        align_model, metadata = whisperx.load_align_model(language_code=detected_language, device=device)
-        result_aligned = whisperx.align(result["segments"], align_model, metadata, audio, device)
+            align_model, metadata = models.align_model(detected_language)
+            result_aligned = whisperx.align(result["segments"], align_model, metadata, audio, models.device)
 
         word_fragments = []
         for seg in result_aligned["segments"]:
@@ -299,6 +378,50 @@ def align_audio_with_lyrics(audio_path, lyrics_txt_path=None):
         return word_fragments
         
     except Exception as e:
-        print(f"[WhisperX] ⚠️  WhisperX also failed: {e}")
-        print("[Alignment] ❌ All methods failed, returning empty list")
-        return []
+        print(f"[WhisperX] ⚠️  WhisperX failed: {e}")
+        return None
+
+def read_lyrics_file(lyrics_txt_path):
+    """Original lyrics text (formatting kept), or None if there is no readable file"""
+    if not lyrics_txt_path or not os.path.exists(lyrics_txt_path):
+        return None
+    print(f"[Alignment] 🎯 Found lyrics file: {lyrics_txt_path}")
+    try:
+        with open(lyrics_txt_path, 'r', encoding='utf-8') as f:
+            original_lyrics_text = f.read().strip()  # Keep original formatting!
+        print(f"[Alignment] Loaded {len(clean_lyrics_for_alignment(original_lyrics_text).split())} words from lyrics file")
+        return original_lyrics_text or None
+    except Exception as e:
+        print(f"[Alignment] ⚠️  Could not read lyrics file: {e}")
+        return None
+
+def align_audio_with_lyrics(audio_path, lyrics_txt_path=None):
+    """
+    Align lyrics with audio using the best available method (see align_audio).
+    
+    Returns list of {"start": float, "end": float, "word": "..."}.
+    """
+    word_fragments, _ = align_audio(audio_path, lyrics_txt_path)
+    return word_fragments
+
+def align_audio(audio_path, lyrics_txt_path=None):
+    """
+    Align lyrics with audio using the configured alignment providers, in order
+    (see alignment_providers.py). The default order follows ALIGNMENT_MODE:
+    
+    'auto':  AssemblyAI -> vocal activity -> time-based -> WhisperX
+    'local': vocal activity -> time-based -> AssemblyAI -> WhisperX
+    'time':  time-based -> AssemblyAI -> WhisperX
+    
+    Lyrics-only providers (vocal activity, time-based) are skipped when there
+    is no lyrics file. ALIGNMENT_PROVIDERS overrides the order.
+    
+    Returns (word fragments, method): fragments are {"start": float,
+    "end": float, "word": "..."}, method is the provider name ('assemblyai',
+    'vocal', 'time', 'whisperx', 'stub') or None when every provider failed.
+    """
+    # Providers are built on this module's aligners
+    from app.utils.alignment_providers import align_with_providers
+    
+    word_fragments, method, _ = align_with_providers(audio_path, read_lyrics_file(lyrics_txt_path))
+    return word_fragments, method
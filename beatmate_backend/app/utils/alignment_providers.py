@@ -0,0 +1,266 @@
+"""
+Alignment Providers
+Each way of getting word timings (AssemblyAI, the offline vocal-activity and
+time-based aligners, WhisperX, recorded fixtures) is an AlignmentProvider.
+align_with_providers tries the configured providers in order, each with its
+own timeout, until one returns words. A provider that times out is told to
+stop (the cancel event) and is skipped until its late run has finished.
+
+The order comes from ALIGNMENT_PROVIDERS (e.g. 'stub,time' on an air-gapped
+box) or, by default, from ALIGNMENT_MODE (DEFAULT_ORDERS). Timeouts default to
+DEFAULT_TIMEOUTS and can be overridden with ALIGNMENT_TIMEOUTS.
+
+The 'stub' provider replays recorded timings from files/alignments/*.json
+(matched by the audio's sha256), so the whole pipeline can run without
+network access; benchmarks/alignment_harness.py records fixtures and compares
+providers' latency and failure rates.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Protocol, runtime_checkable
+from app import config
+from app.utils.aligner import (
+    align_lyrics_time_based, align_with_assemblyai, align_with_whisperx,
+    check_against_vocal_activity, clean_lyrics_for_alignment,
+)
+from app.utils.disk_cache import file_sha256
+from app.utils.media_probe import probe_duration
+from app.utils.vocal_activity import align_lyrics_vocal_activity
+
+FIXTURES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../files/alignments"))
+
+DEFAULT_ORDERS = {
+    "auto": ["assemblyai", "vocal", "time", "whisperx"],
+    "local": ["vocal", "time", "assemblyai", "whisperx"],
+    "time": ["time", "assemblyai", "whisperx"],
+}
+DEFAULT_TIMEOUTS = {
+    "assemblyai": 660,
+    "vocal": 60,
+    "time": 10,
+    "whisperx": 900,
+    "stub": 10,
+}
+
+# Cache policies (see alignment_cache.align_cached)
+CACHE_ALWAYS = "always"  # slow or paid: always worth keeping
+CACHE_PRIMARY = "primary"  # kept unless it stood in for an earlier provider that failed
+CACHE_NEVER = "never"  # instant to recompute
+
+
+@runtime_checkable
+class AlignmentProvider(Protocol):
+    """Source of word timings for a song"""
+
+    name: str
+    needs_lyrics: bool  # skipped for songs without a lyrics file
+    cache_policy: str
+
+    def align(self, audio_path: str, lyrics_text: Optional[str],
+              cancel: Optional[threading.Event] = None) -> Optional[list]:
+        """
+        Word timings [{"start", "end", "word"}, ...] or None; lyrics_text keeps
+        its [Verse] markers. cancel is set when the caller has given up (timed
+        out): slow providers should stop at their next check.
+        """
+        ...
+
+
+class AssemblyAIProvider:
+    name = "assemblyai"
+    needs_lyrics = False
+    cache_policy = CACHE_ALWAYS
+
+    def align(self, audio_path, lyrics_text, cancel=None):
+        known_lyrics = clean_lyrics_for_alignment(lyrics_text) if lyrics_text else None
+        words = align_with_assemblyai(audio_path, known_lyrics, lyrics_text, cancel=cancel)
+        if words and lyrics_text:
+            check_against_vocal_activity(audio_path, words)
+        return words
+
+
+class VocalActivityProvider:
+    name = "vocal"
+    needs_lyrics = True
+    cache_policy = CACHE_PRIMARY
+
+    def align(self, audio_path, lyrics_text, cancel=None):
+        return align_lyrics_vocal_activity(lyrics_text, audio_path)
+
+
+class TimeBasedProvider:
+    name = "time"
+    needs_lyrics = True
+    cache_policy = CACHE_NEVER
+
+    def align(self, audio_path, lyrics_text, cancel=None):
+        return align_lyrics_time_based(clean_lyrics_for_alignment(lyrics_text), probe_duration(audio_path))
+
+
+class WhisperXProvider:
+    name = "whisperx"
+    needs_lyrics = False
+    cache_policy = CACHE_ALWAYS
+
+    def align(self, audio_path, lyrics_text, cancel=None):
+        return align_with_whisperx(audio_path, cancel=cancel)
+
+
+class StubProvider:
+    """Replays recorded word timings (fixtures_dir/*.json) for known audio"""
+
+    name = "stub"
+    needs_lyrics = False
+    cache_policy = CACHE_NEVER
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        self._fixtures = None
+
+    def fixtures(self):
+        """{audio sha256: fixture path}"""
+        if self._fixtures is None:
+            self._fixtures = {}
+            for path in sorted(glob.glob(os.path.join(self.fixtures_dir, "*.json"))):
+                with open(path, "r", encoding="utf-8") as f:
+                    self._fixtures[json.load(f)["audio_sha256"]] = path
+        return self._fixtures
+
+    def align(self, audio_path, lyrics_text, cancel=None):
+        path = self.fixtures().get(file_sha256(audio_path))
+        if not path:
+            print(f"[Stub Alignment] ⚠️  No recorded timings for {os.path.basename(audio_path)}")
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        print(f"[Stub Alignment] ♻️  Replaying {fixture['method']} timings from {os.path.basename(path)}")
+        return [{"start": start / 1000.0, "end": end / 1000.0, "word": word} for start, end, word in fixture["words"]]
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+# Threads of timed-out runs, by provider name (skipped while still running)
+_late_runs = {}
+
+
+def register_provider(provider):
+    """Make a provider available by name (replaces one with the same name)"""
+    if not isinstance(provider, AlignmentProvider):
+        raise TypeError(f"{provider!r} is not an AlignmentProvider")
+    with _providers_lock:
+        _providers[provider.name] = provider
+
+
+for _provider in (AssemblyAIProvider(), VocalActivityProvider(), TimeBasedProvider(),
+                  WhisperXProvider(), StubProvider()):
+    register_provider(_provider)
+
+
+def get_provider(name):
+    try:
+        return _providers[name]
+    except KeyError:
+        raise ValueError(f"Unknown alignment provider '{name}'. Choose from: {', '.join(_providers)}")
+
+
+def provider_names():
+    """Configured provider order"""
+    if config.ALIGNMENT_PROVIDERS:
+        return [name.strip().lower() for name in config.ALIGNMENT_PROVIDERS.split(",") if name.strip()]
+    return DEFAULT_ORDERS.get(config.ALIGNMENT_MODE, DEFAULT_ORDERS["auto"])
+
+
+def alignment_method():
+    """
+    Configured alignment method for cache keys: the explicit provider order, or
+    ALIGNMENT_MODE (so e.g. stub timings never stand in for real ones)
+    """
+    if config.ALIGNMENT_PROVIDERS:
+        return ",".join(provider_names())
+    return config.ALIGNMENT_MODE
+
+
+def providers_for(has_lyrics):
+    """Providers to try, in order, for a song with or without a lyrics file"""
+    providers = [get_provider(name) for name in provider_names()]
+    return [p for p in providers if has_lyrics or not p.needs_lyrics]
+
+
+def provider_timeout(name):
+    """Seconds a provider may run (ALIGNMENT_TIMEOUTS overrides DEFAULT_TIMEOUTS)"""
+    overrides = {}
+    for item in config.ALIGNMENT_TIMEOUTS.split(","):
+        key, _, value = item.partition("=")
+        if value.strip():
+            overrides[key.strip().lower()] = float(value)
+    return overrides.get(name, DEFAULT_TIMEOUTS.get(name, 300))
+
+
+def run_provider(provider, audio_path, lyrics_text, timeout=None):
+    """
+    Run one provider with a timeout.
+    Returns (words or None, status, seconds); status is 'ok', 'empty',
+    'error', 'timeout' or 'busy'. A timed-out run is cancelled (see
+    AlignmentProvider.align) and its result ignored; until its thread has
+    finished, the provider is skipped ('busy') so late runs don't pile up.
+    """
+    timeout = timeout or provider_timeout(provider.name)
+    with _providers_lock:
+        late_run = _late_runs.get(provider.name)
+        if late_run is not None and not late_run.is_alive():
+            del _late_runs[provider.name]
+            late_run = None
+    if late_run is not None:
+        print(f"[Alignment] ⚠️  {provider.name} skipped: a timed-out run is still finishing")
+        return None, "busy", 0.0
+
+    future = Future()
+    cancel = threading.Event()
+
+    def run():
+        try:
+            future.set_result(provider.align(audio_path, lyrics_text, cancel=cancel))
+        except BaseException as e:
+            future.set_exception(e)
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=run, daemon=True, name=f"align-{provider.name}")
+    thread.start()
+    try:
+        words = future.result(timeout=timeout)
+        status = "ok" if words else "empty"
+    except FutureTimeoutError:
+        words, status = None, "timeout"
+        cancel.set()
+        with _providers_lock:
+            _late_runs[provider.name] = thread
+        print(f"[Alignment] ⚠️  {provider.name} timed out after {timeout:.0f}s (cancelled)")
+    except Exception as e:
+        words, status = None, "error"
+        print(f"[Alignment] ⚠️  {provider.name} failed: {e}")
+    return words or None, status, time.perf_counter() - start
+
+
+def align_with_providers(audio_path, lyrics_text=None):
+    """
+    Word timings from the first configured provider that returns some.
+    lyrics_text: original lyrics (with section markers), or None.
+    Returns (words, provider name, cacheable); ([], None, False) if all fail.
+    """
+    providers = providers_for(bool(lyrics_text))
+    for index, provider in enumerate(providers):
+        print(f"[Alignment] 🚀 Trying {provider.name}...")
+        words, status, seconds = run_provider(provider, audio_path, lyrics_text)
+        if words:
+            print(f"[Alignment] ✅ {provider.name}: {len(words)} words in {seconds:.1f}s")
+            cacheable = provider.cache_policy == CACHE_ALWAYS or (
+                provider.cache_policy == CACHE_PRIMARY and index == 0
+            )
+            return words, provider.name, cacheable
+        print(f"[Alignment] ⚠️  {provider.name} gave no words ({status}, {seconds:.1f}s)")
+    print("[Alignment] ❌ All providers failed, returning empty list")
+    return [], None, False
@@ -0,0 +1,134 @@
+"""
+ASS Renderer
+Alternative lyric video engine: writes the text segments as an ASS subtitle
+script and burns it into the background with ffmpeg's libass filter, in one
+ffmpeg process with no per-frame Python work.
+"""
+import os
+import tempfile
+import numpy as np
+from app.utils.text_raster import load_font, wrap_lines_to_width
+from app.utils.frame_scheduler import FADE_DURATION
+from app.utils.ffmpeg_tools import run_ffmpeg, run_ffmpeg_to_sink
+
+ASS_STYLE_FORMAT = (
+    "Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+    "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, "
+    "Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding"
+)
+ASS_EVENT_FORMAT = "Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+# Same text area as the frames engine: 85% of the frame width, centered
+TEXT_WIDTH = 0.85
+
+
+def ass_timestamp(seconds):
+    """ASS time (H:MM:SS.cc)"""
+    centiseconds = max(0, int(round(seconds * 100)))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def escape_ass_text(text):
+    """Lyrics as literal ASS text (backslashes and braces would start override tags)"""
+    return text.replace("\\", "/").replace("{", "(").replace("}", ")")
+
+
+def build_ass_script(captions, resolution, layout, font_path, fade_duration=FADE_DURATION):
+    """
+    ASS script for captions ((start, end, lines) tuples), styled like the frames
+    engine: bold white text, black outline, centered, faded in and out.
+    Lines are re-wrapped to the text width with the same font metrics.
+    """
+    width, height = resolution
+    font = load_font(font_path, layout["fontsize"])
+    font_name, font_style = font.getname() if font_path else ("Sans", "Bold")
+    ascent, descent = font.getmetrics()
+    outline = max(1, int(round(layout["stroke_width"] / 2)))
+    margin = int(round(width * (1 - TEXT_WIDTH) / 2))
+
+    # libass sizes fonts by line height (ascent + descent), Pillow by em size
+    style = ",".join(str(value) for value in [
+        "Lyrics", font_name, ascent + descent,
+        "&H00FFFFFF", "&H00FFFFFF", "&H00000000", "&H00000000",
+        -1 if "Bold" in font_style else 0, 0, 0, 0,
+        100, 100, 0, 0,
+        1, outline, 0,
+        5, margin, margin, 0, 1,
+    ])
+
+    events = []
+    for start, end, lines in captions:
+        lines = wrap_lines_to_width(lines, font, width - 2 * margin, outline)
+        fade_ms = int(min(fade_duration, (end - start) / 2) * 1000)
+        text = "\\N".join(escape_ass_text(line) for line in lines)
+        events.append(
+            f"Dialogue: 0,{ass_timestamp(start)},{ass_timestamp(end)},Lyrics,,0,0,0,,"
+            f"{{\\fad({fade_ms},{fade_ms})}}{text}"
+        )
+
+    return "\n".join([
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        f"Format: {ASS_STYLE_FORMAT}",
+        f"Style: {style}",
+        "",
+        "[Events]",
+        f"Format: {ASS_EVENT_FORMAT}",
+        *events,
+        "",
+    ])
+
+
+def _filter_path(path):
+    """Escape a path for use as a filter option value"""
+    return path.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+
+def render_ass_video(captions, background, output_path, resolution, layout, font_path,
+                     fps, total_frames, video_args, audio_path, sink=None):
+    """
+    Burn captions into `background` (an RGB frame of `resolution`) with libass
+    and encode it together with audio_path (stream-copied) in a single ffmpeg run.
+    video_args: video encoder arguments (see encoding_profiles.video_encoder_args).
+    The background is sent once over stdin and repeated by the loop filter.
+    With a sink, the output is a fragmented MP4 streamed to the sink.
+    """
+    width, height = resolution
+    script = build_ass_script(captions, resolution, layout, font_path)
+    with tempfile.NamedTemporaryFile("w", suffix=".ass", delete=False, encoding="utf-8") as f:
+        f.write(script)
+        script_path = f.name
+
+    ass_filter = f"ass=filename='{_filter_path(script_path)}'"
+    if font_path:
+        ass_filter += f":fontsdir='{_filter_path(os.path.dirname(font_path))}'"
+
+    args = [
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+        "-framerate", str(fps), "-i", "pipe:0",
+        "-i", audio_path,
+        "-filter_complex",
+        f"[0:v]loop=loop=-1:size=1:start=0,setpts=N/({fps}*TB),{ass_filter}[v]",
+        "-map", "[v]", "-map", "1:a:0",
+        "-frames:v", str(total_frames), "-r", str(fps),
+        *video_args,
+        "-c:a", "copy",
+    ]
+    frame = np.ascontiguousarray(background, dtype=np.uint8).tobytes()
+    try:
+        if sink is not None:
+            run_ffmpeg_to_sink(args, output_path, sink, input=frame)
+        else:
+            if os.path.splitext(output_path)[1].lower() in (".mp4", ".m4v", ".mov"):
+                args += ["-movflags", "+faststart"]
+            run_ffmpeg(args + [output_path], input=frame)
+    finally:
+        os.remove(script_path)
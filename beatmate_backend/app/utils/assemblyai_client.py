@@ -0,0 +1,163 @@
+"""
+AssemblyAI Client
+Async transcription client (httpx) for word-level timestamps: the audio is
+streamed to /upload, the transcript is submitted, and completion is awaited by
+polling with exponential backoff. With ASSEMBLYAI_WEBHOOK_URL set, AssemblyAI
+also calls /webhook/assemblyai when the transcript is done; the endpoint drops
+a marker file (see notify_completed) that wakes waiters on the same host right
+away, so polls can back off further without adding latency. A cancel event
+(set when the caller has given up) stops the client before it submits a
+transcript or at its next poll.
+"""
+import asyncio
+import os
+import time
+import httpx
+from app import config
+
+API_BASE = "https://api.assemblyai.com/v2"
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+POLL_INITIAL_SECONDS = 1.0
+POLL_BACKOFF = 1.5
+POLL_MAX_SECONDS = 10.0
+POLL_MAX_WITH_WEBHOOK_SECONDS = 30.0  # the webhook marker normally wakes us first
+MARKER_CHECK_SECONDS = 0.25
+
+
+class TranscriptionError(Exception):
+    """Raised when AssemblyAI rejects, fails or times out a transcription"""
+
+
+def _marker_dir():
+    return os.path.join(config.CACHE_DIR, "assemblyai")
+
+
+def notify_completed(transcript_id):
+    """
+    Record that a transcript finished (called by the webhook endpoint).
+    Markers no waiter took (the poll saw the transcript done before the
+    webhook arrived) are pruned once older than the longest wait.
+    """
+    os.makedirs(_marker_dir(), exist_ok=True)
+    _prune_markers(time.time() - config.ASSEMBLYAI_TIMEOUT_SECONDS)
+    with open(os.path.join(_marker_dir(), os.path.basename(transcript_id)), "w") as f:
+        f.write(str(time.time()))
+
+
+def _prune_markers(cutoff):
+    """Remove markers written before cutoff (a Unix time)"""
+    with os.scandir(_marker_dir()) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass  # taken by a waiter meanwhile
+
+
+def _take_marker(transcript_id):
+    """True (and the marker is removed) if the webhook reported this transcript"""
+    try:
+        os.remove(os.path.join(_marker_dir(), os.path.basename(transcript_id)))
+        return True
+    except OSError:
+        return False
+
+
+def _check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise TranscriptionError("Cancelled (the caller timed out)")
+
+
+async def _read_chunks(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+class AssemblyAIClient:
+    """Thin async wrapper around the AssemblyAI v2 REST API"""
+
+    def __init__(self, api_key=None, webhook_url=None, timeout_seconds=None):
+        self.api_key = api_key or config.ASSEMBLYAI_API_KEY
+        self.webhook_url = webhook_url if webhook_url is not None else config.ASSEMBLYAI_WEBHOOK_URL
+        self.timeout_seconds = timeout_seconds or config.ASSEMBLYAI_TIMEOUT_SECONDS
+        if not self.api_key:
+            raise TranscriptionError("ASSEMBLYAI_API_KEY is not set")
+
+    def _client(self):
+        return httpx.AsyncClient(
+            base_url=API_BASE,
+            headers={"authorization": self.api_key},
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+
+    async def upload(self, client, audio_path):
+        """Stream a local file to AssemblyAI; returns its upload URL"""
+        response = await client.post("/upload", content=_read_chunks(audio_path))
+        response.raise_for_status()
+        return response.json()["upload_url"]
+
+    async def submit(self, client, audio_url):
+        """Queue a transcript for audio_url; returns the transcript id"""
+        body = {"audio_url": audio_url, "speech_model": "best"}
+        if self.webhook_url:
+            body["webhook_url"] = self.webhook_url
+            if config.ASSEMBLYAI_WEBHOOK_SECRET:
+                body["webhook_auth_header_name"] = "X-Webhook-Secret"
+                body["webhook_auth_header_value"] = config.ASSEMBLYAI_WEBHOOK_SECRET
+        response = await client.post("/transcript", json=body)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def wait(self, client, transcript_id, cancel=None):
+        """Poll (with backoff, woken early by the webhook marker) until the transcript is done"""
+        deadline = time.monotonic() + self.timeout_seconds
+        max_interval = POLL_MAX_WITH_WEBHOOK_SECONDS if self.webhook_url else POLL_MAX_SECONDS
+        interval = POLL_INITIAL_SECONDS
+        while True:
+            response = await client.get(f"/transcript/{transcript_id}")
+            response.raise_for_status()
+            transcript = response.json()
+            if transcript["status"] == "completed":
+                _take_marker(transcript_id)
+                return transcript
+            if transcript["status"] == "error":
+                _take_marker(transcript_id)
+                raise TranscriptionError(transcript.get("error") or "Transcription failed")
+
+            if time.monotonic() + interval > deadline:
+                raise TranscriptionError(f"Transcript {transcript_id} not done after {self.timeout_seconds}s")
+            wake = time.monotonic() + interval
+            while time.monotonic() < wake and not _take_marker(transcript_id):
+                _check_cancelled(cancel)
+                await asyncio.sleep(MARKER_CHECK_SECONDS)
+            interval = min(interval * POLL_BACKOFF, max_interval)
+
+    async def transcribe(self, audio_path, cancel=None):
+        """
+        Upload, submit and await a transcription of audio_path.
+        cancel: optional threading.Event; once set, TranscriptionError is raised.
+        Returns list of {"start": float, "end": float, "word": "..."}.
+        """
+        async with self._client() as client:
+            start = time.perf_counter()
+            audio_url = await self.upload(client, audio_path)
+            _check_cancelled(cancel)
+            transcript_id = await self.submit(client, audio_url)
+            print(f"[AssemblyAI] Submitted transcript {transcript_id} "
+                  f"(uploaded in {time.perf_counter() - start:.1f}s)")
+            transcript = await self.wait(client, transcript_id, cancel)
+            print(f"[AssemblyAI] Transcript {transcript_id} done in {time.perf_counter() - start:.1f}s")
+        return [
+            {"start": word["start"] / 1000.0, "end": word["end"] / 1000.0, "word": word["text"]}
+            for word in transcript.get("words") or []
+        ]
+
+
+def transcribe(audio_path, cancel=None):
+    """Blocking transcription of audio_path (see AssemblyAIClient.transcribe)"""
+    return asyncio.run(AssemblyAIClient().transcribe(audio_path, cancel))
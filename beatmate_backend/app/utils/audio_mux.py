@@ -0,0 +1,80 @@
+"""
+Audio Mux Stage
+Attaches the song audio to an encoded (video-only) lyric video.
+Stream-copies the source audio when the container allows it; otherwise the
+audio is encoded to AAC once per song and cached on disk.
+"""
+import os
+from app import config
+from app.utils.disk_cache import DiskCache, file_sha256
+from app.utils.ffmpeg_tools import probe_audio_codec, run_ffmpeg
+
+# Audio codecs each output container can carry without re-encoding
+CONTAINER_AUDIO_CODECS = {
+    ".mp4": {"aac", "mp3", "alac"},
+    ".m4v": {"aac", "mp3", "alac"},
+    ".mov": {"aac", "mp3", "alac", "pcm_s16le"},
+    ".webm": {"opus", "vorbis"},
+    ".mkv": {"aac", "mp3", "opus", "vorbis", "flac", "alac", "pcm_s16le"},
+}
+
+AAC_BITRATE = "192k"
+
+_aac_cache = None
+
+
+def get_aac_cache():
+    """Process-wide cache of AAC encodes, keyed by sha256 of the source audio"""
+    global _aac_cache
+    if _aac_cache is None:
+        _aac_cache = DiskCache(
+            os.path.join(config.CACHE_DIR, "audio"),
+            config.AUDIO_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _aac_cache
+
+
+def prepare_audio(audio_path, output_path):
+    """
+    Return an audio file that can be stream-copied into output_path's container:
+    the source itself if its codec fits, else a cached AAC encode of it.
+    """
+    container = os.path.splitext(output_path)[1].lower()
+    codec = probe_audio_codec(audio_path)
+    if codec in CONTAINER_AUDIO_CODECS.get(container, set()):
+        print(f"[Audio Mux] Stream-copying {codec} audio into {container}")
+        return audio_path
+
+    cache = get_aac_cache()
+    key = file_sha256(audio_path)
+    cached = cache.get(key, ".m4a")
+    if cached:
+        print(f"[Audio Mux] ♻️  Using cached AAC for {os.path.basename(audio_path)}")
+        return cached
+
+    print(f"[Audio Mux] Encoding {codec or 'unknown'} audio to AAC (cached for next time)...")
+    temp_path = cache.temp_path(".m4a")
+    try:
+        run_ffmpeg(["-i", audio_path, "-vn", "-c:a", "aac", "-b:a", AAC_BITRATE, "-f", "mp4", temp_path])
+        return cache.commit(temp_path, key, ".m4a")
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def mux_audio(video_path, audio_path, output_path):
+    """
+    Combine a video-only file with the song audio. Both streams are copied;
+    the audio is only encoded (once, cached) if the container can't carry it.
+    """
+    audio_source = prepare_audio(audio_path, output_path)
+    args = [
+        "-i", video_path,
+        "-i", audio_source,
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c", "copy",
+    ]
+    if os.path.splitext(output_path)[1].lower() in (".mp4", ".m4v", ".mov"):
+        args += ["-movflags", "+faststart"]
+    run_ffmpeg(args + [output_path])
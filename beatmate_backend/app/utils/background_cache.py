@@ -0,0 +1,72 @@
+"""
+Background Cache
+Preprocessed lyric video backgrounds: decoded, cover-scaled and cropped to the
+exact output resolution once per (image sha256, resolution), stored as .npy on
+local disk and memory-mapped on later renders (no JPEG decode, no resize).
+"""
+import os
+import numpy as np
+from PIL import Image
+from app import config
+from app.utils.disk_cache import DiskCache, file_sha256
+
+_background_cache = None
+
+
+def get_background_cache():
+    """Process-wide LRU cache of preprocessed background frames"""
+    global _background_cache
+    if _background_cache is None:
+        _background_cache = DiskCache(
+            os.path.join(config.CACHE_DIR, "backgrounds"),
+            config.BACKGROUND_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _background_cache
+
+
+def decode_background(background_image_path, resolution):
+    """
+    Decode a background image to an RGB uint8 frame of exactly `resolution`.
+    Scales to cover the frame (keeping aspect ratio), then center-crops.
+    """
+    width, height = resolution
+    with Image.open(background_image_path) as img:
+        img = img.convert("RGB")
+        scale = max(width / img.width, height / img.height)
+        scaled = (max(width, round(img.width * scale)), max(height, round(img.height * scale)))
+        img = img.resize(scaled, Image.LANCZOS)
+        left = (scaled[0] - width) // 2
+        top = (scaled[1] - height) // 2
+        img = img.crop((left, top, left + width, top + height))
+        return np.asarray(img, dtype=np.uint8)
+
+
+def load_background_frame(background_image_path, resolution):
+    """
+    Background frame for `resolution`, from the cache when possible.
+    Returns a read-only (memory-mapped) array on a hit; callers must copy
+    before drawing on it.
+    """
+    width, height = resolution
+    cache = get_background_cache()
+    key = f"{file_sha256(background_image_path)}_{width}x{height}"
+
+    cached = cache.get(key, ".npy")
+    if cached:
+        try:
+            return np.load(cached, mmap_mode="r")
+        except (ValueError, OSError) as e:
+            print(f"[Background Cache] ⚠️  Unreadable cache entry, rebuilding: {e}")
+
+    print(f"[Background Cache] Preprocessing {os.path.basename(background_image_path)} for {width}x{height}")
+    frame = decode_background(background_image_path, resolution)
+
+    temp_path = cache.temp_path(".npy")
+    try:
+        np.save(temp_path, frame)
+        cache.commit(temp_path, key, ".npy")
+    except OSError as e:
+        print(f"[Background Cache] ⚠️  Could not store frame: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return frame
@@ -0,0 +1,155 @@
+"""
+Frame Compositor
+Alpha-blends lyric text tiles over a static background into one reused frame
+buffer. Work per frame is proportional to the text area on screen, not to the
+frame size or the number of segments in the song.
+
+Memory is bounded the same way: a segment's tile is built when it first
+appears and freed when it leaves the screen, and all tiles blend through one
+shared pool of scratch buffers.
+"""
+import time
+import numpy as np
+
+
+class BlendBuffers:
+    """
+    Scratch buffers for blending, shared by every tile of a compositor.
+    Grown to the largest tile seen and reused as views for smaller ones.
+    """
+
+    def __init__(self):
+        self._coverage = np.empty(0, dtype=np.float32)
+        self._blend = np.empty(0, dtype=np.float32)
+        self._scaled = np.empty(0, dtype=np.float32)
+
+    def views(self, height, width):
+        """(coverage (h, w, 1), blend (h, w, 3), scaled (h, w, 3)) float32 views"""
+        pixels = height * width
+        if self._coverage.size < pixels:
+            self._coverage = np.empty(pixels, dtype=np.float32)
+            self._blend = np.empty(pixels * 3, dtype=np.float32)
+            self._scaled = np.empty(pixels * 3, dtype=np.float32)
+        return (
+            self._coverage[:pixels].reshape(height, width, 1),
+            self._blend[:pixels * 3].reshape(height, width, 3),
+            self._scaled[:pixels * 3].reshape(height, width, 3),
+        )
+
+    @property
+    def nbytes(self):
+        return self._coverage.nbytes + self._blend.nbytes + self._scaled.nbytes
+
+
+class TextTile:
+    """
+    A segment's text cropped to its visible pixels, placed on the frame.
+    Alpha and premultiplied color are precomputed as float32 so blending is a
+    few in-place NumPy ops into the compositor's scratch buffers.
+    """
+
+    def __init__(self, rgba, x, y, frame_size):
+        frame_w, frame_h = frame_size
+
+        # Crop to the bounding box of non-transparent pixels
+        visible = rgba[:, :, 3] > 0
+        rows = np.flatnonzero(visible.any(axis=1))
+        cols = np.flatnonzero(visible.any(axis=0))
+        if rows.size == 0:
+            self.bbox = None
+            return
+        top, bottom = rows[0], rows[-1] + 1
+        left, right = cols[0], cols[-1] + 1
+
+        # Clip to the frame
+        x0, y0 = max(x + left, 0), max(y + top, 0)
+        x1, y1 = min(x + right, frame_w), min(y + bottom, frame_h)
+        if x1 <= x0 or y1 <= y0:
+            self.bbox = None
+            return
+        tile = rgba[y0 - y:y1 - y, x0 - x:x1 - x]
+
+        self.bbox = (x0, y0, x1, y1)
+        self.alpha = tile[:, :, 3:4].astype(np.float32) / 255.0
+        self.premultiplied = tile[:, :, :3].astype(np.float32) * self.alpha
+
+    @property
+    def nbytes(self):
+        return self.alpha.nbytes + self.premultiplied.nbytes if self.bbox else 0
+
+    def blend_into(self, frame, opacity, buffers):
+        """Blend this tile into `frame` in place at opacity (0-255)"""
+        x0, y0, x1, y1 = self.bbox
+        region = frame[y0:y1, x0:x1]
+        level = opacity / 255.0
+        coverage, blend, scaled = buffers.views(y1 - y0, x1 - x0)
+
+        # region = region * (1 - alpha * level) + premultiplied * level
+        np.multiply(self.alpha, -level, out=coverage)
+        coverage += 1.0
+        np.multiply(region, coverage, out=blend)
+        np.multiply(self.premultiplied, level, out=scaled)
+        blend += scaled
+        blend += 0.5
+        np.copyto(region, blend, casting="unsafe")
+
+
+class FrameCompositor:
+    """
+    Renders overlay states ((layer_index, opacity) tuples from the frame
+    scheduler) into a single frame buffer that is reused for every frame.
+    Only rectangles touched by the previous frame are restored from the background.
+
+    build_layer(index) returns a layer ({"rgba", "x", "y"}) or None. It is
+    called when a layer first appears; the tile is dropped once the layer is
+    no longer in the state (segments are on screen for one contiguous run).
+    Time spent building tiles and rendering (including builds) is accumulated
+    in build_seconds / render_seconds.
+    """
+
+    def __init__(self, background, build_layer):
+        self.background = background
+        self.frame = np.array(background, dtype=np.uint8, copy=True)
+        self.frame_size = (background.shape[1], background.shape[0])
+        self.build_layer = build_layer
+        self.buffers = BlendBuffers()
+        self.tiles = {}
+        self.tiles_built = 0
+        self.peak_tile_bytes = 0
+        self.build_seconds = 0.0
+        self.render_seconds = 0.0
+        self._dirty = []
+
+    def _tile(self, index):
+        tile = self.tiles.get(index)
+        if tile is None and index not in self.tiles:
+            start = time.perf_counter()
+            layer = self.build_layer(index)
+            tile = TextTile(layer["rgba"], layer["x"], layer["y"], self.frame_size) if layer is not None else None
+            self.tiles[index] = tile
+            self.tiles_built += 1
+            self.build_seconds += time.perf_counter() - start
+        return tile
+
+    def render(self, state):
+        """Return the frame buffer showing `state` (valid until the next call)"""
+        start = time.perf_counter()
+        # Free tiles that left the screen before building new ones
+        on_screen = {index for index, _ in state}
+        for index in [index for index in self.tiles if index not in on_screen]:
+            del self.tiles[index]
+
+        tiles = [(self._tile(index), opacity) for index, opacity in state]
+        tiles = [(tile, opacity) for tile, opacity in tiles if tile is not None and tile.bbox]
+        self.peak_tile_bytes = max(self.peak_tile_bytes, sum(tile.nbytes for tile, _ in tiles))
+
+        # Reset everything drawn last frame or about to be drawn to the background
+        for x0, y0, x1, y1 in self._dirty + [tile.bbox for tile, _ in tiles]:
+            self.frame[y0:y1, x0:x1] = self.background[y0:y1, x0:x1]
+
+        for tile, opacity in tiles:
+            tile.blend_into(self.frame, opacity, self.buffers)
+
+        self._dirty = [tile.bbox for tile, _ in tiles]
+        self.render_seconds += time.perf_counter() - start
+        return self.frame
@@ -0,0 +1,80 @@
+"""
+Disk Cache
+Small content-addressed file cache on local disk with LRU eviction
+"""
+import hashlib
+import os
+import tempfile
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Files stored as <directory>/<key><suffix>.
+
+    A hit refreshes the file's mtime, and eviction removes the least recently
+    used files once the directory grows past max_bytes. Writes go through a
+    temp file + os.replace, so concurrent renders never see partial files.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key, suffix=""):
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def get(self, key, suffix=""):
+        """Path of a cached entry (marking it recently used), or None"""
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def temp_path(self, suffix=""):
+        """A temp file path inside the cache directory, for writing an entry"""
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=".tmp_", dir=self.directory)
+        os.close(fd)
+        return path
+
+    def commit(self, temp_path, key, suffix=""):
+        """Atomically move a written temp file into the cache; returns the entry path"""
+        path = self.path_for(key, suffix)
+        os.replace(temp_path, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(".tmp_"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
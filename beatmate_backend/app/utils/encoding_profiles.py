@@ -0,0 +1,81 @@
+"""
+Encoding Profiles
+Named x264 settings for lyric videos. Lyric videos are a still background with
+text that changes a few times per second at most, so constant-quality (CRF)
+encoding with `-tune stillimage` gets the same look as a fixed bitrate at a
+fraction of the size; long GOPs are cheap because nothing moves between cuts.
+
+A profile is picked per request (the `profile` field of /generate-lyric-video),
+else by the quality preset, else config.ENCODING_PROFILE.
+"""
+import os
+from app import config
+
+# Most encoder threads per ffmpeg process (fewer when several encode at once)
+ENCODER_THREADS = 4
+
+# codec / crf / preset / tune: x264 rate control and speed
+# gop: keyframe interval in seconds (seeking granularity, HLS segment length)
+# pix_fmt: output pixel format (yuv420p plays everywhere)
+# fps: frame rate cap (None keeps the quality preset's frame rate)
+# maxrate / bufsize: VBV cap so fades don't spike the bitrate on slow links
+ENCODING_PROFILES = {
+    "archive": {
+        "codec": "libx264", "crf": 18, "preset": "slow", "tune": "stillimage",
+        "gop": 10, "pix_fmt": "yuv420p", "fps": None, "maxrate": None, "bufsize": None,
+    },
+    "web": {
+        "codec": "libx264", "crf": 23, "preset": "medium", "tune": "stillimage",
+        "gop": 4, "pix_fmt": "yuv420p", "fps": None, "maxrate": "4M", "bufsize": "8M",
+    },
+    "mobile": {
+        "codec": "libx264", "crf": 26, "preset": "fast", "tune": "stillimage",
+        "gop": 4, "pix_fmt": "yuv420p", "fps": 24, "maxrate": "2M", "bufsize": "4M",
+    },
+    "preview": {
+        "codec": "libx264", "crf": 30, "preset": "ultrafast", "tune": "stillimage",
+        "gop": 4, "pix_fmt": "yuv420p", "fps": 12, "maxrate": "1M", "bufsize": "2M",
+    },
+}
+
+
+def resolve_profile(name=None, default=None):
+    """
+    Profile name to use: `name`, else `default` (e.g. the quality preset's),
+    else config.ENCODING_PROFILE. Raises ValueError for unknown names.
+    """
+    name = name or default or config.ENCODING_PROFILE
+    if name not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile '{name}'. Choose from: {', '.join(ENCODING_PROFILES)}")
+    return name
+
+
+def profile_fps(name, fps):
+    """Frame rate for a render at `fps` under profile `name` (profiles may cap it)"""
+    cap = ENCODING_PROFILES[name]["fps"]
+    return min(fps, cap) if cap else fps
+
+
+def encoder_threads(processes=1):
+    """Threads per encoder when `processes` encoders run at once (e.g. render chunks)"""
+    return max(1, min(ENCODER_THREADS, (os.cpu_count() or 1) // max(1, processes)))
+
+
+def video_encoder_args(name, fps, processes=1):
+    """
+    ffmpeg output arguments for the video stream under profile `name` at `fps`,
+    for one of `processes` encoders running in parallel
+    """
+    profile = ENCODING_PROFILES[name]
+    args = [
+        "-c:v", profile["codec"],
+        "-crf", str(profile["crf"]),
+        "-preset", profile["preset"],
+        "-tune", profile["tune"],
+        "-g", str(max(1, round(profile["gop"] * fps))),
+        "-pix_fmt", profile["pix_fmt"],
+        "-threads", str(encoder_threads(processes)),
+    ]
+    if profile["maxrate"]:
+        args += ["-maxrate", profile["maxrate"], "-bufsize", profile["bufsize"]]
+    return args
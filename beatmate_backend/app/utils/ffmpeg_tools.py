@@ -0,0 +1,244 @@
+"""
+FFmpeg Utilities
+Thin wrappers around the ffmpeg binary used for lyric video encoding
+"""
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import imageio_ffmpeg
+from app.utils.render_stats import peak_rss_mb
+
+# Fragmented MP4 written to a pipe: the moov box comes first and bytes are never
+# rewritten in place, so finished fragments can be uploaded while encoding continues
+FRAGMENTED_MP4_ARGS = [
+    "-f", "mp4",
+    "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+    "-frag_duration", "1000000",  # also cut a fragment every second between keyframes
+]
+
+
+def get_ffmpeg_exe():
+    """Path to the ffmpeg binary (bundled with imageio-ffmpeg, or IMAGEIO_FFMPEG_EXE)"""
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def run_ffmpeg(args, input=None):
+    """
+    Run ffmpeg with the given arguments, raising RuntimeError on failure.
+    `input` (bytes) is sent to ffmpeg's stdin (for a pipe:0 input).
+    """
+    cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error"] + list(args)
+    result = subprocess.run(cmd, input=input, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed: {error}")
+
+
+class OutputTee:
+    """
+    Drains an ffmpeg process's stdout (in a thread) into a local file and a sink
+    with write(bytes), e.g. a streaming upload. Sink errors are the sink's own
+    business: the pipe is always drained so the encoder never stalls.
+    """
+
+    def __init__(self, stream, output_path, sink, chunk_size=1024 * 1024):
+        self.stream = stream
+        self.output_path = output_path
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            with open(self.output_path, "wb") as f:
+                for chunk in iter(lambda: self.stream.read(self.chunk_size), b""):
+                    f.write(chunk)
+                    self.sink.write(chunk)
+        except Exception as e:
+            self.error = e
+            # Keep draining so ffmpeg can finish
+            for _ in iter(lambda: self.stream.read(self.chunk_size), b""):
+                pass
+
+    def join(self, raise_errors=True):
+        self._thread.join()
+        if self.error and raise_errors:
+            raise RuntimeError(f"Could not write {self.output_path}: {self.error}")
+
+
+def run_ffmpeg_to_sink(args, output_path, sink, input=None):
+    """
+    Run ffmpeg writing a fragmented MP4 to stdout, saved to output_path and
+    streamed to `sink` as it is produced. Raises RuntimeError on failure.
+    `input` (bytes) is sent to ffmpeg's stdin (for a pipe:0 input).
+    """
+    cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error"] + list(args) + FRAGMENTED_MP4_ARGS + ["pipe:1"]
+    with tempfile.TemporaryFile() as stderr:
+        stdin = subprocess.PIPE if input is not None else subprocess.DEVNULL
+        proc = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr)
+        tee = OutputTee(proc.stdout, output_path, sink)
+        if input is not None:
+            try:
+                proc.stdin.write(input)
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        proc.wait()
+        tee.join()
+        if proc.returncode != 0:
+            stderr.seek(0)
+            error = stderr.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg failed: {error}")
+
+
+def probe_audio_codec(path):
+    """Codec name of the first audio stream (e.g. 'mp3', 'aac'), or None"""
+    result = subprocess.run(
+        [get_ffmpeg_exe(), "-hide_banner", "-i", path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    match = re.search(r"Stream #\S+.*?: Audio: (\w+)", result.stderr.decode("utf-8", errors="replace"))
+    return match.group(1) if match else None
+
+
+def decode_pcm(path, sample_rate=16000):
+    """
+    Decode an audio file to mono signed 16-bit PCM at sample_rate.
+    Returns the raw little-endian samples; raises RuntimeError on failure.
+    """
+    cmd = [get_ffmpeg_exe(), "-loglevel", "error", "-i", path,
+           "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed: {error}")
+    return result.stdout
+
+
+def concat_videos(video_paths, output_path, audio_path=None, sink=None):
+    """
+    Join video files with the concat demuxer (stream copy, no re-encode).
+    All inputs must share codec parameters and start on a keyframe.
+    audio_path (stream-copied) is muxed in on the way; with a sink the result
+    is a fragmented MP4 streamed to the sink as it is written.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        for path in video_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+
+    args = ["-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        args += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+    args += ["-c", "copy"]
+    try:
+        if sink is not None:
+            run_ffmpeg_to_sink(args, output_path, sink)
+        else:
+            run_ffmpeg(args + [output_path])
+    finally:
+        os.remove(list_path)
+
+
+class FrameWriter:
+    """
+    Streams raw RGB frames into an ffmpeg encoder process.
+
+    Frames are written as rgb24 at a constant frame rate, so a frame that stays
+    on screen is simply written again (repeat=N) without recompositing it.
+
+    With a sink, the output is a fragmented MP4 that is saved to output_path and
+    passed to sink.write() fragment by fragment while encoding runs.
+    video_args are the video encoder arguments (see encoding_profiles.video_encoder_args).
+    """
+
+    def __init__(
+        self,
+        output_path,
+        size,
+        fps=24,
+        audio_path=None,
+        audio_codec="aac",
+        video_args=("-c:v", "libx264", "-pix_fmt", "yuv420p"),
+        extra_args=None,
+        sink=None,
+    ):
+        width, height = size
+        self.output_path = output_path
+        self.tee = None
+        self.frame_bytes = width * height * 3
+        self.peak_rss_mb = None
+
+        cmd = [
+            get_ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+        ]
+        if audio_path:
+            cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:a", audio_codec]
+        cmd += list(video_args)
+        cmd += list(extra_args or [])
+
+        # stderr goes to a temp file: an undrained pipe could fill up and stall ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        if sink is not None:
+            cmd += FRAGMENTED_MP4_ARGS + ["pipe:1"]
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self._stderr)
+            self.tee = OutputTee(self.proc.stdout, output_path, sink)
+        else:
+            cmd.append(output_path)
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def write_frame(self, frame, repeat=1):
+        """Write an (h, w, 3) uint8 frame `repeat` times"""
+        data = memoryview(frame).cast("B")
+        if len(data) != self.frame_bytes:
+            raise ValueError(f"Frame has {len(data)} bytes, expected {self.frame_bytes}")
+        try:
+            for _ in range(repeat):
+                self.proc.stdin.write(data)
+        except BrokenPipeError:
+            self._raise_encoder_error()
+
+    def close(self):
+        """Finish the stream and wait for ffmpeg to write the file"""
+        # Sample the encoder's peak memory while it still exists (all frames are in)
+        self.peak_rss_mb = peak_rss_mb(self.proc.pid)
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        self.proc.wait()
+        if self.tee:
+            self.tee.join()
+        if self.proc.returncode != 0:
+            self._raise_encoder_error()
+        self._stderr.close()
+
+    def _raise_encoder_error(self):
+        self.proc.wait()
+        self._stderr.seek(0)
+        error = self._stderr.read().decode("utf-8", errors="replace").strip()
+        self._stderr.close()
+        raise RuntimeError(f"ffmpeg failed writing {self.output_path}: {error}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.proc.kill()
+            self.proc.wait()
+            if self.tee:
+                self.tee.join(raise_errors=False)
+            self._stderr.close()
+        return False
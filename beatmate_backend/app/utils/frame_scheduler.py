@@ -0,0 +1,131 @@
+"""
+Frame Scheduler
+Works out when the lyric overlay actually changes, so the renderer only
+composites distinct frames and repeats them for static stretches.
+"""
+import math
+import numpy as np
+
+FADE_DURATION = 0.3  # seconds of fade in / fade out per segment
+
+
+def count_frames(duration, fps):
+    """Number of output frames for a clip (frames at t = 0, 1/fps, ... < duration)"""
+    return int(math.ceil(duration * fps - 1e-9))
+
+
+def fade_ramp(start, end, fps, fade_duration=FADE_DURATION):
+    """
+    Opacity (0-255) of a segment at every frame it is on screen, fades included.
+    Returns (first_frame, ramp) where ramp[i] is the opacity at frame first_frame + i.
+    """
+    first_frame = int(math.ceil(start * fps - 1e-9))
+    end_frame = int(math.ceil(end * fps - 1e-9))
+    t = np.arange(first_frame, max(end_frame, first_frame)) / fps
+    fade = min(fade_duration, (end - start) / 2) or 1e-6
+    level = np.minimum(np.minimum((t - start) / fade, (end - t) / fade), 1.0)
+    return first_frame, np.rint(np.clip(level, 0.0, 1.0) * 255).astype(np.uint8)
+
+
+def overlay_state(frame, ramps):
+    """
+    The overlay at a frame index as a hashable tuple of (segment_index, opacity).
+    Two frames with the same state look identical.
+    """
+    state = []
+    for index, (first_frame, ramp) in enumerate(ramps):
+        offset = frame - first_frame
+        if 0 <= offset < len(ramp) and ramp[offset] > 0:
+            state.append((index, int(ramp[offset])))
+    return tuple(state)
+
+
+def _change_points(segments, total_frames, fps, fade_duration):
+    """Frame indices where the overlay may change (every frame of a fade, plus edges)"""
+    points = {0, total_frames}
+    for segment in segments:
+        start_frame = int(math.ceil(segment["start"] * fps - 1e-9))
+        end_frame = int(math.ceil(segment["end"] * fps - 1e-9))
+        fade_frames = int(math.ceil(fade_duration * fps)) + 1
+        points.update(range(start_frame, min(start_frame + fade_frames, end_frame) + 1))
+        points.update(range(max(end_frame - fade_frames, start_frame), end_frame + 1))
+    return sorted(p for p in points if 0 <= p <= total_frames)
+
+
+def build_change_timeline(segments, duration, fps=24, fade_duration=FADE_DURATION):
+    """
+    Build the change timeline for a lyric video.
+
+    Returns a list of runs (first_frame, frame_count, state), covering every
+    output frame exactly once. Consecutive runs always have different states,
+    so the number of runs is the number of frames that need compositing.
+    """
+    total_frames = count_frames(duration, fps)
+    points = _change_points(segments, total_frames, fps, fade_duration)
+    ramps = [fade_ramp(s["start"], s["end"], fps, fade_duration) for s in segments]
+
+    runs = []
+    for first, next_point in zip(points, points[1:]):
+        if next_point <= first:
+            continue
+        state = overlay_state(first, ramps)
+        if runs and runs[-1][2] == state:
+            prev_first, prev_count, _ = runs[-1]
+            runs[-1] = (prev_first, prev_count + next_point - first, state)
+        else:
+            runs.append((first, next_point - first, state))
+    return runs
+
+
+def split_timeline(runs, chunk_count):
+    """
+    Split a change timeline into up to `chunk_count` contiguous chunks of
+    roughly equal frame counts, cutting only between segments: where a segment
+    starts, or anywhere inside a gap with no text on screen.
+
+    Returns a list of run lists; each chunk's runs keep their absolute frame numbers.
+    """
+    if chunk_count <= 1 or not runs:
+        return [runs]
+
+    total_frames = sum(count for _, count, _ in runs)
+
+    # Frames where a new segment appears or the screen clears
+    boundaries = []
+    prev_segments = set()
+    for first, _, state in runs:
+        segments = {index for index, _ in state}
+        if first > 0 and (not segments or segments - prev_segments):
+            boundaries.append(first)
+        prev_segments = segments
+
+    cut_frames = []
+    for k in range(1, chunk_count):
+        target = int(round(total_frames * k / chunk_count))
+        gap_run = next(
+            (run for run in runs if not run[2] and run[0] < target < run[0] + run[1]),
+            None
+        )
+        if gap_run:
+            cut = target
+        elif boundaries:
+            cut = min(boundaries, key=lambda frame: abs(frame - target))
+        else:
+            continue
+        if 0 < cut < total_frames and (not cut_frames or cut > cut_frames[-1]):
+            cut_frames.append(cut)
+
+    # Partition runs at the cut frames (a gap run may be split in two)
+    chunks = [[]]
+    cuts = iter(cut_frames)
+    next_cut = next(cuts, None)
+    for first, count, state in runs:
+        while next_cut is not None and first <= next_cut < first + count:
+            if next_cut > first:
+                chunks[-1].append((first, next_cut - first, state))
+                count -= next_cut - first
+                first = next_cut
+            chunks.append([])
+            next_cut = next(cuts, None)
+        chunks[-1].append((first, count, state))
+    return [chunk for chunk in chunks if chunk]
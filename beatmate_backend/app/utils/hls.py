@@ -0,0 +1,55 @@
+"""
+HLS Packaging
+Splits a finished lyric video into HLS segments (MPEG-TS, stream copy - no
+re-encode) plus a VOD playlist, so players can start after the first segment
+and seek without downloading the whole mp4. Segments are cut on keyframes, so
+their length follows the encoding profile's GOP (see encoding_profiles.py).
+"""
+import os
+from app.utils.ffmpeg_tools import run_ffmpeg
+
+PLAYLIST_NAME = "playlist.m3u8"
+SEGMENT_PATTERN = "segment_%05d.ts"
+
+
+def hls_folder_for(video_filename):
+    """Storage folder (relative to the user's prefix) of a video's HLS files"""
+    root, _ = os.path.splitext(video_filename)
+    return f"hls/{root}"
+
+
+def package_hls(video_path, output_dir, segment_seconds=4):
+    """
+    Write PLAYLIST_NAME and its segments for video_path into output_dir.
+    Returns the file names written, playlist first.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    run_ffmpeg([
+        "-i", video_path,
+        "-map", "0", "-c", "copy",
+        "-f", "hls",
+        "-hls_time", str(segment_seconds),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(output_dir, SEGMENT_PATTERN),
+        os.path.join(output_dir, PLAYLIST_NAME),
+    ])
+    return [PLAYLIST_NAME] + playlist_segments(read_text(os.path.join(output_dir, PLAYLIST_NAME)))
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def playlist_segments(playlist):
+    """Segment URIs of a media playlist, in order"""
+    return [line.strip() for line in playlist.splitlines() if line.strip() and not line.startswith("#")]
+
+
+def rewrite_playlist(playlist, urls):
+    """Playlist with each segment URI replaced by urls[uri] (e.g. signed URLs)"""
+    lines = []
+    for line in playlist.splitlines():
+        uri = line.strip()
+        lines.append(urls.get(uri, line) if uri and not uri.startswith("#") else line)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,331 @@
+"""
+Media Probe
+Duration, sample rate, channels and bitrate of an audio file from its headers
+alone, in pure Python: MP3 (first frame + Xing/Info/VBRI, else CBR from the
+file size), WAV (fmt/data chunks) and MP4/M4A (mvhd + the sound track's
+sample entry). Nothing is decoded, so a probe reads a few KB and takes well
+under a millisecond. Anything else falls back to ffprobe (or `ffmpeg -i`).
+"""
+import io
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+from app.utils.ffmpeg_tools import get_ffmpeg_exe
+
+# Bytes read past the ID3v2 tag when looking for the first MP3 frame
+MP3_SCAN_BYTES = 64 * 1024
+
+# (version, layer) -> kbps by bitrate index (0 = free format, 15 = invalid)
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+
+def _result(fmt, duration, sample_rate=None, channels=None, bitrate=None):
+    return {
+        "format": fmt,
+        "duration": duration,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bitrate": bitrate,  # bits per second
+    }
+
+
+# ---------------------------------------------------------------- MP3
+
+def _mp3_header(data, offset):
+    """Parsed MPEG audio frame header at offset, or None"""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = {3: 1, 2: 2, 0: 2.5}.get((b1 >> 3) & 0x03)
+    layer = {3: 1, 2: 2, 1: 3}.get((b1 >> 1) & 0x03)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    kbps = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        samples, length = 384, (12 * kbps * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 576 if layer == 3 and version != 1 else 1152
+        length = samples // 8 * kbps * 1000 // sample_rate + padding
+    return {
+        "version": version,
+        "layer": layer,
+        "bitrate": kbps * 1000,
+        "sample_rate": sample_rate,
+        "channels": 1 if (b3 >> 6) == 3 else 2,
+        "samples": samples,
+        "length": length,
+    }
+
+
+def _id3v2_size(header):
+    """Bytes taken by an ID3v2 tag starting the file (0 if none)"""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = (header[6] & 0x7F) << 21 | (header[7] & 0x7F) << 14 | (header[8] & 0x7F) << 7 | (header[9] & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _probe_mp3(f, file_size):
+    audio_start = 0
+    # Tags can be stacked (e.g. re-tagged files)
+    while True:
+        f.seek(audio_start)
+        tag = _id3v2_size(f.read(10))
+        if not tag:
+            break
+        audio_start += tag
+
+    f.seek(audio_start)
+    data = f.read(MP3_SCAN_BYTES)
+    for offset in range(len(data) - 3):
+        frame = _mp3_header(data, offset)
+        # A real frame is followed by another one (or the end of the data)
+        if frame and (offset + frame["length"] >= len(data) or _mp3_header(data, offset + frame["length"])):
+            break
+    else:
+        return None
+
+    audio_start += offset
+    audio_bytes = file_size - audio_start
+    f.seek(file_size - 128)
+    if f.read(3) == b"TAG":
+        audio_bytes -= 128
+
+    # Xing/Info (LAME) header after the side info, or VBRI 32 bytes after the header
+    side_info = (32 if frame["channels"] == 2 else 17) if frame["version"] == 1 else (17 if frame["channels"] == 2 else 9)
+    frames = None
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+    elif data[offset + 36:offset + 40] == b"VBRI":
+        frames = struct.unpack(">I", data[offset + 50:offset + 54])[0]
+
+    if frames:
+        duration = frames * frame["samples"] / frame["sample_rate"]
+        bitrate = round(audio_bytes * 8 / duration) if duration else frame["bitrate"]
+    else:
+        duration = audio_bytes * 8 / frame["bitrate"]
+        bitrate = frame["bitrate"]
+    return _result("mp3", duration, frame["sample_rate"], frame["channels"], bitrate)
+
+
+# ---------------------------------------------------------------- WAV
+
+def _probe_wav(f, file_size):
+    f.seek(12)
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            body = f.read(size)
+            channels, sample_rate, byte_rate = struct.unpack("<HII", body[2:12])
+            fmt = (channels, sample_rate, byte_rate)
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if not fmt or not fmt[2]:
+                return None
+            channels, sample_rate, byte_rate = fmt
+            # Streamed WAVs may leave the size at 0 / 0xFFFFFFFF
+            data_size = min(size, file_size - f.tell()) if size not in (0, 0xFFFFFFFF) else file_size - f.tell()
+            return _result("wav", data_size / byte_rate, sample_rate, channels, byte_rate * 8)
+        else:
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+
+# ---------------------------------------------------------------- MP4
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _mp4_boxes(f, start, end):
+    """(type, body start, body end) of the boxes between start and end"""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        body = offset + 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            body += 8
+        elif size == 0:
+            size = end - offset
+        if size < body - offset:
+            return
+        yield box_type, body, offset + size
+        offset += size
+
+
+def _mp4_find(f, start, end, path):
+    """Body (start, end) of the first box along a path of box types, or None"""
+    for box_type, body, box_end in _mp4_boxes(f, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return body, box_end
+            return _mp4_find(f, body, box_end, path[1:])
+    return None
+
+
+def _mp4_duration(f, body):
+    """(timescale, duration) from an mvhd/mdhd body"""
+    f.seek(body)
+    version = f.read(4)[0]
+    if version == 1:
+        f.seek(16, os.SEEK_CUR)
+        timescale, duration = struct.unpack(">IQ", f.read(12))
+    else:
+        f.seek(8, os.SEEK_CUR)
+        timescale, duration = struct.unpack(">II", f.read(8))
+    return timescale, duration
+
+
+def _probe_mp4(f, file_size):
+    moov = _mp4_find(f, 0, file_size, [b"moov"])
+    if not moov:
+        return None
+    mvhd = _mp4_find(f, *moov, [b"mvhd"])
+    if not mvhd:
+        return None
+    timescale, duration = _mp4_duration(f, mvhd[0])
+    if not timescale:
+        return None
+    seconds = duration / timescale
+
+    sample_rate = channels = None
+    for box_type, body, box_end in _mp4_boxes(f, *moov):
+        if box_type != b"trak":
+            continue
+        hdlr = _mp4_find(f, body, box_end, [b"mdia", b"hdlr"])
+        if not hdlr:
+            continue
+        f.seek(hdlr[0] + 8)
+        if f.read(4) != b"soun":
+            continue
+        stsd = _mp4_find(f, body, box_end, [b"mdia", b"minf", b"stbl", b"stsd"])
+        if stsd:
+            # Full box header + entry count, then the first sample entry
+            f.seek(stsd[0] + 8 + 8 + 16)
+            channels, _, _, _, rate = struct.unpack(">HHHHI", f.read(12))
+            sample_rate = rate >> 16
+        break
+
+    bitrate = round(file_size * 8 / seconds) if seconds else None
+    return _result("mp4", seconds, sample_rate, channels, bitrate)
+
+
+# ---------------------------------------------------------------- fallback
+
+def _probe_external(path):
+    """ffprobe (or `ffmpeg -i` when ffprobe isn't installed), or None"""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "format=duration,bit_rate,format_name:stream=sample_rate,channels",
+             "-of", "json", path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            info = json.loads(result.stdout or b"{}")
+            fmt, stream = info["format"], (info.get("streams") or [{}])[0]
+            return _result(
+                fmt.get("format_name", "").split(",")[0], float(fmt["duration"]),
+                int(stream["sample_rate"]) if stream.get("sample_rate") else None,
+                stream.get("channels"),
+                int(fmt["bit_rate"]) if fmt.get("bit_rate") else None
+            )
+        except (KeyError, ValueError):
+            return None
+
+    result = subprocess.run([get_ffmpeg_exe(), "-hide_banner", "-i", path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    text = result.stderr.decode("utf-8", errors="replace")
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", text)
+    if not duration:
+        return None
+    hours, minutes, seconds = duration.groups()
+    audio = re.search(r"Audio: (\w+).*?, (\d+) Hz, (mono|stereo)?", text)
+    bitrate = re.search(r"bitrate: (\d+) kb/s", text)
+    return _result(
+        audio.group(1) if audio else None,
+        int(hours) * 3600 + int(minutes) * 60 + float(seconds),
+        int(audio.group(2)) if audio else None,
+        {"mono": 1, "stereo": 2}.get(audio.group(3)) if audio else None,
+        int(bitrate.group(1)) * 1000 if bitrate else None
+    )
+
+
+# ---------------------------------------------------------------- API
+
+def _probe_stream(f, file_size):
+    f.seek(0)
+    head = f.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return _probe_wav(f, file_size)
+    if head[4:8] == b"ftyp":
+        return _probe_mp4(f, file_size)
+    return _probe_mp3(f, file_size)
+
+
+def probe_media(source):
+    """
+    Probe an audio file (path) or its contents (bytes).
+    Returns {"format", "duration" (seconds), "sample_rate", "channels",
+    "bitrate" (bits/s)} - unknown fields are None - or None if the file
+    can't be read as audio.
+    """
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            info = _probe_stream(io.BytesIO(source), len(source))
+        else:
+            with open(source, "rb") as f:
+                info = _probe_stream(f, os.path.getsize(source))
+    except (OSError, struct.error, IndexError):
+        info = None
+    if info and info["duration"]:
+        return info
+
+    # Formats we don't parse (ogg, flac, ...) or damaged headers
+    if isinstance(source, (bytes, bytearray)):
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            tmp.write(source)
+        try:
+            return _probe_external(tmp.name)
+        finally:
+            os.remove(tmp.name)
+    return _probe_external(source)
+
+
+def probe_duration(source):
+    """Duration in seconds of an audio file (path or bytes); raises ValueError if unknown"""
+    info = probe_media(source)
+    if not info or not info["duration"]:
+        raise ValueError("Could not determine the audio duration")
+    return info["duration"]
@@ -0,0 +1,89 @@
+"""
+Render Stats
+Per-render measurements (wall time, frames/sec, peak memory) so render
+concurrency per node can be sized from real numbers.
+Peak RSS comes from /proc (Linux); elsewhere getrusage's lifetime peak is used.
+"""
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+def peak_rss_mb(pid="self"):
+    """Peak resident set size of a process in MB (VmHWM), or None if unknown"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    if pid != "self":
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def reset_peak_rss():
+    """Restart peak RSS tracking for this process (Linux only; no-op elsewhere)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+class RenderStats:
+    """
+    Collects stats for one render: frames encoded, wall time per stage
+    (segment, text, composite, encode, mux, ...), peak RSS of this process,
+    of chunk workers and of the ffmpeg encoders. as_dict() gives the summary.
+    Stages that run in chunk workers are summed over the workers.
+    """
+
+    def __init__(self):
+        reset_peak_rss()
+        self.started = time.perf_counter()
+        self.frames = 0
+        self.worker_peak_rss_mb = 0.0
+        self.encoder_peak_rss_mb = 0.0
+        self.stages = {}
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as (part of) stage `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_frames(self, count):
+        self.frames += count
+
+    def add_worker_peak(self, rss_mb):
+        if rss_mb:
+            self.worker_peak_rss_mb = max(self.worker_peak_rss_mb, rss_mb)
+
+    def add_encoder_peak(self, rss_mb):
+        if rss_mb:
+            self.encoder_peak_rss_mb = max(self.encoder_peak_rss_mb, rss_mb)
+
+    def as_dict(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "seconds": round(seconds, 2),
+            "frames": self.frames,
+            "fps": round(self.frames / seconds, 1) if seconds > 0 else None,
+            "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+            "worker_peak_rss_mb": round(self.worker_peak_rss_mb, 1) or None,
+            "encoder_peak_rss_mb": round(self.encoder_peak_rss_mb, 1) or None,
+            "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "pid": os.getpid(),
+        }
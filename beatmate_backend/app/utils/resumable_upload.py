@@ -0,0 +1,174 @@
+"""
+Resumable Upload
+Streams a file to Supabase Storage while it is still being written, using the
+TUS resumable upload protocol (/storage/v1/upload/resumable). Bytes are sent in
+6 MB chunks from a background thread; only a few chunks are ever held in memory.
+"""
+import base64
+import queue
+import threading
+from urllib.parse import urljoin
+import requests
+from app.config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
+from app.services.supabase_service import get_supabase_service
+
+TUS_VERSION = "1.0.0"
+# Supabase requires every chunk except the last to be exactly 6 MB
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+# Chunks buffered while the network catches up; writers block beyond this
+MAX_PENDING_CHUNKS = 4
+CHUNK_RETRIES = 3
+
+
+def _encode_metadata(values: dict) -> str:
+    return ",".join(
+        f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}"
+        for key, value in values.items()
+    )
+
+
+class ResumableUpload:
+    """
+    File-like sink: write() bytes as they are produced, then finish() once the
+    file is complete. The total size doesn't need to be known up front
+    (Upload-Defer-Length); it is declared with the last chunk.
+
+    If the resumable upload fails, finish() falls back to a regular upload of
+    the finished local file, so a render is never lost to a flaky connection.
+    """
+
+    def __init__(self, bucket: str, object_path: str, content_type: str, upsert: bool = False, timeout: int = 60):
+        self.bucket = bucket
+        self.object_path = object_path
+        self.content_type = content_type
+        self.upsert = upsert
+        self.timeout = timeout
+        self.error = None
+
+        self._endpoint = f"{SUPABASE_URL.rstrip('/')}/storage/v1/upload/resumable"
+        self._headers = {
+            "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+            "apikey": SUPABASE_SERVICE_ROLE_KEY,
+            "Tus-Resumable": TUS_VERSION,
+        }
+        self._upload_url = None
+        self._offset = 0
+        self._buffer = bytearray()
+        self._queue = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ----- producer side -----
+
+    def write(self, data: bytes):
+        """Queue bytes for upload (blocks only if the network is far behind)"""
+        if self.error:
+            return
+        self._buffer += data
+        while len(self._buffer) >= TUS_CHUNK_SIZE:
+            chunk = bytes(self._buffer[:TUS_CHUNK_SIZE])
+            del self._buffer[:TUS_CHUNK_SIZE]
+            self._queue.put((chunk, False))
+
+    def finish(self, local_path: str) -> str:
+        """
+        Send the last chunk and wait for the upload to complete.
+        Falls back to uploading local_path in one request if streaming failed.
+        Returns the object's (signed) URL.
+        """
+        self._queue.put((bytes(self._buffer), True))
+        self._buffer = bytearray()
+        self._queue.put(None)
+        self._thread.join()
+
+        supabase = get_supabase_service()
+        if self.error:
+            print(f"[Resumable Upload] ⚠️  Streaming upload failed ({self.error}), uploading finished file instead")
+            self.abort()
+            return supabase.upload_file(self.bucket, self.object_path, local_path, self.content_type, upsert=self.upsert)
+
+        print(f"[Resumable Upload] ✅ Uploaded {self.bucket}/{self.object_path} ({self._offset / 1e6:.1f} MB)")
+        return supabase.get_public_url(self.bucket, self.object_path)
+
+    def abort(self):
+        """Stop streaming and discard the partial upload on the server"""
+        if self._thread.is_alive():
+            self.error = self.error or RuntimeError("aborted")
+            self._queue.put(None)
+            self._thread.join()
+        if self._upload_url:
+            try:
+                requests.delete(self._upload_url, headers=self._headers, timeout=self.timeout)
+            except requests.RequestException:
+                pass
+            self._upload_url = None
+
+    # ----- upload thread -----
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self.error:
+                continue  # keep draining so write() never blocks forever
+            chunk, final = item
+            try:
+                if self._upload_url is None:
+                    self._create()
+                self._send(chunk, final)
+            except Exception as e:
+                self.error = e
+
+    def _create(self):
+        headers = {
+            **self._headers,
+            "Upload-Defer-Length": "1",
+            "Upload-Metadata": _encode_metadata({
+                "bucketName": self.bucket,
+                "objectName": self.object_path,
+                "contentType": self.content_type,
+                "cacheControl": "3600",
+            }),
+            "x-upsert": "true" if self.upsert else "false",
+        }
+        response = requests.post(self._endpoint, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        self._upload_url = urljoin(self._endpoint, response.headers["Location"])
+
+    def _send(self, chunk: bytes, final: bool):
+        """PATCH one chunk, resuming from the server's offset after a failed attempt"""
+        start = self._offset
+        end = start + len(chunk)
+        for attempt in range(CHUNK_RETRIES):
+            headers = {
+                **self._headers,
+                "Upload-Offset": str(self._offset),
+                "Content-Type": "application/offset+octet-stream",
+            }
+            if final:
+                headers["Upload-Length"] = str(end)
+            try:
+                response = requests.patch(
+                    self._upload_url,
+                    data=chunk[self._offset - start:],
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                self._offset = int(response.headers.get("Upload-Offset", end))
+                if self._offset >= end:
+                    return
+            except requests.RequestException:
+                if attempt == CHUNK_RETRIES - 1:
+                    raise
+                self._offset = min(max(self._server_offset(start), start), end)
+        raise RuntimeError(f"Upload stalled at byte {self._offset}")
+
+    def _server_offset(self, fallback: int) -> int:
+        try:
+            response = requests.head(self._upload_url, headers=self._headers, timeout=self.timeout)
+            response.raise_for_status()
+            return int(response.headers["Upload-Offset"])
+        except (requests.RequestException, KeyError, ValueError):
+            return fallback
@@ -4,8 +4,9 @@ Replaces local file storage with Supabase cloud storage
 """
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Union
 from app.services.supabase_service import get_supabase_service
+from app.utils.resumable_upload import ResumableUpload
 
 # Storage bucket names
 BUCKETS = {
@@ -48,20 +49,22 @@ def timestamped_filename(prefix: str, ext: str) -> str:
 
 def upload_file(
     user_id: str,
-    content_bytes: bytes,
+    content_bytes: Union[bytes, str],
     filename: str,
     folder_type: str = 'songs',
-    content_type: Optional[str] = None
+    content_type: Optional[str] = None,
+    upsert: bool = False
 ) -> dict:
     """
     Upload a file to Supabase storage
     
     Args:
         user_id: User ID
-        content_bytes: File content as bytes
+        content_bytes: File content as bytes, or a local file path (read from disk)
         filename: File name
         folder_type: Type of folder (lyrics, songs, album_art, videos, backgrounds)
         content_type: MIME type
+        upsert: Overwrite the file if it already exists
     
     Returns:
         dict with 'path' and 'url'
@@ -76,7 +79,7 @@ def upload_file(
         content_type = get_content_type(filename)
     
     # Upload to Supabase
-    url = supabase.upload_file(bucket, file_path, content_bytes, content_type)
+    url = supabase.upload_file(bucket, file_path, content_bytes, content_type, upsert=upsert)
     
     return {
         'path': file_path,
@@ -85,6 +88,56 @@ def upload_file(
     }
 
 
+def open_upload_stream(
+    user_id: str,
+    filename: str,
+    folder_type: str = 'videos',
+    content_type: Optional[str] = None,
+    upsert: bool = False
+) -> ResumableUpload:
+    """
+    Start a streaming (resumable) upload of a file that is still being written
+    
+    Args:
+        user_id: User ID
+        filename: File name
+        folder_type: Type of folder (lyrics, songs, album_art, videos, backgrounds)
+        content_type: MIME type
+        upsert: Overwrite the file if it already exists
+    
+    Returns:
+        ResumableUpload - write() bytes as they are produced, then
+        finish_upload_stream() once the file is complete
+    """
+    bucket = BUCKETS.get(folder_type, BUCKETS['songs'])
+    file_path = get_file_path(user_id, filename, folder_type)
+    
+    if not content_type:
+        content_type = get_content_type(filename)
+    
+    return ResumableUpload(bucket, file_path, content_type, upsert=upsert)
+
+
+def finish_upload_stream(upload: ResumableUpload, local_path: str) -> dict:
+    """
+    Complete a streaming upload (falls back to uploading local_path if streaming failed)
+    
+    Args:
+        upload: Stream returned by open_upload_stream
+        local_path: The finished local copy of the file
+    
+    Returns:
+        dict with 'path' and 'url'
+    """
+    url = upload.finish(local_path)
+    
+    return {
+        'path': upload.object_path,
+        'url': url,
+        'bucket': upload.bucket
+    }
+
+
 def download_file(user_id: str, filename: str, folder_type: str = 'songs') -> bytes:
     """
     Download a file from Supabase storage
@@ -236,6 +289,8 @@ def get_content_type(filename: str) -> str:
         'png': 'image/png',
         'webp': 'image/webp',
         'txt': 'text/plain',
+        'm3u8': 'application/vnd.apple.mpegurl',
+        'ts': 'video/mp2t',
     }
     
     return content_types.get(ext, 'application/octet-stream')
@@ -0,0 +1,174 @@
+"""
+Text Rasterizer
+Draws lyric captions straight into RGBA NumPy arrays with Pillow.
+Replaces moviepy TextClip, which shelled out to ImageMagick once per segment.
+"""
+import os
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Bold brush/display fonts (in order of preference), as TrueType file names.
+# Mirrors the old ImageMagick font list, then the fonts shipped in the Docker image.
+FONT_CANDIDATES = [
+    "MarkerFelt.ttc",            # Bold marker/brush style (Mac)
+    "Bradley Hand Bold.ttf",     # Bold handwritten (Mac/Windows)
+    "Chalkduster.ttf",           # Bold chalk/brush style (Mac)
+    "comicbd.ttf",               # Comic Sans MS Bold (Windows)
+    "Arial Black.ttf",           # Very bold fallback (Mac)
+    "ariblk.ttf",                # Arial Black (Windows)
+    "Impact.ttf",
+    "impact.ttf",
+    "LiberationSans-Bold.ttf",   # fonts-liberation (Docker)
+    "DejaVuSans-Bold.ttf",       # fonts-dejavu-core (Docker)
+]
+
+FONT_DIRS = [
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+    "C:\\Windows\\Fonts",
+]
+
+
+@lru_cache(maxsize=1)
+def _index_font_files():
+    """Map lowercase font file names to their paths (scanned once per process)"""
+    index = {}
+    for font_dir in FONT_DIRS:
+        if not os.path.isdir(font_dir):
+            continue
+        for root, _, files in os.walk(font_dir):
+            for name in files:
+                index.setdefault(name.lower(), os.path.join(root, name))
+    return index
+
+
+@lru_cache(maxsize=1)
+def resolve_font_path():
+    """
+    Pick the first available font from FONT_CANDIDATES.
+    Returns a file path, or None to use Pillow's built-in font.
+    """
+    index = _index_font_files()
+    for candidate in FONT_CANDIDATES:
+        path = index.get(candidate.lower())
+        if path:
+            print(f"[Text Raster] Using font: {os.path.basename(path)}")
+            return path
+    print("[Text Raster] ⚠️  No TrueType font found, using Pillow default font")
+    return None
+
+
+@lru_cache(maxsize=16)
+def load_font(font_path, fontsize):
+    """Load (and cache) a font at the given size"""
+    if font_path:
+        return ImageFont.truetype(font_path, fontsize)
+    return ImageFont.load_default()
+
+
+def _erode(mask, radius):
+    """
+    Grayscale erosion with a square (2r+1) window, done as two separable
+    running minimums. Same result as ImageFilter.MinFilter, ~20x faster.
+    """
+    out = mask
+    for axis in (0, 1):
+        padded = np.pad(out, [(radius, radius) if a == axis else (0, 0) for a in (0, 1)],
+                        constant_values=0)
+        length = out.shape[axis]
+        out = padded.take(range(0, length), axis=axis)
+        for offset in range(1, 2 * radius + 1):
+            np.minimum(out, padded.take(range(offset, offset + length), axis=axis), out=out)
+    return out
+
+
+def wrap_lines_to_width(lines, font, max_width, stroke_width=0):
+    """
+    Re-wrap lines that are wider than max_width (in pixels), like ImageMagick's
+    caption method did. Lines that already fit are left untouched.
+    """
+    wrapped = []
+    for line in lines:
+        words = line.split()
+        if not words:
+            continue
+        current = words[0]
+        for word in words[1:]:
+            candidate = f"{current} {word}"
+            if font.getlength(candidate) + 2 * stroke_width <= max_width:
+                current = candidate
+            else:
+                wrapped.append(current)
+                current = word
+        wrapped.append(current)
+    return wrapped
+
+
+def rasterize_text(
+    lines,
+    fontsize=110,
+    max_width=1632,
+    font_path=None,
+    color=(255, 255, 255),
+    stroke_color=(0, 0, 0),
+    stroke_width=6,
+    line_spacing=0,
+):
+    """
+    Render centered multi-line text with an outline into an RGBA array.
+
+    ImageMagick strokes are centered on the glyph outline: half the stroke sits
+    outside the glyph and half covers the white fill. We match that by growing the
+    outline by half the width and eroding the fill by the other half.
+
+    Returns a (height, width, 4) uint8 array; width is the widest line, not max_width.
+    """
+    font = load_font(font_path, fontsize)
+    outline = max(0, int(round(stroke_width / 2)))
+    lines = wrap_lines_to_width(lines, font, max_width, outline)
+    if not lines:
+        return np.zeros((1, 1, 4), dtype=np.uint8)
+
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent + 2 * outline
+    line_widths = [int(np.ceil(font.getlength(line))) + 2 * outline for line in lines]
+
+    width = min(max(line_widths), int(max_width))
+    height = line_height * len(lines) + line_spacing * (len(lines) - 1)
+
+    # Coverage masks: outer silhouette (glyph + outline) and the glyph fill
+    silhouette = Image.new("L", (width, height), 0)
+    fill = Image.new("L", (width, height), 0)
+    silhouette_draw = ImageDraw.Draw(silhouette)
+    fill_draw = ImageDraw.Draw(fill)
+
+    y = 0
+    for line, line_width in zip(lines, line_widths):
+        x = (width - line_width) // 2 + outline
+        silhouette_draw.text((x, y + outline), line, font=font, fill=255,
+                             stroke_width=outline, stroke_fill=255)
+        fill_draw.text((x, y + outline), line, font=font, fill=255)
+        y += line_height + line_spacing
+
+    fill_mask = np.asarray(fill, dtype=np.uint8)
+    if outline:
+        fill_mask = _erode(fill_mask, outline)
+
+    # Blend stroke color -> fill color by fill coverage (integer math per channel)
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    weight = fill_mask.astype(np.uint16)
+    for channel in range(3):
+        low, high = int(stroke_color[channel]), int(color[channel])
+        if low == high:
+            rgba[:, :, channel] = low
+        elif (low, high) == (0, 255):
+            rgba[:, :, channel] = fill_mask
+        else:
+            rgba[:, :, channel] = low + ((high - low) * weight.astype(np.int32) + 127) // 255
+    rgba[:, :, 3] = np.asarray(silhouette, dtype=np.uint8)
+    return rgba
@@ -0,0 +1,153 @@
+"""
+Thumbnails
+Poster frame, scrubbing sprite sheet and a short animated WebP for a lyric
+video, captured from composited frames while the video renders (no decode of
+the finished file). Listing pages load these instead of the mp4.
+"""
+import os
+import numpy as np
+from PIL import Image
+
+# Longest side of each image, in pixels
+POSTER_SIZE = 640
+SPRITE_TILE_SIZE = 160
+ANIMATED_SIZE = 320
+POSTER_QUALITY = 85
+SPRITE_QUALITY = 70
+# Sprite: one tile every SPRITE_INTERVAL seconds (wider for long songs)
+SPRITE_INTERVAL = 2.0
+SPRITE_MAX_TILES = 100
+SPRITE_COLUMNS = 10
+# Animated preview: a few seconds around the poster, at a low frame rate
+ANIMATED_SECONDS = 3.0
+ANIMATED_FPS = 8
+# Poster: first frame with fully visible lyrics after this share of the video
+POSTER_POSITION = 0.2
+# user_videos.metadata keys holding each image's storage path
+METADATA_KEYS = {"poster": "poster_path", "sprite": "sprite_path", "animated": "animated_preview_path"}
+
+
+def preview_paths(output_path):
+    """Files written next to output_path: {"poster", "sprite", "animated"}"""
+    root, _ = os.path.splitext(output_path)
+    return {
+        "poster": f"{root}.poster.jpg",
+        "sprite": f"{root}.sprite.jpg",
+        "animated": f"{root}.preview.webp",
+    }
+
+
+def _fit(resolution, longest_side):
+    width, height = resolution
+    scale = min(1.0, longest_side / max(width, height))
+    return (max(2, 2 * round(width * scale / 2)), max(2, 2 * round(height * scale / 2)))
+
+
+def _poster_frame(runs, total_frames):
+    """First frame at or after POSTER_POSITION where some text is fully faded in"""
+    opaque = [first for first, _, state in runs if any(opacity == 255 for _, opacity in state)]
+    later = [first for first in opaque if first >= total_frames * POSTER_POSITION]
+    if later:
+        return later[0]
+    if opaque:
+        return opaque[0]
+    return int(total_frames * POSTER_POSITION)
+
+
+class PreviewCapture:
+    """
+    Plans which frames of a render become preview images (from the change
+    timeline) and collects downscaled copies as the frames go by.
+    feed() must be called with runs in timeline order.
+    """
+
+    def __init__(self, runs, fps, resolution, fade_duration=0.0):
+        self.resolution = resolution
+        self.total_frames = sum(count for _, count, _ in runs)
+        last_frame = max(self.total_frames - 1, 0)
+        duration = self.total_frames / fps
+
+        poster = min(_poster_frame(runs, self.total_frames), last_frame)
+        interval = max(SPRITE_INTERVAL, duration / SPRITE_MAX_TILES)
+        tiles = max(1, int(duration // interval))
+        animated_start = max(0, poster - int(fade_duration * fps))
+
+        self.sprite_interval = interval
+        self.sizes = {
+            "poster": _fit(resolution, POSTER_SIZE),
+            "sprite": _fit(resolution, SPRITE_TILE_SIZE),
+            "animated": _fit(resolution, ANIMATED_SIZE),
+        }
+        # (frame index, kind, slot), sorted by frame
+        plan = [(poster, "poster", 0)]
+        plan += [(min(int(i * interval * fps), last_frame), "sprite", i) for i in range(tiles)]
+        plan += [
+            (min(animated_start + int(k * fps / ANIMATED_FPS), last_frame), "animated", k)
+            for k in range(int(ANIMATED_SECONDS * ANIMATED_FPS))
+        ]
+        self._plan = sorted(plan)
+        self._next = 0
+        self.images = {"poster": {}, "sprite": {}, "animated": {}}
+
+    @property
+    def frames_wanted(self):
+        """Frame indices still to capture"""
+        return [frame for frame, _, _ in self._plan[self._next:]]
+
+    def feed(self, first_frame, count, frame):
+        """Offer a frame shown from first_frame for `count` frames"""
+        end = first_frame + count
+        image = None
+        while self._next < len(self._plan) and self._plan[self._next][0] < end:
+            index, kind, slot = self._plan[self._next]
+            self._next += 1
+            if index < first_frame:
+                continue
+            if image is None:
+                image = Image.fromarray(frame)
+            self.images[kind][slot] = image.resize(self.sizes[kind], Image.BILINEAR, reducing_gap=2.0)
+
+    def write(self, output_path):
+        """
+        Save the captured images next to output_path (see preview_paths).
+        Returns {"poster", "sprite", "animated"} paths plus "sprite_layout"
+        ({columns, rows, count, tile_width, tile_height, interval}); kinds
+        with no captured frames (e.g. the render stopped early) are left out,
+        and None is returned if nothing was captured.
+        """
+        paths = preview_paths(output_path)
+        written = {}
+
+        if self.images["poster"]:
+            self.images["poster"][0].save(paths["poster"], "JPEG", quality=POSTER_QUALITY, optimize=True)
+            written["poster"] = paths["poster"]
+
+        tiles = [self.images["sprite"][i] for i in sorted(self.images["sprite"])]
+        if tiles:
+            tile_w, tile_h = self.sizes["sprite"]
+            columns = min(SPRITE_COLUMNS, len(tiles))
+            rows = -(-len(tiles) // columns)
+            sheet = np.zeros((rows * tile_h, columns * tile_w, 3), dtype=np.uint8)
+            for i, tile in enumerate(tiles):
+                row, column = divmod(i, columns)
+                sheet[row * tile_h:(row + 1) * tile_h, column * tile_w:(column + 1) * tile_w] = np.asarray(tile)
+            Image.fromarray(sheet).save(paths["sprite"], "JPEG", quality=SPRITE_QUALITY, optimize=True)
+            written["sprite"] = paths["sprite"]
+            written["sprite_layout"] = {
+                "columns": columns,
+                "rows": rows,
+                "count": len(tiles),
+                "tile_width": tile_w,
+                "tile_height": tile_h,
+                "interval": round(self.sprite_interval, 3),
+            }
+
+        frames = [self.images["animated"][k] for k in sorted(self.images["animated"])]
+        if frames:
+            frames[0].save(
+                paths["animated"], "WEBP", save_all=True, append_images=frames[1:],
+                duration=int(1000 / ANIMATED_FPS), loop=0, quality=60, method=4
+            )
+            written["animated"] = paths["animated"]
+
+        return written or None
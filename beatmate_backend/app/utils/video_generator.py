@@ -1,7 +1,57 @@
 import os
 import re
-from moviepy.editor import ImageClip, AudioFileClip, CompositeVideoClip, TextClip
-from moviepy.video.fx.all import fadein, fadeout
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app import config
+from app.utils.text_raster import rasterize_text, resolve_font_path, load_font
+from app.utils.background_cache import load_background_frame
+from app.utils.compositor import FrameCompositor
+from app.utils.media_probe import probe_duration
+from app.utils.frame_scheduler import build_change_timeline, split_timeline, count_frames, FADE_DURATION
+from app.utils.ffmpeg_tools import FrameWriter, concat_videos
+from app.utils.encoding_profiles import ENCODING_PROFILES, resolve_profile, profile_fps, video_encoder_args
+from app.utils.audio_mux import mux_audio, prepare_audio
+from app.utils.disk_cache import file_sha256
+from app.utils.render_stats import RenderStats, peak_rss_mb, reset_peak_rss
+from app.utils.thumbnails import PreviewCapture
+from app.utils.ass_renderer import render_ass_video
+
+# Render quality presets (the `quality` field of /generate-lyric-video).
+# "profile" is the encoding profile used unless the request picks one
+# (None: config.ENCODING_PROFILE). Encoder settings are shared by single-process
+# and chunked renders: chunks must match exactly so they can be joined without
+# re-encoding.
+QUALITY_PRESETS = {
+    "preview": {"resolution": (854, 480), "fps": 12, "profile": "preview"},
+    "standard": {"resolution": (1920, 1080), "fps": 24, "profile": None},
+    "high": {"resolution": (1920, 1080), "fps": 30, "profile": "archive"},
+}
+DEFAULT_QUALITY = "standard"
+
+# Output aspect ratios (the `aspects` field of /generate-lyric-video).
+# Frame and font sizes are at standard/high quality; presets with a smaller
+# resolution scale them down. Narrow frames wrap fewer characters per line onto
+# more lines, at a font size where a full line still fits 85% of the width.
+ASPECT_RATIOS = {
+    "16:9": {"resolution": (1920, 1080), "fontsize": 110, "max_chars_per_line": 30, "max_lines": 3},
+    "9:16": {"resolution": (1080, 1920), "fontsize": 88, "max_chars_per_line": 16, "max_lines": 5},
+    "1:1": {"resolution": (1080, 1080), "fontsize": 80, "max_chars_per_line": 18, "max_lines": 4},
+}
+DEFAULT_ASPECT = "16:9"
+
+# Stroke width at 110px text; scaled with the font size
+BASE_FONTSIZE = 110
+BASE_STROKE_WIDTH = 6
+# Rendering engines (config.LYRIC_VIDEO_ENGINE):
+#   frames - text rasterized with Pillow, composited in NumPy, piped to ffmpeg
+#   ass    - text burned in by ffmpeg's libass filter (no per-frame Python work)
+ENGINES = ("frames", "ass")
+
+# Closed GOPs: every chunk starts on an IDR frame and never references another chunk
+CHUNK_ENCODER_ARGS = ["-x264-params", "open-gop=0"]
+
 
 def split_text_into_lines(text, max_chars_per_line=35, max_lines=3):
     """
@@ -161,137 +211,507 @@ def group_words_into_segments(word_timestamps, max_duration=5.0, min_duration=2.
     return segments
 
 
-def render_lyric_video(
-    audio_path,
-    word_timestamps,
-    background_image_path,
-    output_path,
-    resolution=(1920, 1080),  # 16:9 aspect ratio
-    fontsize=110,  # Larger font for better visibility
-):
+def aspect_resolution(aspect, quality=DEFAULT_QUALITY):
+    """Frame size of an aspect ratio at a quality preset (even dimensions for yuv420p)"""
+    width, height = ASPECT_RATIOS[aspect]["resolution"]
+    preset_w, preset_h = QUALITY_PRESETS[quality]["resolution"]
+    scale = min(preset_w / 1920, preset_h / 1080)
+    return (2 * round(width * scale / 2), 2 * round(height * scale / 2))
+
+
+def text_layout(resolution, aspect=DEFAULT_ASPECT, fontsize=None):
+    """
+    Text styling and wrapping for one output, scaled from the aspect's
+    full-size layout to `resolution`.
     """
-    Renders a professional lyric video with intelligent text breaking.
+    layout = ASPECT_RATIOS[aspect]
+    full_w, full_h = layout["resolution"]
+    fontsize = fontsize or round(layout["fontsize"] * min(resolution[0] / full_w, resolution[1] / full_h))
+    return {
+        "fontsize": fontsize,
+        "stroke_width": max(2, round(BASE_STROKE_WIDTH * fontsize / BASE_FONTSIZE)),
+        "max_chars_per_line": layout["max_chars_per_line"],
+        "max_lines": layout["max_lines"],
+    }
+
+
+def caption_lines(segment, layout):
+    """Split a segment's text into lines with smart breaking, per `layout`"""
+    return split_text_into_lines(
+        segment["text"], 
+        max_chars_per_line=layout["max_chars_per_line"],  # Shorter lines = bigger appearance
+        max_lines=layout["max_lines"]
+    )
+
+
+def build_text_layer(segment, resolution, layout, font_path=None):
+    """
+    Rasterize a segment into an RGBA tile, centered on the frame,
+    styled and wrapped per `layout` (see text_layout).
+    Returns {"rgba", "x", "y"}.
+    """
+    lines = caption_lines(segment, layout)
+    print(f"[Video Generator] Segment {segment['start']:.1f}s: {lines}")
     
-    Features:
-    - Intelligent sentence/phrase boundary detection
-    - Aesthetic brush-style font
-    - Large, readable text (110px)
-    - White text with bold black outline
-    - Static text (no color changes)
-    - Centered and properly positioned
-    - Smooth fade transitions
-    - 16:9 aspect ratio (1920x1080)
+    # Rasterize text with bold styling (RGBA array, no ImageMagick)
+    rgba = rasterize_text(
+        lines,
+        fontsize=layout["fontsize"],
+        max_width=int(resolution[0] * 0.85),  # 85% width for better margins
+        font_path=font_path,
+        color=(255, 255, 255),
+        stroke_color=(0, 0, 0),
+        stroke_width=layout["stroke_width"]  # Extra thick stroke for bold appearance
+    )
+    return {
+        "rgba": rgba,
+        "x": (resolution[0] - rgba.shape[1]) // 2,
+        "y": (resolution[1] - rgba.shape[0]) // 2,
+    }
+
+
+def _compositor_for(segments, background, resolution, layout):
+    """
+    FrameCompositor that rasterizes each segment only when it comes on screen
+    (and frees it when it leaves), so memory doesn't grow with song length
+    """
+    font_path = resolve_font_path()
+    return FrameCompositor(
+        background, lambda index: build_text_layer(segments[index], resolution, layout, font_path)
+    )
+
+
+def _frame_loop_stages(compositor, loop_seconds):
+    """Split a frame loop's wall time into text build, compositing and encoding"""
+    return {
+        "text": compositor.build_seconds,
+        "composite": compositor.render_seconds - compositor.build_seconds,
+        "encode": loop_seconds - compositor.render_seconds,
+    }
+
+
+def _render_chunk(chunk_index, runs, segments, background_image_path, output_path,
+                  resolution, layout, fps, video_args):
+    """
+    Render one chunk of the timeline to a video-only file (process pool worker).
+    Only the segments visible in this chunk are rasterized.
+    Returns (output_path, peak RSS of this worker in MB, peak RSS of its
+    encoder, stage timings).
+    """
+    reset_peak_rss()
+    background = load_background_frame(background_image_path, resolution)
+    compositor = _compositor_for(segments, background, resolution, layout)
+    
+    start = time.perf_counter()
+    with FrameWriter(output_path, resolution, fps=fps, video_args=video_args,
+                     extra_args=CHUNK_ENCODER_ARGS) as writer:
+        for _, frame_count, state in runs:
+            writer.write_frame(compositor.render(state), repeat=frame_count)
+    stages = _frame_loop_stages(compositor, time.perf_counter() - start)
+    
+    print(f"[Video Generator] Chunk {chunk_index + 1} done ({sum(c for _, c, _ in runs)} frames)")
+    return output_path, peak_rss_mb(), writer.peak_rss_mb, stages
+
+
+def _render_parallel(chunks, segments, background_image_path, output_path,
+                     resolution, layout, fps, video_args, audio_path=None, sink=None, on_progress=None,
+                     stats=None):
+    """
+    Render timeline chunks in a process pool, then join them with the concat
+    demuxer (stream copy). With audio_path/sink the join also muxes the audio
+    and streams the result to the sink (see concat_videos), so the sink only
+    receives data once every chunk is encoded: the upload overlaps the join,
+    not the encodes.
+    Worker and encoder peak RSS are added to `stats` (RenderStats).
+    """
+    # Warm the background cache once so every worker memory-maps the same frame
+    load_background_frame(background_image_path, resolution)
+    
+    chunk_dir = tempfile.mkdtemp(prefix="lyric_chunks_")
+    try:
+        chunk_paths = [os.path.join(chunk_dir, f"chunk_{i:03d}.mp4") for i in range(len(chunks))]
+        workers = min(len(chunks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _render_chunk, i, runs, segments, background_image_path,
+                    chunk_paths[i], resolution, layout, fps, video_args
+                )
+                for i, runs in enumerate(chunks)
+            ]
+            for done, future in enumerate(futures, start=1):
+                _, worker_rss, encoder_rss, stages = future.result()
+                if stats:
+                    stats.add_frames(sum(count for _, count, _ in chunks[done - 1]))
+                    stats.add_worker_peak(worker_rss)
+                    stats.add_encoder_peak(encoder_rss)
+                    for name, seconds in stages.items():
+                        stats.add_stage(name, seconds)
+                if on_progress:
+                    on_progress(done / len(futures))
+        
+        print(f"[Video Generator] Joining {len(chunks)} chunks...")
+        join_start = time.perf_counter()
+        concat_videos(chunk_paths, output_path, audio_path=audio_path, sink=sink)
+        if stats:
+            stats.add_stage("mux", time.perf_counter() - join_start)
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+
+def _store_previews(preview_info, output_path, capture):
+    """Write a PreviewCapture's images; outputs with nothing captured get no previews"""
+    info = capture.write(output_path)
+    if info:
+        preview_info[output_path] = info
+
+
+def _capture_previews(capture, runs, segments, background_image_path, resolution, layout):
+    """
+    Composite just the frames a PreviewCapture still wants (for renders whose
+    frames never pass through this process: chunked and ass)
+    """
+    background = load_background_frame(background_image_path, resolution)
+    compositor = _compositor_for(segments, background, resolution, layout)
+    for first_frame, frame_count, state in runs:
+        wanted = capture.frames_wanted
+        if not wanted:
+            break
+        if wanted[0] < first_frame + frame_count:
+            capture.feed(first_frame, frame_count, compositor.render(state))
+
+
+def _render_video_stream(runs, segments, background_image_path, output_path,
+                         resolution, layout, fps, video_args, chunks, audio_path=None, sink=None,
+                         on_progress=None, stats=None, previews=None):
+    """
+    Encode the lyric video stream for one output: video-only, or with a sink,
+    a fragmented MP4 with audio_path stream-copied in, streamed while encoding.
+    on_progress(fraction) is called as frames (or chunks) are finished.
+    Frames and encoder peak RSS are added to `stats` (RenderStats), and
+    composited frames are offered to `previews` (PreviewCapture).
+    """
+    if chunks > 1:
+        timeline_chunks = split_timeline(runs, chunks)
+        print(f"[Video Generator] Parallel render: {len(timeline_chunks)} chunks")
+        _render_parallel(
+            timeline_chunks, segments, background_image_path,
+            output_path, resolution, layout, fps, video_args,
+            audio_path=audio_path, sink=sink, on_progress=on_progress, stats=stats
+        )
+        if previews:
+            _capture_previews(previews, runs, segments, background_image_path, resolution, layout)
+        return
+
+    # Background - exactly `resolution`, cover-scaled and center-cropped (cached)
+    background = load_background_frame(background_image_path, resolution)
+    compositor = _compositor_for(segments, background, resolution, layout)
+    
+    # Composite each distinct frame once (only the text tiles' pixels are
+    # touched) and repeat it for the length of its run
+    audio_args = {"audio_path": audio_path, "audio_codec": "copy", "sink": sink} if sink is not None else {}
+    total_frames = sum(count for _, count, _ in runs) or 1
+    frames_done = 0
+    reported = 0.0
+    start = time.perf_counter()
+    with FrameWriter(output_path, resolution, fps=fps, **audio_args, video_args=video_args) as writer:
+        for first_frame, frame_count, state in runs:
+            frame = compositor.render(state)
+            writer.write_frame(frame, repeat=frame_count)
+            if previews:
+                previews.feed(first_frame, frame_count, frame)
+            frames_done += frame_count
+            if on_progress and frames_done / total_frames - reported >= 0.01:
+                reported = frames_done / total_frames
+                on_progress(reported)
+    
+    loop_seconds = time.perf_counter() - start
+    
+    print(f"[Video Generator] Built {compositor.tiles_built} text tiles, "
+          f"peak {compositor.peak_tile_bytes / 1e6:.1f} MB on screen")
+    if stats:
+        stats.add_frames(frames_done)
+        stats.add_encoder_peak(writer.peak_rss_mb)
+        for name, seconds in _frame_loop_stages(compositor, loop_seconds).items():
+            stats.add_stage(name, seconds)
+
+
+def _check_options(quality, engine):
+    """Validate quality/engine; returns the engine (default: config.LYRIC_VIDEO_ENGINE)"""
+    if quality not in QUALITY_PRESETS:
+        raise ValueError(f"Unknown quality '{quality}'. Choose from: {', '.join(QUALITY_PRESETS)}")
+    engine = engine or config.LYRIC_VIDEO_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Choose from: {', '.join(ENGINES)}")
+    return engine
+
+
+def render_settings(aspect, quality=DEFAULT_QUALITY, engine=None, profile=None):
+    """
+    Everything besides the inputs that determines a rendered output: engine,
+    frame size, text layout, font, fps and encoding profile (e.g. for render
+    cache keys)
+    """
+    engine = _check_options(quality, engine)
+    preset = QUALITY_PRESETS[quality]
+    profile = resolve_profile(profile, preset["profile"])
+    resolution = aspect_resolution(aspect, quality)
+    font_path = resolve_font_path()
+    return {
+        "engine": engine,
+        "resolution": list(resolution),
+        "layout": text_layout(resolution, aspect),
+        "font": file_sha256(font_path) if font_path else None,
+        "fps": profile_fps(profile, preset["fps"]),
+        "encoder": {"profile": profile, **ENCODING_PROFILES[profile]},
+    }
+
+
+def prepare_render_inputs(audio_path, background_image_path, aspects, quality=DEFAULT_QUALITY):
+    """
+    Warm everything a render needs besides the word timings - background
+    frames per output size, the font, the muxable audio - so it can run while
+    the lyrics are still being aligned. The render then finds them in the
+    background / font / AAC caches.
     """
-    audio = AudioFileClip(audio_path)
-    duration = audio.duration
+    font_path = resolve_font_path()
+    for aspect in aspects:
+        resolution = aspect_resolution(aspect, quality)
+        load_background_frame(background_image_path, resolution)
+        load_font(font_path, text_layout(resolution, aspect)["fontsize"])
+    prepare_audio(audio_path, "lyric_video.mp4")  # only the container matters
 
-    # Background - ensure 16:9 aspect ratio
-    bg = ImageClip(background_image_path).set_duration(duration)
-    # Resize to exactly match resolution while maintaining aspect ratio
-    bg = bg.resize(width=resolution[0])
-    if bg.h < resolution[1]:
-        bg = bg.resize(height=resolution[1])
+
+def _render_targets(audio_path, word_timestamps, background_image_path, targets,
+                    fps, chunks, quality, engine, profile, progress_callback=None, previews=False):
+    """
+    Render targets ({"output_path", "resolution", "layout", "sink"} dicts).
+    Segmentation, the change timeline and the audio prep are done once and
+    shared by every target. progress_callback(fraction) reports overall progress.
+    With previews, poster/sprite/animated images are written next to each output.
+    Returns render stats (see RenderStats.as_dict), plus "previews":
+    {output_path: PreviewCapture.write() info} when previews are made.
+    """
+    stats = RenderStats()
+    preset = QUALITY_PRESETS[quality]
+    fps = fps or profile_fps(profile, preset["fps"])
+    chunks = chunks or config.RENDER_CHUNKS
+    # Chunk encoders run side by side; split the cores between them
+    video_args = video_encoder_args(profile, fps, processes=chunks if engine == "frames" else 1)
+    sizes = ", ".join("{}x{}".format(*target["resolution"]) for target in targets)
+    print(f"[Video Generator] Quality: {quality} ({sizes} @ {fps}fps), "
+          f"encoding profile: {profile}, engine: {engine}")
+    
+    duration = probe_duration(audio_path)
     
     # Group words into segments with intelligent breaking
     print("[Video Generator] Creating text segments with smart boundaries...")
-    segments = group_words_into_segments(
-        word_timestamps, 
-        max_duration=5.0,  # Longer segments for complete sentences
-        min_duration=2.5   # Minimum duration before checking for breaks
-    )
+    with stats.stage("segment"):
+        segments = group_words_into_segments(
+            word_timestamps, 
+            max_duration=5.0,  # Longer segments for complete sentences
+            min_duration=2.5   # Minimum duration before checking for breaks
+        )
     print(f"[Video Generator] Created {len(segments)} text segments.")
     
     # If no segments (pure instrumental or no lyrics detected), just render background
-    all_text_clips = []
-    
     if not segments:
         print("[Video Generator] No lyrics detected - rendering instrumental video (background only).")
-    else:
-        # Try bold brush/script fonts (in order of preference)
-        brush_fonts = [
-            "Marker-Felt-Wide",      # Bold marker/brush style (Mac)
-            "Bradley-Hand-Bold",     # Bold handwritten (Mac/Windows)
-            "Chalkduster",           # Bold chalk/brush style (Mac)
-            "Comic-Sans-MS-Bold",    # Not script but bold and friendly
-            "Arial-Black",           # Very bold fallback
-            "Impact"                 # Last resort
-        ]
+    
+    # Work out which frames actually differ (same for every output)
+    with stats.stage("segment"):
+        runs = build_change_timeline(segments, duration, fps=fps, fade_duration=FADE_DURATION)
+    total_frames = sum(count for _, count, _ in runs)
+    print(f"[Video Generator] {len(runs)} distinct frames for {total_frames} output frames.")
+    
+    # One audio source for all outputs (stream-copyable, or AAC-encoded once)
+    with stats.stage("mux"):
+        audio_source = prepare_audio(audio_path, targets[0]["output_path"])
+    preview_info = {}
+    
+    for index, target in enumerate(targets):
+        output_path, resolution, layout = target["output_path"], target["resolution"], target["layout"]
+        capture = PreviewCapture(runs, fps, resolution, FADE_DURATION) if previews else None
         
-        selected_font = "Impact"  # Default fallback
-        for font in brush_fonts:
-            try:
-                test_clip = TextClip("Test", font=font, fontsize=fontsize)
-                test_clip.close()
-                selected_font = font
-                print(f"[Video Generator] Using font: {selected_font}")
-                break
-            except:
-                continue
+        def on_progress(fraction, index=index):
+            if progress_callback:
+                progress_callback((index + fraction) / len(targets))
         
-        # Create text clips for each segment
-        for segment in segments:
-            segment_start = segment["start"]
-            segment_end = segment["end"]
-            segment_duration = segment_end - segment_start
-            segment_text = segment["text"]
-            
-            # Split text into 2-3 lines with smart breaking
-            lines = split_text_into_lines(
-                segment_text, 
-                max_chars_per_line=30,  # Shorter lines = bigger appearance
-                max_lines=3
+        print(f"[Video Generator] Rendering {resolution[0]}x{resolution[1]} to {output_path}...")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        
+        if engine == "ass":
+            # One ffmpeg process: looped background + libass captions + audio
+            captions = [(seg["start"], seg["end"], caption_lines(seg, layout)) for seg in segments]
+            with stats.stage("encode"):
+                render_ass_video(
+                    captions, load_background_frame(background_image_path, resolution),
+                    output_path, resolution, layout, resolve_font_path(), fps,
+                    count_frames(duration, fps), video_args, audio_source, sink=target.get("sink")
+                )
+            stats.add_frames(count_frames(duration, fps))
+            if capture:
+                with stats.stage("previews"):
+                    _capture_previews(capture, runs, segments, background_image_path, resolution, layout)
+                    _store_previews(preview_info, output_path, capture)
+            on_progress(1.0)
+            continue
+        
+        if target.get("sink") is not None:
+            # Fragmented MP4 with the audio muxed in by the encoder, streamed to
+            # the sink (e.g. a storage upload) while it is being written
+            print("[Video Generator] Streaming fragmented MP4 to sink...")
+            _render_video_stream(
+                runs, segments, background_image_path, output_path,
+                resolution, layout, fps, video_args, chunks,
+                audio_path=audio_source, sink=target["sink"], on_progress=on_progress, stats=stats,
+                previews=capture
             )
-            multiline_text = "\n".join(lines)
-            
-            print(f"[Video Generator] Segment {segment_start:.1f}s: {lines}")
-            
-            # Create text clip with bold styling
-            try:
-                txt_clip = TextClip(
-                    multiline_text,
-                    fontsize=fontsize,
-                    font=selected_font,
-                    color="white",
-                    stroke_color="black",
-                    stroke_width=6,  # Extra thick stroke for bold appearance
-                    method="caption",
-                    size=(int(resolution[0] * 0.85), None),  # 85% width for better margins
-                    align="center"
-                ).set_start(segment_start).set_duration(segment_duration).set_position(("center", "center"))
-            except Exception as txt_error:
-                print(f"❌ TextClip error: {txt_error}")
-                print(f"   Font: {selected_font}, Text: {multiline_text[:50]}...")
-                raise RuntimeError(f"Failed to create text clip. Make sure ImageMagick is installed. Error: {txt_error}")
-            
-            # Add smooth fade in/out
-            txt_clip = fadein(txt_clip, 0.3)
-            txt_clip = fadeout(txt_clip, 0.3)
-            
-            all_text_clips.append(txt_clip)
-    
-    # Composite everything
-    print("[Video Generator] Compositing video...")
-    final = CompositeVideoClip([bg] + all_text_clips).set_duration(duration).set_audio(audio)
-
-    # Render with high quality
-    print(f"[Video Generator] Rendering to {output_path}...")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    final.write_videofile(
-        output_path, 
-        fps=24, 
-        codec="libx264", 
-        audio_codec="aac",
-        bitrate="8000k",
-        preset="medium",
-        threads=4
-    )
+            if capture:
+                with stats.stage("previews"):
+                    _store_previews(preview_info, output_path, capture)
+            continue
+        
+        # Encode the video stream on its own; audio is attached in the mux stage
+        root, ext = os.path.splitext(output_path)
+        video_only_path = f"{root}.video{ext}"
+        try:
+            _render_video_stream(
+                runs, segments, background_image_path, video_only_path,
+                resolution, layout, fps, video_args, chunks, on_progress=on_progress, stats=stats,
+                previews=capture
+            )
+            print("[Video Generator] Muxing audio...")
+            with stats.stage("mux"):
+                mux_audio(video_only_path, audio_source, output_path)
+            if capture:
+                with stats.stage("previews"):
+                    _store_previews(preview_info, output_path, capture)
+            on_progress(1.0)
+        finally:
+            if os.path.exists(video_only_path):
+                os.remove(video_only_path)
+    
+    summary = stats.as_dict()
+    print(f"[Video Generator] ✅ Professional lyric video created successfully! "
+          f"({summary['frames']} frames in {summary['seconds']}s, {summary['fps']} fps, "
+          f"peak RSS {summary['peak_rss_mb']} MB)")
+    if previews:
+        summary["previews"] = preview_info
+    return summary
+
 
-    # Cleanup
-    print("[Video Generator] Cleaning up resources...")
-    final.close()
-    audio.close()
-    bg.close()
-    for c in all_text_clips:
-        c.close()
+def render_lyric_videos(
+    audio_path,
+    word_timestamps,
+    background_image_path,
+    outputs,  # {aspect: output_path}, e.g. {"16:9": ..., "9:16": ...}
+    fps=None,
+    chunks=None,
+    quality=DEFAULT_QUALITY,
+    sinks=None,  # optional {aspect: sink} to stream outputs to (e.g. uploads)
+    engine=None,  # "frames" or "ass" (default: config.LYRIC_VIDEO_ENGINE)
+    profile=None,  # encoding profile (default: the quality preset's, else config.ENCODING_PROFILE)
+    progress_callback=None,  # called with overall progress (0-1) while rendering
+    previews=False,  # also write poster / sprite sheet / animated WebP per output
+):
+    """
+    Renders one lyric video per requested aspect ratio (see ASPECT_RATIOS).
+    
+    Features:
+    - Intelligent sentence/phrase boundary detection
+    - Aesthetic brush-style font (rasterized with Pillow, no ImageMagick)
+    - Large, readable text (110px at 1080p)
+    - White text with bold black outline
+    - Static text (no color changes)
+    - Centered and properly positioned, wrapped to each output's width
+    - Smooth fade transitions
+    - 16:9, 9:16 and 1:1 outputs
+    
+    Segmentation, the change timeline and the audio prep are shared by every
+    output; only text layout, compositing and the video encode run per output.
+    
+    Only frames where the overlay changes are composited (segment starts/ends and
+    fade steps); static stretches are repeated straight into the ffmpeg pipe.
+    Text is blended in place into one reused frame buffer, touching only the
+    pixels covered by text (see app/utils/compositor.py).
+    With chunks > 1 (default: config.RENDER_CHUNKS) the timeline is split at
+    segment boundaries and the chunks are rendered in parallel processes.
+    The song audio is never decoded: it is stream-copied (or AAC-encoded once and
+    cached) onto the finished video streams.
+    
+    Outputs with a sink are written as fragmented MP4 and handed to
+    sink.write() fragment by fragment while encoding runs (.mp4 only), so an
+    upload can finish right after the encoder does. Chunked renders are the
+    exception: their outputs are streamed while the encoded chunks are joined,
+    i.e. the upload starts after encoding.
+    
+    quality picks a preset from QUALITY_PRESETS ("preview" renders 480p at 12fps
+    with an ultrafast encode for quick iteration). profile picks the x264
+    settings from encoding_profiles.ENCODING_PROFILES (CRF, preset, GOP...).
+    
+    engine "ass" skips all of the above per-frame work: captions are written as
+    an ASS script and burned in by ffmpeg/libass in a single process.
     
-    print(f"[Video Generator] ✅ Professional lyric video created successfully!")
+    Memory stays flat with song length: a segment's text is rasterized when it
+    comes on screen and freed when it leaves (see _compositor_for).
+    With previews=True, a poster JPEG, a thumbnail sprite sheet for scrubbing
+    and a short looping WebP are captured from the composited frames and
+    written next to each output (see app/utils/thumbnails.py).
+    
+    Returns render stats: seconds, frames, fps and peak RSS in MB of this
+    process, of chunk workers and of the ffmpeg encoders; with previews,
+    "previews" maps each output path to its preview files and sprite layout.
+    """
+    engine = _check_options(quality, engine)
+    profile = resolve_profile(profile, QUALITY_PRESETS[quality]["profile"])
+    unknown = [aspect for aspect in outputs if aspect not in ASPECT_RATIOS]
+    if unknown:
+        raise ValueError(f"Unknown aspect ratio '{unknown[0]}'. Choose from: {', '.join(ASPECT_RATIOS)}")
+    
+    sinks = sinks or {}
+    targets = []
+    for aspect, output_path in outputs.items():
+        resolution = aspect_resolution(aspect, quality)
+        targets.append({
+            "output_path": output_path,
+            "resolution": resolution,
+            "layout": text_layout(resolution, aspect),
+            "sink": sinks.get(aspect),
+        })
+    return _render_targets(
+        audio_path, word_timestamps, background_image_path, targets,
+        fps, chunks, quality, engine, profile, progress_callback, previews
+    )
+
+
+def render_lyric_video(
+    audio_path,
+    word_timestamps,
+    background_image_path,
+    output_path,
+    resolution=None,  # default from quality preset and aspect (1920x1080 for standard 16:9)
+    fontsize=None,  # default 110px at 1080p, scaled with resolution
+    fps=None,
+    chunks=None,
+    quality=DEFAULT_QUALITY,
+    aspect=DEFAULT_ASPECT,
+    engine=None,
+    profile=None,
+    progress_callback=None,
+    previews=False,
+):
+    """
+    Renders a single lyric video (see render_lyric_videos); returns render stats.
+    """
+    engine = _check_options(quality, engine)
+    profile = resolve_profile(profile, QUALITY_PRESETS[quality]["profile"])
+    if aspect not in ASPECT_RATIOS:
+        raise ValueError(f"Unknown aspect ratio '{aspect}'. Choose from: {', '.join(ASPECT_RATIOS)}")
+    resolution = resolution or aspect_resolution(aspect, quality)
+    layout = text_layout(resolution, aspect, fontsize)
+    return _render_targets(
+        audio_path, word_timestamps, background_image_path,
+        [{"output_path": output_path, "resolution": resolution, "layout": layout}],
+        fps, chunks, quality, engine, profile, progress_callback, previews
+    )
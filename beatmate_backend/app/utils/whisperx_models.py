@@ -0,0 +1,116 @@
+"""
+WhisperX Models
+Process-wide pool of WhisperX models: the ASR model and one alignment model
+per language are loaded on first use and kept warm for later alignments, then
+released after WHISPERX_IDLE_SECONDS without use. Inference runs one at a
+time per process (session()), so concurrent alignments never load duplicate
+models or run two transcriptions against the same model at once.
+
+whisperx / torch are imported lazily: they are optional and only needed
+when the WhisperX fallback actually runs.
+"""
+import gc
+import threading
+import time
+from contextlib import contextmanager
+from app import config
+
+ASR_KEY = "asr"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class WhisperXPool:
+    """Loaded models by key ('asr' or 'align:<language>'), with last-use times"""
+
+    def __init__(self, idle_seconds):
+        self.idle_seconds = idle_seconds
+        self._models = {}
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self._evictor = None
+        self._device = None
+
+    @property
+    def device(self):
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
+    @property
+    def compute_type(self):
+        # float16 on GPU; CPU nodes pick int8 (faster) or float32 (more accurate)
+        return "float16" if self.device == "cuda" else config.WHISPERX_COMPUTE_TYPE
+
+    @contextmanager
+    def session(self):
+        """Exclusive use of the pool's models for one alignment"""
+        with self._lock:
+            yield self
+
+    def _get(self, key, load):
+        if key not in self._models:
+            start = time.perf_counter()
+            self._models[key] = load()
+            print(f"[WhisperX] Loaded {key} model in {time.perf_counter() - start:.1f}s "
+                  f"({self.device}, {self.compute_type})")
+            self._start_evictor()
+        else:
+            print(f"[WhisperX] ♻️  Reusing warm {key} model")
+        self._last_used[key] = time.monotonic()
+        return self._models[key]
+
+    def asr_model(self):
+        """The transcription model (config.WHISPERX_MODEL); call inside session()"""
+        import whisperx
+        return self._get(ASR_KEY, lambda: whisperx.load_model(
+            config.WHISPERX_MODEL, self.device, compute_type=self.compute_type
+        ))
+
+    def align_model(self, language):
+        """(alignment model, metadata) for a language; call inside session()"""
+        import whisperx
+        return self._get(f"align:{language}", lambda: whisperx.load_align_model(
+            language_code=language, device=self.device
+        ))
+
+    def evict_idle(self, now=None):
+        """Release models unused for idle_seconds; returns the evicted keys"""
+        now = now if now is not None else time.monotonic()
+        idle = [key for key, used in self._last_used.items() if now - used >= self.idle_seconds]
+        for key in idle:
+            del self._models[key]
+            del self._last_used[key]
+        if idle:
+            gc.collect()
+            if self.device == "cuda":
+                import torch
+                torch.cuda.empty_cache()
+            print(f"[WhisperX] Released idle models: {', '.join(idle)}")
+        return idle
+
+    def _start_evictor(self):
+        if self._evictor is None:
+            self._evictor = threading.Thread(target=self._evict_loop, daemon=True)
+            self._evictor.start()
+
+    def _evict_loop(self):
+        while True:
+            time.sleep(max(1.0, min(self.idle_seconds / 4, 60.0)))
+            # Skip the round if an alignment is running; its models aren't idle
+            if self._lock.acquire(blocking=False):
+                try:
+                    self.evict_idle()
+                finally:
+                    self._lock.release()
+
+
+def get_whisperx_pool():
+    """This process's WhisperX model pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WhisperXPool(config.WHISPERX_IDLE_SECONDS)
+        return _pool
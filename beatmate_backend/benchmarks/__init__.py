@@ -0,0 +1,3 @@
+"""
+Render benchmarks (run from beatmate_backend/, e.g. `python -m benchmarks.parallel_render`)
+"""
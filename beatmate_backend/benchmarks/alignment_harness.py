@@ -0,0 +1,133 @@
+"""
+Alignment Harness
+Runs alignment providers (see app/utils/alignment_providers.py) over the
+bundled songs that have lyrics and compares them: latency, failures and
+timeouts, word count, how much of the words' time falls in the locally
+detected vocal regions, and the mean start offset against the recorded
+fixture in files/alignments (what the 'stub' provider replays).
+
+With --record, the first provider's timings are saved as those fixtures
+(e.g. record 'assemblyai' on a networked machine, replay 'stub' offline).
+
+Usage (from beatmate_backend/):
+    python -m benchmarks.alignment_harness --providers stub vocal time
+    python -m benchmarks.alignment_harness --providers assemblyai vocal --repeat 3 --output alignment.json
+    python -m benchmarks.alignment_harness --record vocal
+"""
+import argparse
+import json
+import os
+import statistics
+from datetime import datetime, timezone
+from app.services.alignment_cache import pack_words
+from app.utils.aligner import read_lyrics_file
+from app.utils.alignment_providers import FIXTURES_DIR, StubProvider, get_provider, run_provider
+from app.utils.disk_cache import file_sha256
+from app.utils.vocal_activity import detect_vocal_regions_in_file, vocal_coverage
+from benchmarks.engine_compare import FILES_DIR, bundled_songs
+
+
+def start_offset_ms(words, reference):
+    """Mean |start difference| in ms against reference timings of the same words, else None"""
+    if not words or not reference or len(words) != len(reference):
+        return None
+    return round(1000 * statistics.mean(abs(w["start"] - r["start"]) for w, r in zip(words, reference)), 1)
+
+
+def record_fixture(song, audio_path, provider_name, words):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, f"{song}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "song": song,
+            "audio_sha256": file_sha256(audio_path),
+            "method": provider_name,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "words": pack_words(words),
+        }, f, separators=(",", ":"))
+    print(f"[Alignment Harness] Recorded {len(words)} words to {path}")
+
+
+def summarize(runs, providers):
+    """Per-provider latency, failure rate, coverage and offset"""
+    summary = {}
+    for name in providers:
+        mine = [run for run in runs if run["provider"] == name]
+        ok = [run for run in mine if run["status"] == "ok"]
+        offsets = [run["offset_ms"] for run in ok if run["offset_ms"] is not None]
+        summary[name] = {
+            "runs": len(mine),
+            "failures": len(mine) - len(ok),
+            "timeouts": sum(run["status"] == "timeout" for run in mine),
+            "p50_seconds": round(statistics.median(run["seconds"] for run in mine), 3) if mine else None,
+            "max_seconds": round(max(run["seconds"] for run in mine), 3) if mine else None,
+            "coverage": round(statistics.mean(run["coverage"] for run in ok), 3) if ok else None,
+            "offset_ms": round(statistics.mean(offsets), 1) if offsets else None,
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{'provider':<12} {'runs':>5} {'failed':>7} {'timeout':>8} {'p50 s':>8} {'max s':>8} "
+          f"{'coverage':>9} {'offset ms':>10}")
+    for name, row in summary.items():
+        fmt = lambda value, width, spec: f"{value:>{width}{spec}}" if value is not None else f"{'-':>{width}}"
+        print(f"{name:<12} {row['runs']:>5} {row['failures']:>7} {row['timeouts']:>8} "
+              f"{fmt(row['p50_seconds'], 8, '.2f')} {fmt(row['max_seconds'], 8, '.2f')} "
+              f"{fmt(row['coverage'], 9, '.1%')} {fmt(row['offset_ms'], 10, '.0f')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare alignment providers over the bundled songs")
+    parser.add_argument("--providers", nargs="+", default=["stub", "vocal", "time"],
+                        help="Providers to run (default: stub vocal time)")
+    parser.add_argument("--songs", nargs="+", default=None, help="Bundled song names (default: all with lyrics)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per song and provider")
+    parser.add_argument("--timeout", type=float, default=None, help="Override every provider's timeout (seconds)")
+    parser.add_argument("--record", default=None, metavar="PROVIDER",
+                        help="Save this provider's timings as the stub fixtures instead of comparing")
+    parser.add_argument("--output", default=None, help="Also write the runs and summary as JSON")
+    args = parser.parse_args()
+
+    providers = [args.record] if args.record else args.providers
+    for name in providers:
+        get_provider(name)  # fail fast on unknown names
+    stub = StubProvider()
+    runs = []
+
+    for song in args.songs or bundled_songs():
+        audio_path = os.path.join(FILES_DIR, "songs", f"{song}.mp3")
+        lyrics_text = read_lyrics_file(os.path.join(FILES_DIR, "lyrics", f"{song}.txt"))
+        regions = detect_vocal_regions_in_file(audio_path)
+        reference = stub.align(audio_path, lyrics_text)
+
+        for name in providers:
+            for attempt in range(args.repeat):
+                print(f"[Alignment Harness] {song}: {name} (run {attempt + 1}/{args.repeat})...")
+                words, status, seconds = run_provider(get_provider(name), audio_path, lyrics_text, args.timeout)
+                if args.record:
+                    if words:
+                        record_fixture(song, audio_path, name, words)
+                    break
+                runs.append({
+                    "song": song,
+                    "provider": name,
+                    "status": status,
+                    "seconds": round(seconds, 3),
+                    "words": len(words or []),
+                    "coverage": round(vocal_coverage(words, regions), 3) if words else None,
+                    "offset_ms": start_offset_ms(words, reference),
+                })
+
+    if args.record:
+        return
+    summary = summarize(runs, providers)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": runs, "summary": summary}, f, indent=2)
+        print(f"\n[Alignment Harness] ✅ {len(runs)} runs written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
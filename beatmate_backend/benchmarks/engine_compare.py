@@ -0,0 +1,77 @@
+"""
+Engine Comparison Benchmark
+Renders the bundled songs with each lyric video engine ('frames' and 'ass')
+and reports wall-clock time, speed relative to the song length, file size and
+peak memory (Python process / ffmpeg encoder).
+
+Usage (from beatmate_backend/):
+    python -m benchmarks.engine_compare
+    python -m benchmarks.engine_compare --songs "Streets" "Wishes" --quality preview
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+from app.utils.media_probe import probe_duration
+from app.utils.aligner import align_lyrics_time_based, clean_lyrics_for_alignment
+from app.utils.video_generator import render_lyric_video, ENGINES, QUALITY_PRESETS, DEFAULT_QUALITY
+
+FILES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../files"))
+
+
+def bundled_songs():
+    """Names of bundled songs that have lyrics (files/songs/*.mp3 + files/lyrics/*.txt)"""
+    songs = []
+    for path in sorted(glob.glob(os.path.join(FILES_DIR, "songs", "*.mp3"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if os.path.exists(os.path.join(FILES_DIR, "lyrics", f"{name}.txt")):
+            songs.append(name)
+    return songs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare lyric video rendering engines")
+    parser.add_argument("--songs", nargs="+", default=None, help="Bundled song names (default: all)")
+    parser.add_argument("--background", default="bg1.jpg", help="Bundled background (files/backgrounds/)")
+    parser.add_argument("--quality", default=DEFAULT_QUALITY, choices=list(QUALITY_PRESETS))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    args = parser.parse_args()
+
+    background_path = os.path.join(FILES_DIR, "backgrounds", args.background)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for song in args.songs or bundled_songs():
+            audio_path = os.path.join(FILES_DIR, "songs", f"{song}.mp3")
+            lyrics_path = os.path.join(FILES_DIR, "lyrics", f"{song}.txt")
+            duration = probe_duration(audio_path)
+
+            # Deterministic, offline alignment so only rendering is measured
+            with open(lyrics_path, "r", encoding="utf-8") as f:
+                words = align_lyrics_time_based(clean_lyrics_for_alignment(f.read()), duration)
+
+            for engine in args.engines:
+                output_path = os.path.join(tmpdir, f"{song}_{engine}.mp4")
+                start = time.perf_counter()
+                stats = render_lyric_video(audio_path, words, background_path, output_path,
+                                           quality=args.quality, engine=engine)
+                seconds = time.perf_counter() - start
+                results.append((song, engine, duration, seconds, os.path.getsize(output_path), stats))
+
+    print(f"\n{'song':<20} {'engine':<7} {'audio s':>8} {'render s':>9} {'x realtime':>10} {'MB':>7}"
+          f" {'peak MB':>8} {'ffmpeg MB':>10}   (quality={args.quality}, cpu_count={os.cpu_count()})")
+    for song, engine, duration, seconds, size, stats in results:
+        encoder_rss = f"{stats['encoder_peak_rss_mb']:.0f}" if stats["encoder_peak_rss_mb"] else "-"
+        print(f"{song:<20} {engine:<7} {duration:>8.1f} {seconds:>9.1f} {duration / seconds:>10.2f} {size / 1e6:>7.1f}"
+              f" {stats['peak_rss_mb']:>8.0f} {encoder_rss:>10}")
+
+    totals = {}
+    for _, engine, _, seconds, _, _ in results:
+        totals[engine] = totals.get(engine, 0.0) + seconds
+    if len(totals) > 1:
+        print("\nTotal: " + ", ".join(f"{engine} {seconds:.1f}s" for engine, seconds in totals.items()))
+
+
+if __name__ == "__main__":
+    main()
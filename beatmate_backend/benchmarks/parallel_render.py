@@ -0,0 +1,56 @@
+"""
+Parallel Render Benchmark
+Renders one bundled song with 1..N chunks and reports wall-clock speedup.
+
+Usage (from beatmate_backend/):
+    python -m benchmarks.parallel_render --song "Streets" --max-chunks 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from app.utils.media_probe import probe_duration
+from app.utils.aligner import align_lyrics_time_based, clean_lyrics_for_alignment
+from app.utils.video_generator import render_lyric_video
+
+FILES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../files"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunked lyric video rendering")
+    parser.add_argument("--song", default="Streets", help="Bundled song name (files/songs/<song>.mp3)")
+    parser.add_argument("--background", default="bg1.jpg", help="Bundled background (files/backgrounds/)")
+    parser.add_argument("--max-chunks", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    audio_path = os.path.join(FILES_DIR, "songs", f"{args.song}.mp3")
+    lyrics_path = os.path.join(FILES_DIR, "lyrics", f"{args.song}.txt")
+    background_path = os.path.join(FILES_DIR, "backgrounds", args.background)
+
+    # Deterministic, offline alignment so only rendering is measured
+    with open(lyrics_path, "r", encoding="utf-8") as f:
+        lyrics = clean_lyrics_for_alignment(f.read())
+    words = align_lyrics_time_based(lyrics, probe_duration(audio_path))
+
+    chunk_counts = []
+    n = 1
+    while n <= args.max_chunks:
+        chunk_counts.append(n)
+        n *= 2
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for chunks in chunk_counts:
+            output_path = os.path.join(tmpdir, f"bench_{chunks}.mp4")
+            start = time.perf_counter()
+            render_lyric_video(audio_path, words, background_path, output_path, chunks=chunks)
+            results.append((chunks, time.perf_counter() - start))
+
+    baseline = results[0][1]
+    print(f"\n{'chunks':>6}  {'seconds':>8}  {'speedup':>7}   (cpu_count={os.cpu_count()})")
+    for chunks, seconds in results:
+        print(f"{chunks:>6}  {seconds:>8.1f}  {baseline / seconds:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
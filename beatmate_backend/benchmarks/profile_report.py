@@ -0,0 +1,105 @@
+"""
+Encoding Profile Report
+Renders one sample clip under each encoding profile and tabulates render and
+encode time, file size, bitrate (audio included) and PSNR against a lossless
+reference encode of the same frames (higher is better; ~40 dB and up looks
+identical).
+
+Usage (from beatmate_backend/):
+    python -m benchmarks.profile_report
+    python -m benchmarks.profile_report --song "Wishes" --seconds 60 --profiles web mobile
+"""
+import argparse
+import os
+import re
+import subprocess
+import tempfile
+from app.utils.media_probe import probe_duration
+from app.utils.aligner import align_lyrics_time_based, clean_lyrics_for_alignment
+from app.utils.encoding_profiles import ENCODING_PROFILES, profile_fps
+from app.utils.ffmpeg_tools import get_ffmpeg_exe, run_ffmpeg
+from app.utils.video_generator import render_lyric_video, QUALITY_PRESETS, DEFAULT_QUALITY
+from benchmarks.engine_compare import FILES_DIR
+
+# Lossless x264 of the same frames; only used as the PSNR reference here
+REFERENCE_PROFILE = "reference"
+REFERENCE_SETTINGS = {
+    "codec": "libx264", "crf": 0, "preset": "ultrafast", "tune": "stillimage",
+    "gop": 4, "pix_fmt": "yuv420p", "fps": None, "maxrate": None, "bufsize": None,
+}
+
+
+def measure_psnr(distorted_path, reference_path, fps):
+    """Average PSNR (dB) of a video against a reference, compared at the reference fps"""
+    result = subprocess.run(
+        [get_ffmpeg_exe(), "-hide_banner", "-i", distorted_path, "-i", reference_path,
+         "-lavfi", f"[0:v]fps={fps}[d];[d][1:v]psnr", "-f", "null", "-"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    match = re.search(r"PSNR .*average:(\S+)", result.stderr.decode("utf-8", errors="replace"))
+    return float(match.group(1)) if match else None
+
+
+def render_sample(audio_path, words, background_path, output_path, quality, profile):
+    stats = render_lyric_video(audio_path, words, background_path, output_path, quality=quality, profile=profile)
+    size = os.path.getsize(output_path)
+    return {
+        "seconds": stats["seconds"],
+        "encode": stats["stages"].get("encode", 0.0),
+        "size": size,
+        "kbps": size * 8 / 1000 / probe_duration(output_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encoding profiles on a sample clip")
+    parser.add_argument("--song", default="Streets", help="Bundled song name (files/songs/<song>.mp3)")
+    parser.add_argument("--background", default="bg1.jpg", help="Bundled background (files/backgrounds/)")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Sample length from the start of the song")
+    parser.add_argument("--quality", default=DEFAULT_QUALITY, choices=list(QUALITY_PRESETS))
+    parser.add_argument("--profiles", nargs="+", default=list(ENCODING_PROFILES), choices=list(ENCODING_PROFILES))
+    args = parser.parse_args()
+
+    audio_path = os.path.join(FILES_DIR, "songs", f"{args.song}.mp3")
+    lyrics_path = os.path.join(FILES_DIR, "lyrics", f"{args.song}.txt")
+    background_path = os.path.join(FILES_DIR, "backgrounds", args.background)
+    duration = probe_duration(audio_path)
+
+    # Deterministic, offline alignment over the whole song, cut to the sample
+    with open(lyrics_path, "r", encoding="utf-8") as f:
+        words = align_lyrics_time_based(clean_lyrics_for_alignment(f.read()), duration)
+    words = [word for word in words if word["end"] <= args.seconds]
+
+    ENCODING_PROFILES[REFERENCE_PROFILE] = REFERENCE_SETTINGS
+    reference_fps = profile_fps(REFERENCE_PROFILE, QUALITY_PRESETS[args.quality]["fps"])
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sample_path = os.path.join(tmpdir, "sample.mp3")
+            run_ffmpeg(["-i", audio_path, "-t", str(args.seconds), "-c", "copy", sample_path])
+
+            reference_path = os.path.join(tmpdir, "reference.mp4")
+            print(f"[Profile Report] Rendering lossless reference ({args.seconds:.0f}s of {args.song})...")
+            render_sample(sample_path, words, background_path, reference_path, args.quality, REFERENCE_PROFILE)
+
+            for profile in args.profiles:
+                print(f"[Profile Report] Rendering with profile '{profile}'...")
+                output_path = os.path.join(tmpdir, f"{profile}.mp4")
+                result = render_sample(sample_path, words, background_path, output_path, args.quality, profile)
+                result["psnr"] = measure_psnr(output_path, reference_path, reference_fps)
+                results.append((profile, result))
+    finally:
+        del ENCODING_PROFILES[REFERENCE_PROFILE]
+
+    print(f"\n{'profile':<9} {'crf':>4} {'preset':<10} {'fps':>4} {'render s':>9} {'encode s':>9}"
+          f" {'MB':>7} {'kb/s':>6} {'PSNR dB':>8}   (quality={args.quality}, {args.seconds:.0f}s sample)")
+    for profile, result in results:
+        settings = ENCODING_PROFILES[profile]
+        fps = profile_fps(profile, QUALITY_PRESETS[args.quality]["fps"])
+        psnr = f"{result['psnr']:.2f}" if result["psnr"] is not None else "-"
+        print(f"{profile:<9} {settings['crf']:>4} {settings['preset']:<10} {fps:>4} {result['seconds']:>9.1f}"
+              f" {result['encode']:>9.1f} {result['size'] / 1e6:>7.2f} {result['kbps']:>6.0f} {psnr:>8}")
+
+
+if __name__ == "__main__":
+    main()
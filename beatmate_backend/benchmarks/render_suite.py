@@ -0,0 +1,222 @@
+"""
+Render Benchmark Suite
+Renders every bundled song that has lyrics against every bundled background,
+through both the service entry point (generate_lyric_video_from_files) and
+the renderer (render_lyric_video), with deterministic time-based alignment.
+Records per-stage wall time (align, segment, text, composite, encode, mux),
+frames/sec, output size and peak memory per case, and writes them as JSON.
+
+With --compare, each case is diffed against a saved baseline and the run
+exits non-zero when a case got slower or bigger in memory than --threshold.
+
+Usage (from beatmate_backend/):
+    python -m benchmarks.render_suite --output baseline.json
+    python -m benchmarks.render_suite --output after.json --compare baseline.json
+    python -m benchmarks.render_suite --songs "Streets" --backgrounds bg1.jpg --quality preview
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from app.utils.media_probe import probe_duration
+from app import config
+from app.services import video_service
+from app.utils.aligner import align_lyrics_time_based, clean_lyrics_for_alignment
+from app.utils.video_generator import render_lyric_video, ENGINES, QUALITY_PRESETS, DEFAULT_QUALITY
+from benchmarks.engine_compare import FILES_DIR, bundled_songs
+
+RESULTS_VERSION = 1
+ENTRY_POINTS = ("service", "render")
+STAGES = ("align", "segment", "text", "composite", "encode", "mux", "previews")
+# Per-case metrics checked by --compare, and whether higher is worse
+COMPARED_METRICS = {"seconds": True, "fps": False, "peak_rss_mb": True, "size_bytes": True}
+
+
+def bundled_backgrounds():
+    return [os.path.basename(path) for path in sorted(glob.glob(os.path.join(FILES_DIR, "backgrounds", "bg*.jpg")))]
+
+
+def environment():
+    """Where the numbers came from (results are only comparable on similar machines)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "render_chunks": config.RENDER_CHUNKS,
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def run_case(entry, song, background, quality, engine, tmpdir):
+    """Render one case; returns its result dict"""
+    audio_path = os.path.join(FILES_DIR, "songs", f"{song}.mp3")
+    lyrics_path = os.path.join(FILES_DIR, "lyrics", f"{song}.txt")
+    background_path = os.path.join(FILES_DIR, "backgrounds", background)
+    duration = probe_duration(audio_path)
+    stats = {}
+
+    start = time.perf_counter()
+    if entry == "service":
+        # Full service path (alignment included; time-based alignment is never cached)
+        output_path = video_service.generate_lyric_video_from_files(
+            audio_path, lyrics_path, song, background_path, quality=quality, stats=stats
+        )
+    else:
+        align_start = time.perf_counter()
+        with open(lyrics_path, "r", encoding="utf-8") as f:
+            words = align_lyrics_time_based(clean_lyrics_for_alignment(f.read()), duration)
+        align_seconds = time.perf_counter() - align_start
+
+        output_path = os.path.join(tmpdir, f"{song}_{os.path.splitext(background)[0]}.mp4")
+        stats = render_lyric_video(audio_path, words, background_path, output_path,
+                                   quality=quality, engine=engine)
+        stats["stages"] = {"align": round(align_seconds, 3), **stats["stages"]}
+    seconds = time.perf_counter() - start
+
+    size = os.path.getsize(output_path)
+    if entry == "service":
+        shutil.rmtree(os.path.dirname(output_path), ignore_errors=True)
+    else:
+        os.remove(output_path)
+
+    return {
+        "id": f"{entry}/{song}/{background}",
+        "entry": entry,
+        "song": song,
+        "background": background,
+        "audio_seconds": round(duration, 2),
+        "seconds": round(seconds, 2),
+        "frames": stats["frames"],
+        "fps": stats["fps"],
+        "realtime": round(duration / seconds, 2),
+        "size_bytes": size,
+        "peak_rss_mb": stats["peak_rss_mb"],
+        "worker_peak_rss_mb": stats["worker_peak_rss_mb"],
+        "encoder_peak_rss_mb": stats["encoder_peak_rss_mb"],
+        "stages": stats["stages"],
+    }
+
+
+def print_results(results):
+    print(f"\n{'case':<40} {'s':>7} {'fps':>6} {'MB':>6} {'peak MB':>8}  "
+          + " ".join(f"{stage:>9}" for stage in STAGES))
+    for case in results["cases"]:
+        stages = " ".join(f"{case['stages'].get(stage, 0.0):>9.2f}" for stage in STAGES)
+        print(f"{case['id']:<40} {case['seconds']:>7.1f} {case['fps'] or 0:>6.1f} "
+              f"{case['size_bytes'] / 1e6:>6.1f} {case['peak_rss_mb']:>8.0f}  {stages}")
+
+
+def _change(new, old):
+    if new is None or not old:
+        return None
+    return (new - old) / old
+
+
+def compare(results, baseline, threshold):
+    """Print per-case deltas against a baseline; returns the list of regressions"""
+    if baseline.get("quality") != results["quality"] or baseline.get("engine") != results["engine"]:
+        print(f"[Render Suite] ⚠️  Baseline was run with quality={baseline.get('quality')}, "
+              f"engine={baseline.get('engine')}")
+
+    old_cases = {case["id"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    print(f"\n{'case':<40} " + " ".join(f"{metric:>12}" for metric in COMPARED_METRICS) + "   largest stage increase")
+    for case in results["cases"]:
+        old = old_cases.get(case["id"])
+        if old is None:
+            print(f"{case['id']:<40} (not in baseline)")
+            continue
+
+        cells = []
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            change = _change(case[metric], old[metric])
+            if change is None:
+                cells.append(f"{'-':>12}")
+                continue
+            worse = change > threshold if higher_is_worse else change < -threshold
+            if worse:
+                regressions.append((case["id"], metric, old[metric], case[metric]))
+            cells.append(f"{change:>+11.1%}{'!' if worse else ' '}")
+
+        stage_changes = [
+            (seconds - old["stages"].get(stage, 0.0), stage)
+            for stage, seconds in case["stages"].items()
+        ]
+        delta, stage = max(stage_changes, default=(0.0, "-"))
+        print(f"{case['id']:<40} " + " ".join(cells) + f"   {stage} {delta:+.2f}s")
+
+    missing = set(old_cases) - {case["id"] for case in results["cases"]}
+    if missing:
+        print(f"[Render Suite] {len(missing)} baseline case(s) not run: {', '.join(sorted(missing))}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lyric video rendering over the bundled songs")
+    parser.add_argument("--songs", nargs="+", default=None, help="Bundled song names (default: all with lyrics)")
+    parser.add_argument("--backgrounds", nargs="+", default=None, help="Bundled backgrounds (default: bg*.jpg)")
+    parser.add_argument("--entries", nargs="+", default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS))
+    parser.add_argument("--quality", default=DEFAULT_QUALITY, choices=list(QUALITY_PRESETS))
+    parser.add_argument("--engine", default=config.LYRIC_VIDEO_ENGINE, choices=list(ENGINES))
+    parser.add_argument("--output", default="render_suite.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", default=None, help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    # Deterministic, offline alignment for every case
+    config.ALIGNMENT_MODE = "time"
+    # The service entry point renders with the configured engine
+    config.LYRIC_VIDEO_ENGINE = args.engine
+
+    results = {
+        "version": RESULTS_VERSION,
+        "quality": args.quality,
+        "engine": args.engine,
+        "environment": environment(),
+        "cases": [],
+    }
+    songs = args.songs or bundled_songs()
+    backgrounds = args.backgrounds or bundled_backgrounds()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for song in songs:
+            for background in backgrounds:
+                for entry in args.entries:
+                    print(f"[Render Suite] {entry}: {song} on {background}...")
+                    case = run_case(entry, song, background, args.quality, args.engine, tmpdir)
+                    results["cases"].append(case)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"\n[Render Suite] ✅ {len(results['cases'])} cases written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n[Render Suite] ❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for case_id, metric, old, new in regressions:
+                print(f"  {case_id}: {metric} {old} -> {new}")
+            sys.exit(1)
+        print(f"\n[Render Suite] ✅ No regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
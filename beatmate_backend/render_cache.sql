@@ -0,0 +1,31 @@
+-- ============================================
+-- Render Cache Table
+-- Content-addressed cache of finished lyric videos
+-- ============================================
+
+-- One row per distinct render: cache_key is a sha256 of the audio bytes,
+-- lyrics text, background bytes and render settings (resolution, layout,
+-- font, fps, encoder profile). The canonical video lives in the user-videos
+-- bucket at storage_path (render-cache/<cache_key>.mp4) and is copied into
+-- a user's folder on a hit.
+CREATE TABLE IF NOT EXISTS render_cache (
+    cache_key TEXT PRIMARY KEY,
+    storage_path TEXT NOT NULL,
+    size_bytes BIGINT DEFAULT 0,
+    hit_count INTEGER DEFAULT 0,
+    previews JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_hit_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Poster / sprite sheet / animated preview paths and sprite layout
+-- (for tables created before previews were cached)
+ALTER TABLE render_cache ADD COLUMN IF NOT EXISTS previews JSONB DEFAULT '{}'::jsonb;
+
+-- Eviction scans entries by last use
+CREATE INDEX IF NOT EXISTS idx_render_cache_last_hit_at ON render_cache(last_hit_at DESC);
+
+-- Backend-only table (service role key bypasses RLS)
+ALTER TABLE render_cache ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE render_cache IS 'Finished lyric videos by content hash, reused for identical render requests (LRU + TTL eviction in the backend)';
@@ -38,10 +38,16 @@ VALUES (
     'user-videos',
     false,
     104857600, -- 100MB
-    ARRAY['video/mp4', 'video/webm']
+    ARRAY['video/mp4', 'video/webm', 'image/jpeg', 'image/webp', 'application/vnd.apple.mpegurl', 'video/mp2t']
 )
 ON CONFLICT (id) DO NOTHING;
 
+-- Poster / sprite sheet / animated preview images and HLS playlists/segments
+-- live next to the videos
+UPDATE storage.buckets
+SET allowed_mime_types = ARRAY['video/mp4', 'video/webm', 'image/jpeg', 'image/webp', 'application/vnd.apple.mpegurl', 'video/mp2t']
+WHERE id = 'user-videos';
+
 -- User Album Art Bucket (private)
 INSERT INTO storage.buckets (id, name, public, file_size_limit, allowed_mime_types)
 VALUES (
@@ -42,6 +42,8 @@ type Video = {
   created_at: string;
   video_url: string;
   thumbnail_url?: string;
+  poster_url?: string | null;
+  animated_preview_url?: string | null;
 };
 
 const CreationsGrid = () => {
@@ -562,6 +564,8 @@ const CreationsGrid = () => {
                     if (el) videoRefs.current[video.id] = el;
                   }}
                   src={video.video_url}
+                  poster={video.poster_url ?? undefined}
+                  preload={video.poster_url ? "none" : "metadata"}
                   className="w-full h-full object-cover"
                   controls
                 />
@@ -136,15 +136,39 @@ export const songApi = {
 // VIDEO API METHODS
 // ============================================
 
+const RENDER_JOB_POLL_MS = 2000;
+
 export const videoApi = {
   /**
    * Generate a lyric video
+   * Queues a render job and polls it until it finishes; resolves with the
+   * job result ({ status: 'success', video_url, videos, ... }).
+   * onProgress receives the job's stage and progress (0-100) while polling.
    */
-  async generateLyricVideo(formData: FormData) {
+  async generateLyricVideo(
+    formData: FormData,
+    onProgress?: (stage: string | null, progress: number) => void
+  ) {
     const response = await fetchWithAuth('/generate-lyric-video', {
       method: 'POST',
       body: formData,
     });
+    const { job_id } = await response.json();
+
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, RENDER_JOB_POLL_MS));
+      const job = await videoApi.getRenderJob(job_id);
+      if (job.state === 'succeeded') return job.result;
+      if (job.state === 'failed') throw new Error(job.error || 'Generation failed');
+      onProgress?.(job.stage, job.progress);
+    }
+  },
+
+  /**
+   * Get the status of a lyric video render job
+   */
+  async getRenderJob(jobId: string) {
+    const response = await fetchWithAuth(`/render-jobs/${jobId}`);
     return response.json();
   },
 